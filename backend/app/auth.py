@@ -1,24 +1,38 @@
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
-from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
-from app.database import get_db
+from app.config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, AUTH_CACHE_TTL, AUTH_CACHE_SIZE, AUTH_USER_CACHE_TTL,
+)
+from app.database import get_db, SessionLocal
 from app.models import User
+from app.utils.cache import TTLCache
+from app.services.password_service import password_pool
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# ── Auth Cache ────────────────────────────────────
+# sha256(token) -> username, for tokens whose signature and expiry were already verified
+token_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+# username -> the User columns request handlers read (never the password hash).
+# Kept briefly: other workers' copies of a changed user only go stale until they expire
+user_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_USER_CACHE_TTL)
+USER_CACHE_FIELDS = ("id", "username", "role", "department", "section")
+
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_pool.hash(password)
 
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+def hash_passwords(passwords: list) -> list:
+    """Hash several passwords in parallel across the password pool."""
+    return password_pool.hash_many(passwords)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -28,27 +42,59 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def remember_user(user: User) -> None:
+    """Cache the columns of a freshly loaded user."""
+    user_cache.set(user.username, {name: getattr(user, name) for name in USER_CACHE_FIELDS})
+
+
+def invalidate_user_cache(username: Optional[str] = None) -> None:
+    """Drop one cached user, or every cached user if no username is given."""
+    if username is None:
+        user_cache.clear()
+    else:
+        user_cache.pop(username)
+
+
+def auth_cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db),
 ) -> User:
+    """
+    Resolve the bearer token to a User. With warm caches this touches neither
+    the JWT library nor the database; the returned User is then a detached
+    copy carrying only USER_CACHE_FIELDS.
+    """
     token = credentials.credentials
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    token_key = hashlib.sha256(token.encode()).hexdigest()
+    username = token_cache.get(token_key)
+    if username is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username: str = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        # Never serve a token from cache past its own expiry
+        token_cache.set(token_key, username, ttl=payload.get("exp", 0) - time.time())
+
+    cached = user_cache.get(username)
+    if cached is not None:
+        return User(**cached)
 
     user = db.query(User).filter(User.username == username).first()
     if user is None:
         raise credentials_exception
+    remember_user(user)
     return user
 
 
@@ -59,3 +105,30 @@ def require_admin(current_user: User = Depends(get_current_user)) -> User:
             detail="Admin access required",
         )
     return current_user
+
+
+# ── Cache Invalidation ────────────────────────────
+# Usernames touched by a flush are collected per session and evicted once the
+# transaction commits, so no other request can re-cache the pre-commit row.
+# This only reaches this process's cache; other workers rely on AUTH_USER_CACHE_TTL.
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_user_changed(mapper, connection, target: User):
+    session = inspect(target).session
+    if session is None:
+        return
+    changed = session.info.setdefault("changed_usernames", set())
+    changed.add(target.username)
+    # A renamed user must also be evicted under the old name
+    changed.update(inspect(target).attrs.username.history.deleted or ())
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _evict_changed_users(session: Session):
+    for username in session.info.pop("changed_usernames", ()):
+        invalidate_user_cache(username)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_changed_users(session: Session):
+    session.info.pop("changed_usernames", None)
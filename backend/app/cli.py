@@ -0,0 +1,169 @@
+"""
+Maintenance commands.
+
+Run from the backend/ directory:
+    python -m app.cli backfill-features
+    python -m app.cli backfill-derivatives
+    python -m app.cli prune-uploads --dry-run
+    python -m app.cli rebuild-ann
+    python -m app.cli eval-ann --sample 200
+    python -m app.cli reconcile-stats
+    python -m app.cli migrate
+"""
+import argparse
+import logging
+import sys
+
+from app.config import ANN_TOP_K, MATCH_THRESHOLD
+from app.database import engine, SessionLocal
+from app.migrations import migrate
+
+
+def cmd_backfill_features(args) -> int:
+    """Compute stored image histograms for reports uploaded before the feature store existed."""
+    from app.services.feature_service import backfill_image_features
+
+    migrate()
+    db = SessionLocal()
+    try:
+        created = backfill_image_features(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"✅ Backfilled image features for {created} report(s).")
+    return 0
+
+
+def cmd_backfill_derivatives(args) -> int:
+    """Generate matching images and thumbnails for uploads made before the pipeline existed."""
+    from app.services.image_service import backfill_derivatives
+
+    migrate()
+    db = SessionLocal()
+    try:
+        processed = backfill_derivatives(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"✅ Generated derivatives for {processed} upload(s).")
+    return 0
+
+
+def cmd_prune_uploads(args) -> int:
+    """Recount stored image references and delete uploads nothing refers to."""
+    from app.services.image_service import prune_uploads
+
+    migrate()
+    db = SessionLocal()
+    try:
+        result = prune_uploads(db, grace_seconds=args.grace_minutes * 60, dry_run=args.dry_run)
+    finally:
+        db.close()
+    verb = "Would delete" if args.dry_run else "Deleted"
+    print(
+        f"✅ {verb} {result['files']} file(s) ({result['bytes'] / (1024 * 1024):.1f} MB); "
+        f"released {result['released']} stored image(s), recounted {result['recounted']}."
+    )
+    return 0
+
+
+def cmd_rebuild_ann(args) -> int:
+    """Rebuild the persisted ANN image indexes from stored features."""
+    from app.services.ann_service import report_index
+
+    migrate()
+    db = SessionLocal()
+    try:
+        count = report_index.rebuild_image(db)
+        report_index.save()
+    finally:
+        db.close()
+    print(f"✅ Rebuilt ANN image indexes with {count} report(s).")
+    return 0
+
+
+def cmd_eval_ann(args) -> int:
+    """Compare ANN shortlists against exact scoring for a sample of pending reports."""
+    from app.services.matching_service import evaluate_ann_recall
+
+    db = SessionLocal()
+    try:
+        result = evaluate_ann_recall(db, sample_size=args.sample, k=args.top_k)
+    finally:
+        db.close()
+    print(
+        f"Sampled {result['sampled']} report(s), top-k={result['top_k']} "
+        f"(mean shortlist {result['mean_shortlist']:.0f}): "
+        f"{result['retrieved']}/{result['above_threshold']} matches ≥ {MATCH_THRESHOLD} retrieved, "
+        f"recall={result['recall']:.4f}"
+    )
+    return 0 if result["retrieved"] == result["above_threshold"] else 1
+
+
+def cmd_reconcile_stats(args) -> int:
+    """Recount the admin dashboard counters from the reports and matches tables."""
+    from app.services.stats_service import reconcile_stats
+
+    migrate()
+    db = SessionLocal()
+    try:
+        fixed = reconcile_stats(db)
+    finally:
+        db.close()
+    print(f"✅ Corrected {fixed['report_counts']} report counter(s) and {fixed['match_counts']} match counter(s).")
+    return 0
+
+
+def cmd_migrate(args) -> int:
+    """Apply pending schema migrations, or list them with --status."""
+    from app.migrations import MIGRATIONS, current_version
+
+    if args.status:
+        with engine.connect() as conn:
+            version = current_version(conn)
+        for number, name, _ in MIGRATIONS:
+            print(f"{'applied' if number <= version else 'pending'}  {number:3d}  {name}")
+        return 0
+    applied = migrate()
+    print(f"✅ Applied {len(applied)} migration(s)." if applied else "✅ Database schema is up to date.")
+    return 0
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Lost & Found maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill = subparsers.add_parser("backfill-features", help="Compute missing image feature vectors")
+    backfill.add_argument("--batch-size", type=int, default=200)
+    backfill.set_defaults(func=cmd_backfill_features)
+
+    derivatives = subparsers.add_parser("backfill-derivatives", help="Generate missing thumbnails and matching images")
+    derivatives.add_argument("--batch-size", type=int, default=200)
+    derivatives.set_defaults(func=cmd_backfill_derivatives)
+
+    prune = subparsers.add_parser("prune-uploads", help="Delete unreferenced uploads and derivatives")
+    prune.add_argument("--grace-minutes", type=float, default=60, help="keep files younger than this")
+    prune.add_argument("--dry-run", action="store_true", help="only report what would be deleted")
+    prune.set_defaults(func=cmd_prune_uploads)
+
+    rebuild_ann = subparsers.add_parser("rebuild-ann", help="Rebuild the ANN image indexes")
+    rebuild_ann.set_defaults(func=cmd_rebuild_ann)
+
+    eval_ann = subparsers.add_parser("eval-ann", help="Measure ANN recall against exact matching")
+    eval_ann.add_argument("--sample", type=int, default=100)
+    eval_ann.add_argument("--top-k", type=int, default=ANN_TOP_K)
+    eval_ann.set_defaults(func=cmd_eval_ann)
+
+    reconcile = subparsers.add_parser("reconcile-stats", help="Recount the admin dashboard counters")
+    reconcile.set_defaults(func=cmd_reconcile_stats)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Apply pending database schema migrations")
+    migrate_parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    migrate_parser.set_defaults(func=cmd_migrate)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
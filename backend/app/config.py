@@ -30,22 +30,106 @@ if not SECRET_KEY:
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "480"))
+# How long get_current_user caches a decoded token, and max cached tokens (and users)
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+# A user change is evicted at once only in the worker that committed it; the other
+# uvicorn workers keep serving their cached copy for up to this many seconds
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+# bcrypt process pool: processes (0 = CPU count), concurrent verifications (0 = processes),
+# and logins allowed to wait for a slot before new ones get 429
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "0"))
+PASSWORD_MAX_CONCURRENT = int(os.getenv("PASSWORD_MAX_CONCURRENT", "0"))
+PASSWORD_QUEUE_SIZE = int(os.getenv("PASSWORD_QUEUE_SIZE", "64"))
 
 # Database
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{BASE_DIR / 'lost_found.db'}")
+# SQLite tuning (ignored for other databases): WAL journal, synchronous / cache / mmap pragmas on
+# every connection, and all writes funnelled through one connection per process so concurrent
+# sessions queue for it instead of failing with "database is locked"
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "true").lower() == "true"
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()  # OFF / NORMAL / FULL / EXTRA
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))  # page cache per connection
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))  # 0 disables memory-mapped reads
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "15"))  # seconds to wait for another process's lock
+SQLITE_SINGLE_WRITER = os.getenv("SQLITE_SINGLE_WRITER", "true").lower() == "true"
+# Apply pending schema migrations at startup; when false, run `python -m app.cli migrate` before deploying
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
 
 # CORS — comma-separated origins allowed in production
 # Example: ALLOWED_ORIGINS=https://myapp.up.railway.app,https://mydomain.com
 _raw_origins = os.getenv("ALLOWED_ORIGINS", "")
 ALLOWED_ORIGINS = [o.strip() for o in _raw_origins.split(",") if o.strip()]
 
+# Metrics — Prometheus text format at /api/metrics; with a token set, scrapers must send
+# "Authorization: Bearer <token>". Without one, only local scrapers and admins may read it
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# SQL profiler — attributes every statement to its request / matching job, flags repeated
+# statement shapes (likely N+1) and adds Server-Timing headers; on by default in debug mode
+SQL_PROFILER = os.getenv("SQL_PROFILER", str(DEBUG)).lower() == "true"
+SQL_PROFILER_N1_THRESHOLD = int(os.getenv("SQL_PROFILER_N1_THRESHOLD", "10"))
+SQL_PROFILER_HISTORY = int(os.getenv("SQL_PROFILER_HISTORY", "200"))  # recent profiles kept for /api/admin/profile
+SQL_PROFILER_MAX_STATEMENTS = int(os.getenv("SQL_PROFILER_MAX_STATEMENTS", "500"))  # per profile
+
 # Uploads
-UPLOAD_DIR = BASE_DIR / "uploads"
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", str(BASE_DIR / "uploads")))
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(5 * 1024 * 1024)))  # 5 MB
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
+# Matching image and thumbnails generated once per upload, named by the upload's SHA-256
+DERIVED_DIR = UPLOAD_DIR / "derived"
+DERIVED_DIR.mkdir(parents=True, exist_ok=True)
+THUMBNAIL_FORMAT = os.getenv("THUMBNAIL_FORMAT", "webp").lower()  # webp / jpeg
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+
+# Admin listings (keyset pagination)
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "50"))
+ADMIN_PAGE_MAX = int(os.getenv("ADMIN_PAGE_MAX", "200"))
+
+# Seconds between recounts of the admin dashboard counters (they are also kept up to date incrementally)
+STATS_RECONCILE_SECONDS = int(os.getenv("STATS_RECONCILE_SECONDS", "3600"))
+
+# Admin WebSocket notifications
+WS_MAX_CONNECTIONS = int(os.getenv("WS_MAX_CONNECTIONS", "100"))
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))  # pending messages per client
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))  # seconds before a stuck client is closed
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop").lower()  # drop (backlog → resync) / close
+# "memory" delivers within one process; "database" relays events through the ws_events
+# table so every uvicorn worker (sharing the database) reaches its own admins
+WS_BACKEND = os.getenv("WS_BACKEND", "memory").lower()
+WS_POLL_INTERVAL = float(os.getenv("WS_POLL_INTERVAL", "0.5"))
+WS_EVENT_RETENTION = int(os.getenv("WS_EVENT_RETENTION", "300"))  # seconds ws_events rows are kept
+# Recent events kept for reconnecting dashboards; clients further behind reload their lists
+WS_REPLAY_BUFFER = int(os.getenv("WS_REPLAY_BUFFER", "500"))
 
 # AI Matching
 MATCH_THRESHOLD = float(os.getenv("MATCH_THRESHOLD", "0.70"))
 IMAGE_WEIGHT = float(os.getenv("IMAGE_WEIGHT", "0.4"))
 TEXT_WEIGHT = float(os.getenv("TEXT_WEIGHT", "0.6"))
+# Candidate pre-filtering before similarity scoring (falls back to a full scan if nothing matches)
+MATCH_FILTER_CATEGORY = os.getenv("MATCH_FILTER_CATEGORY", "true").lower() == "true"
+MATCH_FILTER_BLOCK = os.getenv("MATCH_FILTER_BLOCK", "false").lower() == "true"
+MATCH_DATE_WINDOW_DAYS = int(os.getenv("MATCH_DATE_WINDOW_DAYS", "30"))  # 0 disables
+# Candidates whose image dHash differs in more bits than this are not histogram-compared
+# (image score 0); 0 disables. Identical uploads always score 1.0 without comparison.
+MATCH_DHASH_MAX_DISTANCE = int(os.getenv("MATCH_DHASH_MAX_DISTANCE", "0"))
+# Approximate nearest-neighbour shortlist (used once a pool reaches ANN_MIN_POOL reports)
+ANN_ENABLED = os.getenv("ANN_ENABLED", "true").lower() == "true"
+ANN_MIN_POOL = int(os.getenv("ANN_MIN_POOL", "2000"))
+ANN_TOP_K = int(os.getenv("ANN_TOP_K", "200"))
+ANN_NLIST = int(os.getenv("ANN_NLIST", "64"))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "8"))
+ANN_TEXT_DIM = int(os.getenv("ANN_TEXT_DIM", "128"))
+ANN_DIR = Path(os.getenv("ANN_DIR", str(BASE_DIR / "ann_index")))
+TEXT_MODEL_REFIT_SECONDS = int(os.getenv("TEXT_MODEL_REFIT_SECONDS", "600"))
+# Import OpenCV / scikit-learn in the background right after startup instead of on first match
+ML_WARMUP = os.getenv("ML_WARMUP", "true").lower() == "true"
+
+# Background matching queue
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "2"))
+MATCH_MAX_ATTEMPTS = int(os.getenv("MATCH_MAX_ATTEMPTS", "3"))
+MATCH_RETRY_DELAY = float(os.getenv("MATCH_RETRY_DELAY", "5"))
+# A running job whose worker hasn't renewed it for this long is assumed dead and requeued
+MATCH_JOB_LEASE_SECONDS = float(os.getenv("MATCH_JOB_LEASE_SECONDS", "300"))
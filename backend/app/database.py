@@ -1,13 +1,20 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from app.config import DATABASE_URL
+import time
+from sqlalchemy import create_engine, delete, event, false, func, insert, select, text
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from app.config import (
+    DATABASE_URL, METRICS_ENABLED, SQL_PROFILER, SQLITE_TUNING, SQLITE_SYNCHRONOUS, SQLITE_CACHE_MB, SQLITE_MMAP_MB,
+    SQLITE_BUSY_TIMEOUT, SQLITE_SINGLE_WRITER,
+)
+from app import metrics, profiler
 
 # Handle SQLite connect_args and pool config
 connect_args = {}
 engine_kwargs = {"pool_pre_ping": True}
 
 if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+    # timeout is SQLite's busy timeout: how long a statement waits for another connection's lock
+    connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT}
 else:
     # Production pool settings for PostgreSQL / MySQL
     engine_kwargs.update({
@@ -17,7 +24,90 @@ else:
     })
 
 engine = create_engine(DATABASE_URL, connect_args=connect_args, **engine_kwargs)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Dialects the upsert / insert_ignore_duplicates / lock_tables helpers below implement;
+# fail at startup rather than on the first duplicate counter or match row
+SUPPORTED_DIALECTS = ("sqlite", "postgresql", "mysql", "mariadb")
+if engine.dialect.name not in SUPPORTED_DIALECTS:
+    raise NotImplementedError(
+        f"Unsupported database dialect {engine.dialect.name!r} (supported: {', '.join(SUPPORTED_DIALECTS)})"
+    )
+
+# ── SQLite Tuning ─────────────────────────────────
+# WAL lets readers run alongside the (single) writer; synchronous=NORMAL is durable
+# across application crashes in WAL mode and only fsyncs at checkpoints.
+_file_database = engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:")
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")  # negative: KiB rather than pages
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+if SQLITE_TUNING and _file_database:
+    event.listen(engine, "connect", _sqlite_pragmas)
+
+# Every session's writes go through this one connection, so concurrent write transactions
+# queue for it in the pool (db_writer_wait_seconds) instead of racing for SQLite's lock.
+# It opens transactions with BEGIN IMMEDIATE, taking the write lock up front: a deferred
+# transaction that read first can't wait for another process's lock and fails at once.
+write_engine = None
+if SQLITE_TUNING and SQLITE_SINGLE_WRITER and _file_database:
+    write_engine = create_engine(
+        DATABASE_URL, connect_args=connect_args, pool_pre_ping=True, pool_size=1, max_overflow=0,
+    )
+    event.listen(write_engine, "connect", _sqlite_pragmas)
+
+    @event.listens_for(write_engine, "connect")
+    def _driver_autocommit(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None  # pysqlite's own BEGIN would be deferred
+
+    @event.listens_for(write_engine, "begin")
+    def _begin_immediate(conn):
+        start = time.perf_counter()
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        if METRICS_ENABLED:
+            metrics.DB_BUSY_WAIT.observe(time.perf_counter() - start)
+
+if METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+    if write_engine is not None:
+        metrics.instrument_engine(write_engine, writer=True)
+if SQL_PROFILER:
+    profiler.instrument_engine(engine)
+    if write_engine is not None:
+        profiler.instrument_engine(write_engine)
+
+
+class RoutingSession(Session):
+    """
+    Reads use the connection pool; flushes, INSERT / UPDATE / DELETE statements and
+    everything after them until the transaction ends use the writer connection, so
+    a transaction reads its own uncommitted writes.
+    """
+
+    _writing = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if not self._writing and (self._flushing or getattr(clause, "is_dml", False)):
+            self._writing = True
+        return write_engine if self._writing else engine
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _release_writer(session, transaction):
+    if transaction.parent is None:
+        session._writing = False
+
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession if write_engine is not None else Session, autocommit=False, autoflush=False, bind=engine,
+)
 Base = declarative_base()
 
 
@@ -28,3 +118,43 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def insert_ignore_duplicates(table):
+    """INSERT that silently skips rows violating a unique index."""
+    if engine.dialect.name == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    return insert(table).prefix_with("IGNORE")
+
+
+def upsert(table, index_elements: list, set_: dict):
+    """
+    INSERT that updates set_ on the existing row instead when index_elements conflict.
+    (MySQL matches on any unique key; index_elements are always the table's key here.)
+    """
+    if engine.dialect.name == "sqlite":
+        return sqlite.insert(table).on_conflict_do_update(index_elements=index_elements, set_=set_)
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table).on_conflict_do_update(index_elements=index_elements, set_=set_)
+    return mysql.insert(table).on_duplicate_key_update(set_)
+
+
+def lock_tables(db: Session, *tables) -> None:
+    """
+    Begin db's transaction holding off every other writer of tables until it
+    ends, so what it reads can't change before it writes: LOCK TABLE on
+    PostgreSQL, the database write lock on SQLite, and next-key locks over
+    every row (which also block inserts) on MySQL.
+    """
+    if engine.dialect.name == "postgresql":
+        names = ", ".join(table.name for table in tables)
+        db.execute(text(f"LOCK TABLE {names} IN SHARE ROW EXCLUSIVE MODE"))
+    elif engine.dialect.name == "sqlite":
+        # Any write statement, even one matching no rows, takes the lock (and with the
+        # single writer, moves the session onto the writer connection: BEGIN IMMEDIATE)
+        db.execute(delete(tables[0]).where(false()))
+    else:
+        for table in tables:
+            db.execute(select(func.count()).select_from(table).with_for_update())
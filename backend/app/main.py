@@ -1,19 +1,36 @@
+import asyncio
+import hmac
 import logging
-from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+import time
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
+from fastapi.security import HTTPAuthorizationCredentials
 from starlette.middleware.base import BaseHTTPMiddleware
 from pathlib import Path
 
-from app.database import engine, Base, SessionLocal
+from app.auth import get_current_user
+from app.database import SessionLocal
+from app.migrations import migrate, pending_migrations
+from app.metrics import MetricsMiddleware, registry, CONTENT_TYPE
+from app.profiler import SQLProfilerMiddleware
 from app.seed import seed_users
 from app.websocket_manager import manager
+from app.services.text_service import text_model_refresher
+from app.services.stats_service import stats_reconciler
+from app.services.job_service import matching_queue
+from app.services.ann_service import report_index, load_report_index
+from app.services.password_service import password_pool
 from app.routes.auth_routes import router as auth_router
 from app.routes.report_routes import router as report_router
 from app.routes.admin_routes import router as admin_router
-from app.config import DEBUG, UPLOAD_DIR, ALLOWED_ORIGINS
+from app.utils.ai_utils import warm_up
+from app.config import (
+    DEBUG, UPLOAD_DIR, DERIVED_DIR, ALLOWED_ORIGINS, ML_WARMUP, MAX_UPLOAD_SIZE, METRICS_ENABLED, METRICS_TOKEN,
+    SQL_PROFILER, MIGRATE_ON_STARTUP,
+)
 
 # ── Logging ───────────────────────────────────────
 logging.basicConfig(
@@ -36,19 +53,99 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         return response
 
 
+# ── Request Size Limit ────────────────────────────
+# Room for the report's form fields on top of the image itself
+FORM_OVERHEAD = 64 * 1024
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject requests whose declared Content-Length exceeds max_bytes before the
+    body is read, so an oversized upload is never spooled to disk by the form
+    parser. Bodies without a length are still capped by save_upload.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            length = dict(scope["headers"]).get(b"content-length", b"")
+            if length.isdigit() and int(length) > self.max_bytes:
+                response = JSONResponse(
+                    status_code=413,
+                    content={"detail": f"Request too large. Maximum upload size: {MAX_UPLOAD_SIZE // (1024 * 1024)}MB"},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
 # ── Lifespan ──────────────────────────────────────
+@contextmanager
+def _timed(phases: dict, name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = (time.perf_counter() - start) * 1000
+
+
+async def _warm_up_ml():
+    """Import OpenCV / scikit-learn off the startup path so the first match doesn't pay for it."""
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(warm_up)
+        logger.info("ML libraries loaded in %.0f ms", (time.perf_counter() - start) * 1000)
+    except Exception:
+        logger.exception("ML warm-up failed")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    Base.metadata.create_all(bind=engine)
-    db = SessionLocal()
-    try:
-        seed_users(db)
-    finally:
-        db.close()
-    logger.info("Application started successfully")
+    phases = {}
+    password_pool.start()
+    with _timed(phases, "migrations"):
+        if MIGRATE_ON_STARTUP:
+            await asyncio.to_thread(migrate)
+        else:
+            pending = await asyncio.to_thread(pending_migrations)
+            if pending:
+                logger.warning(
+                    "Database schema is missing %d migration(s); run `python -m app.cli migrate`: %s",
+                    len(pending), ", ".join(name for _, name in pending),
+                )
+    with _timed(phases, "seed"):
+        db = SessionLocal()
+        try:
+            await asyncio.to_thread(seed_users, db)
+        finally:
+            db.close()
+    with _timed(phases, "ann_index"):
+        await asyncio.to_thread(load_report_index)
+    with _timed(phases, "matching_queue"):
+        text_model_task = asyncio.create_task(text_model_refresher())
+        stats_task = asyncio.create_task(stats_reconciler())
+        await matching_queue.start()
+    with _timed(phases, "websocket"):
+        await manager.start()
+    warm_up_task = asyncio.create_task(_warm_up_ml()) if ML_WARMUP else None
+    logger.info(
+        "Application started successfully in %.0f ms (%s)",
+        sum(phases.values()), ", ".join(f"{name} {ms:.0f} ms" for name, ms in phases.items()),
+    )
     yield
     # Shutdown
+    await matching_queue.stop()
+    await manager.stop()
+    text_model_task.cancel()
+    stats_task.cancel()
+    if warm_up_task:
+        warm_up_task.cancel()
+    report_index.save()
+    password_pool.shutdown()
     logger.info("Application shutting down")
 
 
@@ -62,6 +159,8 @@ app = FastAPI(
     redoc_url="/redoc" if DEBUG else None,
 )
 
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=MAX_UPLOAD_SIZE + FORM_OVERHEAD)
+
 # ── CORS ──────────────────────────────────────────
 # In debug: allow all origins for local development
 # In production: use ALLOWED_ORIGINS env var (comma-separated)
@@ -77,6 +176,15 @@ app.add_middleware(
 # ── Security Headers ─────────────────────────────
 app.add_middleware(SecurityHeadersMiddleware)
 
+# ── SQL Profiler ──────────────────────────────────
+if SQL_PROFILER:
+    app.add_middleware(SQLProfilerMiddleware)
+
+# ── Metrics ───────────────────────────────────────
+# Added last so it is outermost and also times requests rejected by the middleware above
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # ── API Routes ────────────────────────────────────
 app.include_router(auth_router)
 app.include_router(report_router)
@@ -85,6 +193,19 @@ app.include_router(admin_router)
 # ── Static Files ──────────────────────────────────
 FRONTEND_DIR = Path(__file__).resolve().parent.parent.parent / "frontend"
 
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Files named by content hash: a URL never changes content, so browsers may cache it for good."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+# Mounted before /uploads so the more specific prefix wins
+app.mount("/uploads/derived", ImmutableStaticFiles(directory=str(DERIVED_DIR)), name="derived")
 app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
 app.mount("/css", StaticFiles(directory=str(FRONTEND_DIR / "css")), name="css")
 app.mount("/js", StaticFiles(directory=str(FRONTEND_DIR / "js")), name="js")
@@ -96,6 +217,39 @@ async def health_check():
     return {"status": "ok", "version": "1.0.0"}
 
 
+def _is_admin_token(token: str) -> bool:
+    db = SessionLocal()
+    try:
+        user = get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), db)
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+    return user.role == "admin"
+
+
+async def _may_scrape(request: Request) -> bool:
+    """With METRICS_TOKEN set, only that token; otherwise a scraper on this host or an admin's JWT."""
+    authorization = request.headers.get("authorization", "")
+    if METRICS_TOKEN:
+        return hmac.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode())
+    # A request relayed by a local reverse proxy arrives from loopback too, but says who it's for
+    if request.client and request.client.host in ("127.0.0.1", "::1") and "x-forwarded-for" not in request.headers:
+        return True
+    scheme, _, token = authorization.partition(" ")
+    return scheme.lower() == "bearer" and bool(token) and await asyncio.to_thread(_is_admin_token, token)
+
+
+@app.get("/api/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus scrape endpoint (this worker's counters only)."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not await _may_scrape(request):
+        raise HTTPException(status_code=401, detail="Metrics require METRICS_TOKEN, an admin token or a local scraper")
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
 # ── Global Error Handler ─────────────────────────
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -110,15 +264,17 @@ async def global_exception_handler(request: Request, exc: Exception):
 # ── WebSocket ─────────────────────────────────────
 @app.websocket("/ws/admin")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    client = await manager.connect(websocket)
+    if client is None:
+        return
     try:
         while True:
             # Keep connection alive, listen for messages
             await websocket.receive_text()
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
-    except Exception:
-        manager.disconnect(websocket)
+    except (WebSocketDisconnect, Exception):
+        pass
+    finally:
+        await manager.disconnect(client)
 
 
 # ── Frontend Routes ───────────────────────────────
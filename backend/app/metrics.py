@@ -0,0 +1,415 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are plain Python objects. Updates are unlocked
+read-modify-writes under the GIL: much cheaper than a lock on every request,
+and at worst an increment is lost when two threads race, which doesn't matter
+for monitoring. Only creating a new label combination takes a lock.
+Values that already live elsewhere (pool size, WebSocket connections, queue
+depth) are read by collectors when /api/metrics is scraped instead of being
+tracked twice.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Optional
+from sqlalchemy import event
+
+# Latency buckets in seconds (the Prometheus client defaults)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LOCK_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(round(value, 9))
+    return str(value)
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# ── Metric Types ──────────────────────────────────
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """The child for one combination of label values (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> list:
+        """(suffix, label values, extra label, value) for every child."""
+        raise NotImplementedError
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_labels(self.labelnames, values, extra)} {_format_value(value)}")
+        return lines
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _samples(self) -> list:
+        return [("", values, "", child.value) for values, child in list(self._children.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def _samples(self) -> list:
+        return [("", values, "", child.value) for values, child in list(self._children.items())]
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # per bucket, not cumulative; the last is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _samples(self) -> list:
+        samples = []
+        for values, child in list(self._children.items()):
+            counts = list(child.counts)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                samples.append(("_bucket", values, f'le="{_format_value(float(bound))}"', cumulative))
+            samples.append(("_sum", values, "", child.sum))
+            samples.append(("_count", values, "", cumulative))
+        return samples
+
+
+class Stopwatch:
+    """Accumulates elapsed time into named phases; each lap() charges the time since the last one."""
+
+    __slots__ = ("start", "mark", "phases")
+
+    def __init__(self):
+        self.start = self.mark = time.perf_counter()
+        self.phases = {}
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.mark
+        self.mark = now
+
+    def total(self) -> float:
+        return time.perf_counter() - self.start
+
+
+# ── Registry ──────────────────────────────────────
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, func: Callable[[], None]) -> Callable[[], None]:
+        """Register a function that refreshes gauges right before each scrape."""
+        self.collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception:
+                pass  # a broken collector must not take the whole endpoint down
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# HTTP
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.", ("method", "route", "status"),
+)
+HTTP_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template.", ("method", "route"),
+)
+HTTP_IN_PROGRESS = registry.gauge("http_requests_in_progress", "HTTP requests currently being served.")
+REQUEST_DB_QUERIES = registry.histogram(
+    "http_request_db_queries", "Database queries issued while serving one request.", ("route",), COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = registry.histogram(
+    "http_request_db_seconds", "Time spent in database queries while serving one request.", ("route",), DB_BUCKETS,
+)
+
+# Database
+DB_QUERIES = registry.counter("db_queries_total", "Database statements executed (all callers, including background workers).")
+DB_QUERY_DURATION = registry.histogram("db_query_duration_seconds", "Database statement execution time.", (), DB_BUCKETS)
+DB_POOL_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the pool.", (), DB_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = registry.gauge("db_pool_checked_out", "Connections currently checked out of the pool.")
+DB_POOL_SIZE = registry.gauge("db_pool_size", "Connections held by the pool.")
+DB_LOCK_ERRORS = registry.counter(
+    "db_lock_errors_total", "Statements that failed because SQLite stayed locked past its busy timeout.",
+)
+DB_LOCK_ERRORS.labels()  # exported as 0 until the first one, so alerts on its rate work from startup
+DB_WRITER_WAIT = registry.histogram(
+    "db_writer_wait_seconds", "Time sessions waited for this process's SQLite writer connection.", (), LOCK_BUCKETS,
+)
+DB_WRITER_WAITING = registry.gauge("db_writer_waiting", "Sessions currently queued for the SQLite writer connection.")
+DB_WRITER_HELD = registry.histogram(
+    "db_writer_held_seconds", "Time one write transaction held the SQLite writer connection.", (), LOCK_BUCKETS,
+)
+DB_BUSY_WAIT = registry.histogram(
+    "db_busy_wait_seconds", "Time BEGIN IMMEDIATE waited for the SQLite write lock (held by another process).",
+    (), LOCK_BUCKETS,
+)
+
+# Matching
+MATCHING_DURATION = registry.histogram("matching_duration_seconds", "Total time of one run_matching call.")
+MATCHING_PHASE = registry.histogram(
+    "matching_phase_seconds",
+    "run_matching time by phase: candidates (shortlist and fetch), text, image, score, persist.",
+    ("phase",),
+)
+MATCHING_CANDIDATES = registry.histogram(
+    "matching_candidates_scored", "Candidates scored per run_matching call.", (), COUNT_BUCKETS,
+)
+MATCHING_QUEUE_DEPTH = registry.gauge("matching_queue_depth", "Matching jobs waiting for a worker on this process.")
+
+# WebSocket
+WS_CONNECTIONS = registry.gauge("ws_connections", "Connected admin WebSockets on this worker.")
+WS_QUEUED = registry.gauge("ws_queued_messages", "Messages waiting in admin WebSocket send queues.")
+WS_DROPPED = registry.gauge("ws_dropped_messages", "Messages dropped for slow admin WebSockets since startup.")
+WS_BROADCAST = registry.histogram(
+    "ws_broadcast_seconds", "Time to publish an event to every admin WebSocket queue (and the relay table)."
+)
+WS_SEND = registry.histogram("ws_send_seconds", "Time to write one message to an admin WebSocket.")
+
+
+# ── Per-request Query Accounting ──────────────────
+class RequestStats:
+    """Queries issued by one request (shared with the worker threads it runs code in)."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Context variables are copied into threadpool calls (to_thread / sync endpoints), so the
+# same RequestStats object is visible there and its counts land on the right request
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def instrument_engine(engine, writer: bool = False) -> None:
+    """
+    Count and time every statement and pool checkout on engine. For the SQLite
+    writer engine (see app.database), checkouts are waits for the write slot and
+    are recorded apart from the read pool, along with how long each is held.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("query_start", time.perf_counter())
+        DB_QUERIES.inc()
+        DB_QUERY_DURATION.observe(elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if "database is locked" in str(context.original_exception):
+            DB_LOCK_ERRORS.inc()
+
+    # The pool has no "before checkout" event, so time its public connect() directly
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+    def timed_writer_connect():
+        start = time.perf_counter()
+        DB_WRITER_WAITING.inc()
+        try:
+            return connect()
+        finally:
+            DB_WRITER_WAITING.dec()
+            DB_WRITER_WAIT.observe(time.perf_counter() - start)
+
+    if not writer:
+        pool.connect = timed_connect
+
+        @registry.collector
+        def _pool_gauges():
+            if hasattr(engine.pool, "checkedout"):
+                DB_POOL_CHECKED_OUT.set(engine.pool.checkedout())
+            if hasattr(engine.pool, "size"):
+                DB_POOL_SIZE.set(engine.pool.size())
+        return
+
+    pool.connect = timed_writer_connect
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, record, proxy):
+        record.info["writer_checkout"] = time.perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, record):
+        start = record.info.pop("writer_checkout", None)
+        if start is not None:
+            DB_WRITER_HELD.observe(time.perf_counter() - start)
+
+
+# ── ASGI Middleware ───────────────────────────────
+def route_label(scope, root_path: str = "") -> str:
+    """The matched route template (never the raw path, so label values stay bounded)."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    mount = scope.get("root_path", "")
+    if mount != root_path:
+        return mount[len(root_path):] + "/*"  # a static files mount
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Record latency, status and database work for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+        root_path = scope.get("root_path", "")
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_PROGRESS.dec()
+            current_request.reset(token)
+            route = route_label(scope, root_path)
+            HTTP_REQUESTS.labels(scope["method"], route, status).inc()
+            HTTP_DURATION.labels(scope["method"], route).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(route).observe(stats.queries)
+            REQUEST_DB_SECONDS.labels(route).observe(stats.db_seconds)
@@ -0,0 +1,251 @@
+"""
+Versioned schema migrations.
+
+Base.metadata.create_all only creates missing tables, so columns and indexes
+added to existing tables never reached databases created by an older release.
+Each migration below brings a database up to one step of the schema's history
+and records its version in the schema_version table. Startup (or
+`python -m app.cli migrate`) applies whatever is pending; when the database
+is current that costs a single query.
+
+Every step is idempotent — it checks for the column / index / table it adds —
+so a database that predates the schema_version table simply runs them all.
+An empty database gets the current schema from create_all and is stamped with
+the latest version.
+
+On PostgreSQL, indexes are built with CREATE INDEX CONCURRENTLY so reports
+and matches stay writable while they build, and an advisory lock keeps
+workers that boot together from migrating at the same time.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from sqlalchemy import Column, Date, DateTime, Integer, MetaData, String, Table, func, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn, CreateIndex
+from app.database import engine, Base, insert_ignore_duplicates
+from app.models import User, Report, Match, ImageFeature, StoredImage, ReportCount, MatchCount, MatchJob, WsEvent
+
+logger = logging.getLogger(__name__)
+
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Arbitrary key for pg_advisory_lock, shared by every worker
+_LOCK_KEY = 7_206_311_004
+
+
+class Schema:
+    """The connection a migration runs on, with idempotent DDL helpers."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.dialect = conn.dialect.name
+
+    def has_table(self, name: str) -> bool:
+        return inspect(self.conn).has_table(name)
+
+    def columns(self, table: str) -> dict:
+        return {column["name"]: column for column in inspect(self.conn).get_columns(table)}
+
+    def create_table(self, table: Table):
+        table.create(self.conn, checkfirst=True)
+
+    def add_column(self, column: Column):
+        """Add a (nullable) model column to its table unless it's already there."""
+        if column.name not in self.columns(column.table.name):
+            ddl = CreateColumn(column).compile(dialect=self.conn.dialect)
+            self.conn.exec_driver_sql(f"ALTER TABLE {column.table.name} ADD COLUMN {ddl}")
+
+    def create_index(self, table: Table, name: str):
+        """Build one of a model's indexes unless it exists; on PostgreSQL, without blocking writes."""
+        index = next(index for index in table.indexes if index.name == name)
+        ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=self.conn.dialect))
+        if self.dialect == "postgresql":
+            # An interrupted concurrent build leaves an invalid index that IF NOT EXISTS would keep
+            valid = self.conn.exec_driver_sql(
+                "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = %(name)s",
+                {"name": name},
+            ).scalar()
+            if valid is False:
+                self.drop_index(name)
+            ddl = ddl.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)
+        self.conn.exec_driver_sql(ddl)
+
+    def drop_index(self, name: str):
+        concurrently = "CONCURRENTLY " if self.dialect == "postgresql" else ""
+        self.conn.exec_driver_sql(f"DROP INDEX {concurrently}IF EXISTS {name}")
+
+
+# ── Migrations ────────────────────────────────────
+def _initial_schema(schema: Schema):
+    for model in (User, Report, Match):
+        schema.create_table(model.__table__)
+
+
+def _image_features(schema: Schema):
+    schema.create_table(ImageFeature.__table__)
+
+
+def _match_jobs(schema: Schema):
+    schema.create_table(MatchJob.__table__)
+
+
+def _candidate_prefilter_indexes(schema: Schema):
+    schema.create_index(Report.__table__, "ix_reports_match_category")
+    schema.create_index(Report.__table__, "ix_reports_match_block")
+
+
+def _unique_match_pairs(schema: Schema):
+    # Pairs stored twice by concurrent runs before the index existed; keep the first of each
+    deleted = schema.conn.exec_driver_sql(
+        "DELETE FROM matches WHERE id NOT IN "
+        "(SELECT MIN(id) FROM matches GROUP BY lost_report_id, found_report_id)"
+    ).rowcount
+    if deleted > 0:
+        logger.info("Removed %d duplicate match(es)", deleted)
+    schema.create_index(Match.__table__, "uq_matches_lost_found")
+
+
+def _keyset_pagination_indexes(schema: Schema):
+    schema.create_index(Report.__table__, "ix_reports_created_id")
+    schema.create_index(Match.__table__, "ix_matches_score_id")
+
+
+def _ws_events(schema: Schema):
+    if schema.dialect == "sqlite" and schema.has_table("ws_events"):
+        sql = schema.conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'ws_events'"
+        ).scalar()
+        if "AUTOINCREMENT" not in sql.upper():
+            # Created before ids doubled as event sequence numbers; the rows are short-lived relay events
+            schema.conn.exec_driver_sql("DROP TABLE ws_events")
+    schema.create_table(WsEvent.__table__)
+
+
+def _image_store(schema: Schema):
+    schema.add_column(Report.__table__.c.image_hash)
+    schema.create_index(Report.__table__, "ix_reports_image_hash")
+    schema.create_table(StoredImage.__table__)
+
+
+def _dashboard_counters(schema: Schema):
+    # Filled by the stats reconciler, which runs at startup
+    schema.create_table(ReportCount.__table__)
+    schema.create_table(MatchCount.__table__)
+
+
+def _report_section_and_date(schema: Schema):
+    from app.services.report_service import backfill_report_columns
+
+    schema.add_column(Report.__table__.c.section)
+    db = Session(bind=schema.conn)
+    try:
+        result = backfill_report_columns(db)
+    finally:
+        db.close()
+    logger.info(
+        "Copied sections to %d report(s), rewrote %d date(s) (%d unparseable)",
+        result["sections"], result["dates"], result["unparseable"],
+    )
+    # SQLite has no column types to change; its ISO strings already read back as dates
+    if schema.dialect == "postgresql" and not isinstance(schema.columns("reports")["date_reported"]["type"], Date):
+        schema.conn.exec_driver_sql(
+            "ALTER TABLE reports ALTER COLUMN date_reported TYPE DATE USING date_reported::date"
+        )
+    for name in ("ix_reports_status_type_created", "ix_reports_section_created", "ix_reports_user_created"):
+        schema.create_index(Report.__table__, name)
+    # Left prefixes of ix_reports_created_id / _status_type_created / _match_category
+    for name in ("ix_reports_created_at", "ix_reports_status", "ix_reports_type"):
+        schema.drop_index(name)
+
+
+# (version, name, step) — append only; never renumber or edit a released step
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "image features", _image_features),
+    (3, "matching job queue", _match_jobs),
+    (4, "candidate pre-filter indexes", _candidate_prefilter_indexes),
+    (5, "unique match pairs", _unique_match_pairs),
+    (6, "keyset pagination indexes", _keyset_pagination_indexes),
+    (7, "websocket event relay", _ws_events),
+    (8, "content-addressed image store", _image_store),
+    (9, "dashboard counters", _dashboard_counters),
+    (10, "report section and date columns", _report_section_and_date),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ── Runner ────────────────────────────────────────
+def current_version(conn) -> int:
+    """Highest applied migration (0 if none have been recorded)."""
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def pending_migrations() -> list:
+    """(version, name) of every migration the database hasn't applied yet."""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    return [(number, name) for number, name, _ in MIGRATIONS if number > version]
+
+
+@contextmanager
+def _migration_lock(conn):
+    if conn.dialect.name != "postgresql":
+        yield  # SQLite deployments run one migrating process; every step is idempotent anyway
+        return
+    conn.exec_driver_sql(f"SELECT pg_advisory_lock({_LOCK_KEY})")
+    try:
+        yield
+    finally:
+        conn.exec_driver_sql(f"SELECT pg_advisory_unlock({_LOCK_KEY})")
+
+
+def _record(conn, migrations: list):
+    now = datetime.now(timezone.utc)
+    conn.execute(
+        insert_ignore_duplicates(schema_version),
+        [{"version": number, "name": name, "applied_at": now} for number, name, *_ in migrations],
+    )
+
+
+def migrate() -> list:
+    """Apply pending migrations in order; returns the names of those applied."""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version >= LATEST_VERSION:
+        if version > LATEST_VERSION:
+            logger.warning("Database schema is at version %d, newer than this release (%d)", version, LATEST_VERSION)
+        return []
+
+    # Autocommit: CREATE INDEX CONCURRENTLY can't run inside a transaction, and each
+    # step is idempotent, so one interrupted part-way is simply repeated next time
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT")
+        with _migration_lock(conn):
+            schema_version.create(conn, checkfirst=True)
+            version = current_version(conn)  # another worker may have migrated while we waited
+
+            if version == 0 and not inspect(conn).has_table(Report.__tablename__):
+                Base.metadata.create_all(conn)
+                _record(conn, MIGRATIONS)
+                logger.info("Created database schema at version %d", LATEST_VERSION)
+                return [name for _, name, _ in MIGRATIONS]
+
+            applied = []
+            for number, name, step in MIGRATIONS:
+                if number <= version:
+                    continue
+                start = time.perf_counter()
+                step(Schema(conn))
+                _record(conn, [(number, name)])
+                logger.info("Applied migration %d (%s) in %.0f ms", number, name, (time.perf_counter() - start) * 1000)
+                applied.append(name)
+            return applied
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, Text, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.database import Base
@@ -29,19 +29,31 @@ class Report(Base):
     block = Column(String(20), nullable=False)
     floor = Column(String(20), nullable=True)
     specific_location = Column(String(100), nullable=True)
-    date_reported = Column(String(20), nullable=False)
+    date_reported = Column(Date, nullable=False)
     image_path = Column(String(255), nullable=True)
+    image_hash = Column(String(64), nullable=True)  # SHA-256 of the upload; names its derivatives
     status = Column(String(20), nullable=False, default="pending")  # pending / match_found / closed
+    section = Column(String(20), nullable=True)  # the submitter's section, copied so admin filters skip the users join
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     user = relationship("User", back_populates="reports")
     lost_matches = relationship("Match", foreign_keys="Match.lost_report_id", back_populates="lost_report")
     found_matches = relationship("Match", foreign_keys="Match.found_report_id", back_populates="found_report")
+    image_feature = relationship(
+        "ImageFeature", back_populates="report", uselist=False, cascade="all, delete-orphan"
+    )
 
     __table_args__ = (
-        Index("ix_reports_created_at", "created_at"),
-        Index("ix_reports_status", "status"),
-        Index("ix_reports_type", "type"),
+        # Keyset pagination for admin listings, unfiltered and by the dashboard filters
+        Index("ix_reports_created_id", "created_at", "id"),
+        Index("ix_reports_status_type_created", "status", "type", "created_at", "id"),
+        Index("ix_reports_section_created", "section", "created_at", "id"),
+        # A student's own reports, newest first
+        Index("ix_reports_user_created", "user_id", "created_at"),
+        Index("ix_reports_image_hash", "image_hash"),
+        # Candidate pre-filtering in run_matching
+        Index("ix_reports_match_category", "type", "status", "category", "date_reported"),
+        Index("ix_reports_match_block", "type", "status", "block", "date_reported"),
     )
 
 
@@ -58,3 +70,95 @@ class Match(Base):
 
     lost_report = relationship("Report", foreign_keys=[lost_report_id], back_populates="lost_matches")
     found_report = relationship("Report", foreign_keys=[found_report_id], back_populates="found_matches")
+
+    __table_args__ = (
+        Index("uq_matches_lost_found", "lost_report_id", "found_report_id", unique=True),
+        Index("ix_matches_score_id", "combined_score", "id"),
+    )
+
+
+class ImageFeature(Base):
+    """Precomputed image descriptor for a report, so matching never re-decodes uploads."""
+    __tablename__ = "image_features"
+
+    # Stored for an upload that can't be decoded, so it is never retried
+    UNDECODABLE = b""
+
+    report_id = Column(Integer, ForeignKey("reports.id"), primary_key=True)
+    histogram = Column(LargeBinary, nullable=False)  # float32[512] normalized 8x8x8 HSV histogram, or UNDECODABLE
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    report = relationship("Report", back_populates="image_feature")
+
+
+class StoredImage(Base):
+    """One stored copy of an uploaded image, shared by every report that uploaded the same bytes."""
+    __tablename__ = "stored_images"
+
+    sha256 = Column(String(64), primary_key=True)
+    filename = Column(String(255), nullable=False)  # relative to UPLOAD_DIR
+    dhash = Column(String(16), nullable=True)  # 64-bit difference hash, hex
+    size = Column(Integer, nullable=False, default=0)
+    ref_count = Column(Integer, nullable=False, default=0)  # reports using this image
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class ReportCount(Base):
+    """
+    Reports per UTC creation day, submitter section, type and status — the admin
+    dashboard's counters, kept up to date as reports are created and change status.
+    """
+    __tablename__ = "report_counts"
+
+    day = Column(Date, primary_key=True)
+    section = Column(String(20), primary_key=True, default="")  # "" for users without one
+    type = Column(String(10), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class MatchCount(Base):
+    """Matches stored per UTC day, and how many of them scored at or above MATCH_THRESHOLD."""
+    __tablename__ = "match_counts"
+
+    day = Column(Date, primary_key=True)
+    stored = Column(Integer, nullable=False, default=0)
+    high = Column(Integer, nullable=False, default=0)
+
+
+class MatchJob(Base):
+    """Persisted AI matching job, so queued work survives restarts."""
+    __tablename__ = "match_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    report_id = Column(Integer, ForeignKey("reports.id"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="queued")  # queued / running / done / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    high_matches = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    __table_args__ = (
+        Index("ix_match_jobs_status", "status"),
+    )
+
+
+class WsEvent(Base):
+    """Outbound WebSocket event, relayed to every worker by the database broadcast backend."""
+    __tablename__ = "ws_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    origin = Column(String(32), nullable=False)  # publishing worker, which delivered it locally already
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_ws_events_created_at", "created_at"),
+        # Ids double as event sequence numbers, so SQLite must never reuse them after pruning
+        {"sqlite_autoincrement": True},
+    )
@@ -0,0 +1,192 @@
+"""
+Per-request SQL profiler (SQL_PROFILER, on by default in debug mode).
+
+Every statement executed while a request — or a background matching job — is
+running is attributed to it through a context variable. When a statement shape
+(the SQL with parameter lists collapsed) repeats SQL_PROFILER_N1_THRESHOLD
+times or more, the run is flagged as a likely N+1 and logged. Responses get
+Server-Timing and X-Request-ID headers; the full profile of a recent request
+can be fetched from /api/admin/profile/{request_id}.
+"""
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from app.metrics import route_label
+from app.config import SQL_PROFILER_N1_THRESHOLD, SQL_PROFILER_HISTORY, SQL_PROFILER_MAX_STATEMENTS
+
+logger = logging.getLogger(__name__)
+
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+|\$\d+))*\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """SQL with whitespace normalised, parameter lists collapsed and numeric literals replaced."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _PARAM_LIST.sub("(?)", shape)
+    return _NUMBER.sub("N", shape)
+
+
+class Profile:
+    """Statements attributed to one request or job."""
+
+    def __init__(self, profile_id: str, kind: str, name: str):
+        self.id = profile_id
+        self.kind = kind  # "request" / "job"
+        self.name = name
+        self.route = None
+        self.status = None
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.db_seconds = 0.0
+        self.count = 0
+        self.shapes = {}  # shape -> [count, seconds]
+        self.statements = []  # (offset ms, duration ms, shape), first SQL_PROFILER_MAX_STATEMENTS only
+
+    def record(self, statement: str, started: float, elapsed: float):
+        shape = statement_shape(statement)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            entry = self.shapes[shape] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        self.count += 1
+        self.db_seconds += elapsed
+        if len(self.statements) < SQL_PROFILER_MAX_STATEMENTS:
+            self.statements.append(((started - self.start) * 1000, elapsed * 1000, shape))
+
+    def repeated(self) -> list:
+        """Statement shapes executed at least SQL_PROFILER_N1_THRESHOLD times, most frequent first."""
+        return sorted(
+            ((shape, count, seconds) for shape, (count, seconds) in self.shapes.items()
+             if count >= SQL_PROFILER_N1_THRESHOLD),
+            key=lambda item: -item[1],
+        )
+
+    def server_timing(self) -> str:
+        elapsed = (time.perf_counter() - self.start) * 1000
+        queries = "query" if self.count == 1 else "queries"
+        return f'db;dur={self.db_seconds * 1000:.1f};desc="{self.count} {queries}", app;dur={elapsed:.1f}'
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "name": self.name,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "db_ms": round(self.db_seconds * 1000, 3),
+            "query_count": self.count,
+            "n_plus_one": [
+                {"statement": shape, "count": count, "total_ms": round(seconds * 1000, 3)}
+                for shape, count, seconds in self.repeated()
+            ],
+            "shapes": [
+                {"statement": shape, "count": count, "total_ms": round(seconds * 1000, 3)}
+                for shape, (count, seconds) in sorted(self.shapes.items(), key=lambda item: -item[1][1])
+            ],
+            "statements": [
+                {"offset_ms": round(offset, 3), "duration_ms": round(duration, 3), "statement": shape}
+                for offset, duration, shape in self.statements
+            ],
+            "statements_truncated": self.count > len(self.statements),
+        }
+
+
+current_profile: ContextVar[Optional[Profile]] = ContextVar("current_profile", default=None)
+
+# Most recent finished profiles, oldest evicted first
+_history = OrderedDict()
+_history_lock = threading.Lock()
+
+
+def get_profile(profile_id: str) -> Optional[dict]:
+    with _history_lock:
+        profile = _history.get(profile_id)
+    return profile.to_dict() if profile else None
+
+
+def _finish(profile: Profile):
+    profile.duration = time.perf_counter() - profile.start
+    repeated = profile.repeated()
+    if repeated:
+        shape, count, seconds = repeated[0]
+        logger.warning(
+            "Possible N+1 in %s %s (profile %s): %d× %s (%.1f ms); %d queries in total",
+            profile.kind, profile.route or profile.name, profile.id, count, shape[:200], seconds * 1000, profile.count,
+        )
+    with _history_lock:
+        _history[profile.id] = profile
+        _history.move_to_end(profile.id)
+        while len(_history) > SQL_PROFILER_HISTORY:
+            _history.popitem(last=False)
+
+
+@contextmanager
+def profiled(kind: str, name: str, profile_id: Optional[str] = None):
+    """Attribute statements run inside the block (and threads it hands work to) to a new profile."""
+    profile = Profile(profile_id or uuid.uuid4().hex[:16], kind, name)
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+        _finish(profile)
+
+
+def instrument_engine(engine) -> None:
+    """Record every statement on engine against the current profile, if any."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if current_profile.get() is not None:
+            conn.info["profile_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        profile = current_profile.get()
+        started = conn.info.pop("profile_start", None)
+        if profile is not None and started is not None:
+            profile.record(statement, started, time.perf_counter() - started)
+
+
+class SQLProfilerMiddleware:
+    """Profile every HTTP request and report it in Server-Timing / X-Request-ID headers."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        with profiled("request", f'{scope["method"]} {scope["path"]}') as profile:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    profile.status = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", profile.server_timing())
+                    headers.append("X-Request-ID", profile.id)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profile.route = f'{scope["method"]} {route_label(scope, root_path)}'
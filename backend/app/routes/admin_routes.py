@@ -1,106 +1,111 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Literal
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import User
-from app.auth import require_admin
-from app.schemas import ReportOut, MatchOut, StatusUpdate
-from app.services.admin_service import get_all_reports, get_all_matches, update_report_status
+from app.auth import require_admin, auth_cache_stats
+from app.schemas import ReportPage, MatchPage, StatusUpdate, MatchJobOut, DashboardStats
+from app.serialization import FastJSONResponse, report_row, match_row
+from app.services.admin_service import (
+    get_all_reports, get_all_matches, update_report_status, get_dashboard_stats,
+)
+from app.services.export_service import stream_reports, stream_matches, EXPORT_FORMATS
+from app.services.password_service import password_pool
+from app.websocket_manager import manager
+from app.services.job_service import list_jobs, get_job, reset_job, matching_queue
+from app.profiler import get_profile
+from app.config import ADMIN_PAGE_SIZE, ADMIN_PAGE_MAX, SQL_PROFILER
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 
-@router.get("/reports", response_model=list[ReportOut])
+@router.get("/reports", response_model=ReportPage)
 def admin_reports(
     section: str = Query(None),
     time_filter: str = Query(None),
     status: str = Query(None),
     report_type: str = Query(None),
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=ADMIN_PAGE_MAX),
+    cursor: str = Query(None),
     db: Session = Depends(get_db),
     admin: User = Depends(require_admin),
 ):
-    """Get all reports with optional filters (admin only)."""
-    reports = get_all_reports(db, section, time_filter, status, report_type)
-    result = []
-    for r in reports:
-        result.append(ReportOut(
-            id=r.id,
-            user_id=r.user_id,
-            type=r.type,
-            item_name=r.item_name,
-            category=r.category,
-            description=r.description,
-            block=r.block,
-            floor=r.floor,
-            specific_location=r.specific_location,
-            date_reported=r.date_reported,
-            image_path=r.image_path,
-            status=r.status,
-            created_at=r.created_at,
-            username=r.user.username if r.user else None,
-            section=r.user.section if r.user else None,
-        ))
-    return result
-
-
-@router.get("/matches", response_model=list[MatchOut])
+    """Get a page of reports with optional filters, newest first (admin only)."""
+    try:
+        reports, next_cursor = get_all_reports(db, section, time_filter, status, report_type, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({"items": [report_row(r) for r in reports], "next_cursor": next_cursor})
+
+
+@router.get("/stats", response_model=DashboardStats)
+def admin_stats(
+    section: str = Query(None),
+    time_filter: str = Query(None),
+    status: str = Query(None),
+    report_type: str = Query(None),
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """Dashboard totals for the same filters as /reports, from precomputed daily counters (admin only)."""
+    return FastJSONResponse(get_dashboard_stats(db, section, time_filter, status, report_type))
+
+
+@router.get("/matches", response_model=MatchPage)
 def admin_matches(
+    min_score: float = Query(None, ge=0.0, le=1.0),
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=ADMIN_PAGE_MAX),
+    cursor: str = Query(None),
     db: Session = Depends(get_db),
     admin: User = Depends(require_admin),
 ):
-    """Get all AI matches with scores (admin only)."""
-    matches = get_all_matches(db)
-    result = []
-    for m in matches:
-        lost_r = m.lost_report
-        found_r = m.found_report
-        result.append(MatchOut(
-            id=m.id,
-            lost_report_id=m.lost_report_id,
-            found_report_id=m.found_report_id,
-            image_similarity=m.image_similarity,
-            text_similarity=m.text_similarity,
-            combined_score=m.combined_score,
-            created_at=m.created_at,
-            lost_report=ReportOut(
-                id=lost_r.id,
-                user_id=lost_r.user_id,
-                type=lost_r.type,
-                item_name=lost_r.item_name,
-                category=lost_r.category,
-                description=lost_r.description,
-                block=lost_r.block,
-                floor=lost_r.floor,
-                specific_location=lost_r.specific_location,
-                date_reported=lost_r.date_reported,
-                image_path=lost_r.image_path,
-                status=lost_r.status,
-                created_at=lost_r.created_at,
-                username=lost_r.user.username if lost_r.user else None,
-                section=lost_r.user.section if lost_r.user else None,
-            ) if lost_r else None,
-            found_report=ReportOut(
-                id=found_r.id,
-                user_id=found_r.user_id,
-                type=found_r.type,
-                item_name=found_r.item_name,
-                category=found_r.category,
-                description=found_r.description,
-                block=found_r.block,
-                floor=found_r.floor,
-                specific_location=found_r.specific_location,
-                date_reported=found_r.date_reported,
-                image_path=found_r.image_path,
-                status=found_r.status,
-                created_at=found_r.created_at,
-                username=found_r.user.username if found_r.user else None,
-                section=found_r.user.section if found_r.user else None,
-            ) if found_r else None,
-        ))
-    return result
+    """Get a page of AI matches with scores, highest first (admin only)."""
+    try:
+        matches, next_cursor = get_all_matches(db, min_score, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({"items": [match_row(m) for m in matches], "next_cursor": next_cursor})
+
+
+def _export_response(body, name: str, fmt: str) -> StreamingResponse:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}-{stamp}.{fmt}"'},
+    )
+
+
+@router.get("/export/reports")
+def export_reports(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    section: str = Query(None),
+    time_filter: str = Query(None),
+    status: str = Query(None),
+    report_type: str = Query(None),
+    admin: User = Depends(require_admin),
+):
+    """Stream every report matching the filters as NDJSON or CSV (admin only)."""
+    return _export_response(
+        stream_reports(format, section, time_filter, status, report_type), "reports", format
+    )
+
+
+@router.get("/export/matches")
+def export_matches(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    min_score: float = Query(None, ge=0.0, le=1.0),
+    admin: User = Depends(require_admin),
+):
+    """Stream every AI match as NDJSON or CSV (admin only)."""
+    return _export_response(stream_matches(format, min_score), "matches", format)
 
 
 @router.patch("/reports/{report_id}/status")
-def change_status(
+async def change_status(
     report_id: int,
     body: StatusUpdate,
     db: Session = Depends(get_db),
@@ -108,9 +113,71 @@ def change_status(
 ):
     """Update report status (admin only). Valid: pending→match_found→closed."""
     try:
-        report = update_report_status(db, report_id, body.status)
+        report = await asyncio.to_thread(update_report_status, db, report_id, body.status)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
+    await manager.broadcast({"event": "status_changed", "report_id": report.id, "status": report.status})
     return {"message": "Status updated", "new_status": report.status}
+
+
+@router.get("/jobs", response_model=list[MatchJobOut])
+def admin_jobs(
+    status: str = Query(None),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """List AI matching jobs, most recent first (admin only)."""
+    return list_jobs(db, status, limit)
+
+
+@router.get("/jobs/{job_id}", response_model=MatchJobOut)
+def admin_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """Inspect a single AI matching job (admin only)."""
+    job = get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/retry", response_model=MatchJobOut)
+def retry_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """Requeue a failed AI matching job (admin only)."""
+    try:
+        job = reset_job(db, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    matching_queue.submit(job.id)
+    return job
+
+
+@router.get("/cache-stats")
+def cache_stats(admin: User = Depends(require_admin)):
+    """Authentication cache hit/miss counters, password pool and WebSocket load (admin only)."""
+    return {"auth": auth_cache_stats(), "password_pool": password_pool.stats(), "websocket": manager.stats()}
+
+
+@router.get("/profile/{request_id}")
+def sql_profile(request_id: str, admin: User = Depends(require_admin)):
+    """
+    SQL profile of a recent request (id from its X-Request-ID header) or matching
+    job ("job-<id>"): every statement, grouped shapes and likely N+1s (admin only).
+    """
+    if not SQL_PROFILER:
+        raise HTTPException(status_code=404, detail="SQL profiler is disabled (set SQL_PROFILER=true)")
+    profile = get_profile(request_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found (it may have been evicted)")
+    return FastJSONResponse(profile)
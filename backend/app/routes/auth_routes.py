@@ -1,21 +1,45 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import User
 from app.schemas import LoginRequest, LoginResponse, UserOut
-from app.auth import verify_password, create_access_token
+from app.auth import create_access_token, remember_user
+from app.services.password_service import password_pool, PasswordPoolBusy
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
+def _find_user(db: Session, username: str) -> User:
+    """Load a user and hand the connection back to the pool before the bcrypt wait."""
+    try:
+        return db.query(User).filter(User.username == username).first()
+    finally:
+        db.close()
+
+
 @router.post("/login", response_model=LoginResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: Session = Depends(get_db)):
     """Authenticate user and return JWT token."""
-    user = db.query(User).filter(User.username == request.username).first()
-    if not user or not verify_password(request.password, user.password_hash):
+    user = await asyncio.to_thread(_find_user, db, request.username)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    # bcrypt runs in the password process pool, never in the request threadpool
+    try:
+        valid = await password_pool.verify(request.password, user.password_hash)
+    except PasswordPoolBusy as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many logins in progress, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token = create_access_token(data={"sub": user.username, "role": user.role})
+    # The user row is already loaded; prime the cache for the requests that follow
+    remember_user(user)
     return LoginResponse(
         access_token=token,
         user=UserOut(
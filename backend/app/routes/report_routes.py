@@ -1,17 +1,17 @@
 import asyncio
-import logging
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import User
 from app.auth import get_current_user
 from app.schemas import ReportOut
-from app.services.report_service import create_report, get_user_reports
-from app.services.matching_service import run_matching
+from app.serialization import FastJSONResponse, report_dict, report_row
+from app.services.report_service import (
+    create_report, get_user_reports, validate_upload, validate_report_date, save_upload, discard_upload,
+)
+from app.services.job_service import matching_queue
 from app.websocket_manager import manager
 
-logger = logging.getLogger(__name__)
-
 router = APIRouter(prefix="/api/reports", tags=["reports"])
 
 
@@ -42,58 +42,30 @@ async def submit_report(
         "block": block,
         "floor": floor,
         "specific_location": specific_location,
-        "date_reported": date_reported,
+        "date_reported": validate_report_date(date_reported),
     }
 
-    # create_report includes file validation (size, type, extension)
-    report = await asyncio.to_thread(create_report, db, current_user, data, image)
-
-    # Run AI matching in a thread to avoid blocking the event loop
+    # The image is streamed to disk on the event loop (size and format checked as it
+    # arrives); the insert and thumbnail generation run in a worker thread
+    image_path = image_hash = None
+    if image and image.filename:
+        validate_upload(image)
+        image_path, image_hash = await save_upload(image)
     try:
-        high_matches = await asyncio.to_thread(run_matching, db, report)
-    except Exception:
-        logger.exception("AI matching failed for report %d", report.id)
-        high_matches = []
+        report, job_id = await asyncio.to_thread(create_report, db, current_user, data, image_path, image_hash)
+    except BaseException:
+        if image_path:
+            await discard_upload(image_path)
+        raise
+    report_out = report_dict(report, current_user)
+
+    # AI matching runs in the background queue; admins are notified when it completes
+    matching_queue.submit(job_id)
 
     # Broadcast to admin dashboard via WebSocket
-    await manager.broadcast({
-        "event": "new_report",
-        "report": {
-            "id": report.id,
-            "type": report.type,
-            "item_name": report.item_name,
-            "category": report.category,
-            "description": report.description,
-            "block": report.block,
-            "floor": report.floor,
-            "status": report.status,
-            "created_at": str(report.created_at),
-            "username": current_user.username,
-            "section": current_user.section,
-            "image_path": report.image_path,
-        },
-        "high_matches": len(high_matches),
-    })
+    await manager.broadcast({"event": "new_report", "report": report_out, "job_id": job_id})
 
-    # Attach user info
-    report_out = ReportOut(
-        id=report.id,
-        user_id=report.user_id,
-        type=report.type,
-        item_name=report.item_name,
-        category=report.category,
-        description=report.description,
-        block=report.block,
-        floor=report.floor,
-        specific_location=report.specific_location,
-        date_reported=report.date_reported,
-        image_path=report.image_path,
-        status=report.status,
-        created_at=report.created_at,
-        username=current_user.username,
-        section=current_user.section,
-    )
-    return report_out
+    return FastJSONResponse(report_out)
 
 
 @router.get("/my", response_model=list[ReportOut])
@@ -102,24 +74,4 @@ def my_reports(
     current_user: User = Depends(get_current_user),
 ):
     """Get all reports submitted by the current user."""
-    reports = get_user_reports(db, current_user.id)
-    result = []
-    for r in reports:
-        result.append(ReportOut(
-            id=r.id,
-            user_id=r.user_id,
-            type=r.type,
-            item_name=r.item_name,
-            category=r.category,
-            description=r.description,
-            block=r.block,
-            floor=r.floor,
-            specific_location=r.specific_location,
-            date_reported=r.date_reported,
-            image_path=r.image_path,
-            status=r.status,
-            created_at=r.created_at,
-            username=current_user.username,
-            section=current_user.section,
-        ))
-    return result
+    return FastJSONResponse([report_row(r) for r in get_user_reports(db, current_user.id)])
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional, Literal
-from datetime import datetime
+from datetime import date, datetime
 
 
 # ── Auth ──────────────────────────────────────────
@@ -35,7 +35,7 @@ class ReportCreate(BaseModel):
     block: str = Field(..., min_length=1, max_length=50)
     floor: Optional[str] = Field(None, max_length=50)
     specific_location: Optional[str] = Field(None, max_length=100)
-    date_reported: str = Field(..., max_length=20)
+    date_reported: date
 
 
 class ReportOut(BaseModel):
@@ -48,8 +48,11 @@ class ReportOut(BaseModel):
     block: str
     floor: Optional[str] = None
     specific_location: Optional[str] = None
-    date_reported: str
+    date_reported: date
     image_path: Optional[str] = None
+    image_hash: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    preview_url: Optional[str] = None
     status: str
     created_at: Optional[datetime] = None
     username: Optional[str] = None
@@ -75,6 +78,49 @@ class MatchOut(BaseModel):
         from_attributes = True
 
 
+# ── Pagination ────────────────────────────────────
+class ReportPage(BaseModel):
+    items: list[ReportOut]
+    next_cursor: Optional[str] = None
+
+
+class MatchPage(BaseModel):
+    items: list[MatchOut]
+    next_cursor: Optional[str] = None
+
+
+# ── Dashboard Stats ───────────────────────────────
+class MatchTotals(BaseModel):
+    stored: int
+    high: int
+
+
+class DashboardStats(BaseModel):
+    total: int
+    pending: int
+    matched: int
+    closed: int
+    lost: int
+    found: int
+    by_section: dict[str, int]
+    matches: MatchTotals
+
+
+# ── Matching Jobs ─────────────────────────────────
+class MatchJobOut(BaseModel):
+    id: int
+    report_id: int
+    status: str
+    attempts: int
+    high_matches: int
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # ── Admin ─────────────────────────────────────────
 class StatusUpdate(BaseModel):
     status: Literal["pending", "match_found", "closed"]
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
-from app.models import User
-from app.auth import hash_password
+from app.models import User, Report
+from app.auth import hash_passwords, invalidate_user_cache
 
 
 def get_section(roll_number: str) -> str:
@@ -28,29 +28,40 @@ PREDEFINED_USERS = [
 
 
 def seed_users(db: Session):
-    """Seed predefined users if they don't already exist."""
-    for user_data in PREDEFINED_USERS:
-        existing = db.query(User).filter(User.username == user_data["username"]).first()
-        if existing:
-            # Update section if it has changed
-            new_section = user_data.get("section")
-            if new_section and existing.section != new_section:
-                existing.section = new_section
-            continue
+    """
+    Seed predefined users if they don't already exist.
+    One query finds the existing rows; only missing users are hashed, in parallel.
+    """
+    wanted = {u["username"]: u for u in PREDEFINED_USERS}
+    existing = {u.username: u for u in db.query(User).filter(User.username.in_(wanted))}
 
+    for username, user in existing.items():
+        # Update section if it has changed
+        new_section = wanted[username].get("section")
+        if new_section and user.section != new_section:
+            user.section = new_section
+            # Reports carry a copy of their submitter's section for the admin filters
+            db.query(Report).filter(Report.user_id == user.id).update(
+                {"section": new_section}, synchronize_session=False,
+            )
+
+    missing = [u for name, u in wanted.items() if name not in existing]
+    hashes = hash_passwords([u["password"] for u in missing]) if missing else []
+    for user_data, password_hash in zip(missing, hashes):
         # Use explicit section from user_data, fallback to auto-detect
         section = user_data.get("section")
         if not section and user_data["role"] == "student":
             section = get_section(user_data["username"])
 
-        user = User(
+        db.add(User(
             username=user_data["username"],
-            password_hash=hash_password(user_data["password"]),
+            password_hash=password_hash,
             role=user_data["role"],
             department=user_data["department"],
             section=section,
-        )
-        db.add(user)
+        ))
 
     db.commit()
-    print("✅ Users seeded successfully.")
+    # Seeding may rewrite rows that requests have already cached
+    invalidate_user_cache()
+    print(f"✅ Users seeded successfully ({len(missing)} created).")
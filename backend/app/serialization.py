@@ -0,0 +1,120 @@
+"""
+Fast serialization path for listing endpoints.
+
+Listing routes select plain column tuples (no ORM identity map), turn them
+into dicts shaped like schemas.ReportOut / schemas.MatchOut, and return a
+FastJSONResponse directly. Returning a Response skips FastAPI's
+response_model validation, so the models stay on the routes for OpenAPI docs
+only and the field lists below must be kept in step with them. thumbnail_url
+and preview_url are not columns; they are derived from image_hash.
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from app.models import Report, Match, User
+from app.services.image_service import thumbnail_urls
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+# ── Column lists ──────────────────────────────────
+REPORT_FIELDS = (
+    "id", "user_id", "type", "item_name", "category", "description", "block", "floor",
+    "specific_location", "date_reported", "image_path", "image_hash", "status", "section", "created_at",
+)
+USER_FIELDS = ("username",)
+REPORT_OUT_FIELDS = REPORT_FIELDS + USER_FIELDS
+
+MATCH_FIELDS = (
+    "id", "lost_report_id", "found_report_id", "image_similarity",
+    "text_similarity", "combined_score", "created_at",
+)
+
+
+def report_columns(report=Report, user=User, prefix: str = "") -> list:
+    """ReportOut columns for a (possibly aliased) report joined to its user."""
+    columns = [getattr(report, name).label(prefix + name) for name in REPORT_FIELDS]
+    columns += [getattr(user, name).label(prefix + name) for name in USER_FIELDS]
+    return columns
+
+
+def select_reports():
+    """SELECT of ReportOut columns, reports joined to their submitters."""
+    return select(*report_columns()).join(User, Report.user_id == User.id)
+
+
+def select_matches():
+    """SELECT of MatchOut columns: the match, then the lost and found report columns."""
+    lost, found = aliased(Report), aliased(Report)
+    lost_user, found_user = aliased(User), aliased(User)
+    return (
+        select(
+            *(getattr(Match, name) for name in MATCH_FIELDS),
+            *report_columns(lost, lost_user, "lost_"),
+            *report_columns(found, found_user, "found_"),
+        )
+        .join(lost, Match.lost_report_id == lost.id)
+        .join(found, Match.found_report_id == found.id)
+        .outerjoin(lost_user, lost.user_id == lost_user.id)
+        .outerjoin(found_user, found.user_id == found_user.id)
+    )
+
+
+# ── Row → dict ────────────────────────────────────
+_REPORT_WIDTH = len(REPORT_OUT_FIELDS)
+_MATCH_WIDTH = len(MATCH_FIELDS)
+
+
+def _report_out(values) -> dict:
+    data = dict(zip(REPORT_OUT_FIELDS, values))
+    data.update(thumbnail_urls(data["image_hash"]))
+    return data
+
+
+def report_row(row) -> dict:
+    """ReportOut-shaped dict from a select_reports() row."""
+    return _report_out(row)
+
+
+def match_row(row) -> dict:
+    """MatchOut-shaped dict (with nested reports) from a select_matches() row."""
+    data = dict(zip(MATCH_FIELDS, row))
+    lost_end = _MATCH_WIDTH + _REPORT_WIDTH
+    data["lost_report"] = _report_out(row[_MATCH_WIDTH:lost_end])
+    data["found_report"] = _report_out(row[lost_end:])
+    return data
+
+
+def report_dict(report: Report, user: User) -> dict:
+    """ReportOut-shaped dict from an ORM report and its submitter."""
+    data = {name: getattr(report, name) for name in REPORT_FIELDS}
+    data["username"] = user.username if user else None
+    data.update(thumbnail_urls(report.image_hash))
+    return data
+
+
+# ── Encoding ──────────────────────────────────────
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode to compact JSON; datetimes as ISO 8601, like Pydantic's JSON mode."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_json_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (falling back to the stdlib encoder)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,76 +1,218 @@
+import base64
+import json
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.orm import Session, joinedload
-from app.models import Report, Match, User
+from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import Session
+from app.models import Report, Match, ReportCount, MatchCount
+from app.serialization import select_reports, select_matches
+from app.services.matching_service import retire_report
+from app.services.stats_service import record_status_change
+from app.config import ADMIN_PAGE_SIZE
+
+
+def encode_cursor(*values) -> str:
+    """Opaque keyset cursor for the last row of a page."""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """Inverse of encode_cursor. Raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def time_filter_range(time_filter: str) -> tuple:
+    """
+    Half-open [start, end) bounds for a dashboard time filter, as naive UTC
+    datetimes like the stored created_at values; either is None if unbounded.
+    Unknown filters are unbounded. Every bound is a UTC midnight, so the
+    ranges also line up with the daily dashboard counters.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end = None
+
+    if time_filter == "today":
+        start = midnight
+    elif time_filter == "this_week":
+        start = midnight - timedelta(days=now.weekday())
+    elif time_filter == "last_week":
+        end = midnight - timedelta(days=now.weekday())
+        start = end - timedelta(days=7)
+    elif time_filter == "this_month":
+        start = midnight.replace(day=1)
+    elif time_filter == "last_month":
+        end = midnight.replace(day=1)
+        start = (end - timedelta(days=1)).replace(day=1)
+    elif time_filter == "this_year":
+        start = midnight.replace(month=1, day=1)
+    elif time_filter == "last_year":
+        end = midnight.replace(month=1, day=1)
+        start = end.replace(year=end.year - 1)
+
+    return start, end
+
+
+def time_filter_days(time_filter: str) -> tuple:
+    """(first, last) UTC days covered by a dashboard time filter (inclusive); either is None if unbounded."""
+    start, end = time_filter_range(time_filter)
+    return (start.date() if start else None), ((end - timedelta(days=1)).date() if end else None)
+
+
+def report_filters(section: str = None, time_filter: str = None, status: str = None, report_type: str = None) -> list:
+    """
+    WHERE conditions for the admin report filters. Each is an equality or a
+    plain range on a reports column, so the composite indexes on
+    (status, type, created_at, id) and (section, created_at, id) apply.
+    """
+    conditions = []
+    if section:
+        conditions.append(Report.section == section)
+    if status:
+        conditions.append(Report.status == status)
+    if report_type:
+        conditions.append(Report.type == report_type)
+    if time_filter:
+        start, end = time_filter_range(time_filter)
+        if start:
+            conditions.append(Report.created_at >= start)
+        if end:
+            conditions.append(Report.created_at < end)
+    return conditions
 
 
-def get_all_reports(
+def get_dashboard_stats(
     db: Session,
     section: str = None,
     time_filter: str = None,
     status: str = None,
     report_type: str = None,
-) -> list:
-    """Get all reports with optional filters. Eagerly loads user to avoid N+1."""
-    query = (
-        db.query(Report)
-        .options(joinedload(Report.user))
-        .join(User, Report.user_id == User.id)
-    )
+) -> dict:
+    """
+    Report totals for the dashboard header, with the same filters as
+    get_all_reports, summed from the daily counters instead of the reports table.
+    """
+    query = db.query(
+        ReportCount.section, ReportCount.type, ReportCount.status, func.sum(ReportCount.count),
+    ).group_by(ReportCount.section, ReportCount.type, ReportCount.status)
+    matches = db.query(func.sum(MatchCount.stored), func.sum(MatchCount.high))
 
     if section:
-        query = query.filter(User.section == section)
-
+        query = query.filter(ReportCount.section == section)
     if status:
-        query = query.filter(Report.status == status)
-
+        query = query.filter(ReportCount.status == status)
     if report_type:
-        query = query.filter(Report.type == report_type)
-
+        query = query.filter(ReportCount.type == report_type)
     if time_filter:
-        now = datetime.now(timezone.utc)
-        start = None
-        end = now
-
-        if time_filter == "today":
-            start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif time_filter == "this_week":
-            start = now - timedelta(days=now.weekday())
-            start = start.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif time_filter == "last_week":
-            start = now - timedelta(days=now.weekday() + 7)
-            start = start.replace(hour=0, minute=0, second=0, microsecond=0)
-            end = now - timedelta(days=now.weekday())
-            end = end.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif time_filter == "this_month":
-            start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        elif time_filter == "last_month":
-            first_this_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            end = first_this_month
-            start = (first_this_month - timedelta(days=1)).replace(day=1)
-        elif time_filter == "this_year":
-            start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        elif time_filter == "last_year":
-            start = now.replace(year=now.year - 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-            end = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        first, last = time_filter_days(time_filter)
+        if first:
+            query = query.filter(ReportCount.day >= first)
+            matches = matches.filter(MatchCount.day >= first)
+        if last:
+            query = query.filter(ReportCount.day <= last)
+            matches = matches.filter(MatchCount.day <= last)
+
+    stats = {"total": 0, "pending": 0, "matched": 0, "closed": 0, "lost": 0, "found": 0, "by_section": {}}
+    status_keys = {"pending": "pending", "match_found": "matched", "closed": "closed"}
+    for section_value, report_type_value, status_value, count in query:
+        count = int(count or 0)
+        stats["total"] += count
+        if status_value in status_keys:
+            stats[status_keys[status_value]] += count
+        if report_type_value in ("lost", "found"):
+            stats[report_type_value] += count
+        if section_value:
+            stats["by_section"][section_value] = stats["by_section"].get(section_value, 0) + count
+
+    stored, high = matches.one()
+    stats["matches"] = {"stored": int(stored or 0), "high": int(high or 0)}
+    return stats
 
-        if start:
-            query = query.filter(Report.created_at >= start)
-        query = query.filter(Report.created_at <= end)
-
-    return query.order_by(Report.created_at.desc()).all()
-
-
-def get_all_matches(db: Session) -> list:
-    """Get all matches with related reports eagerly loaded."""
-    return (
-        db.query(Match)
-        .options(
-            joinedload(Match.lost_report).joinedload(Report.user),
-            joinedload(Match.found_report).joinedload(Report.user),
-        )
-        .order_by(Match.combined_score.desc())
-        .all()
+
+def get_all_reports(
+    db: Session,
+    section: str = None,
+    time_filter: str = None,
+    status: str = None,
+    report_type: str = None,
+    limit: int = ADMIN_PAGE_SIZE,
+    cursor: str = None,
+) -> tuple:
+    """
+    One page of reports (newest first) with optional filters, as ReportOut
+    column rows (see app.serialization). Returns (rows, next_cursor).
+    """
+    query = select_reports().where(*report_filters(section, time_filter, status, report_type))
+
+    if cursor:
+        created_raw, last_id = decode_cursor(cursor)
+        try:
+            last_created = datetime.fromisoformat(created_raw)
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+        query = query.where(or_(
+            Report.created_at < last_created,
+            and_(Report.created_at == last_created, Report.id < last_id),
+        ))
+
+    rows = db.execute(query.order_by(Report.created_at.desc(), Report.id.desc()).limit(limit + 1)).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def get_all_matches(
+    db: Session,
+    min_score: float = None,
+    limit: int = ADMIN_PAGE_SIZE,
+    cursor: str = None,
+) -> tuple:
+    """
+    One page of matches (highest score first) with both reports joined in, as
+    MatchOut column rows (see app.serialization). Returns (rows, next_cursor).
+    """
+    query = select_matches()
+
+    if min_score is not None:
+        query = query.where(Match.combined_score >= min_score)
+
+    if cursor:
+        last_score, last_id = decode_cursor(cursor)
+        try:
+            last_score = float(last_score)
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+        query = query.where(or_(
+            Match.combined_score < last_score,
+            and_(Match.combined_score == last_score, Match.id < last_id),
+        ))
+
+    rows = db.execute(query.order_by(Match.combined_score.desc(), Match.id.desc()).limit(limit + 1)).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].combined_score, rows[-1].id)
+
+
+def get_report_matches(db: Session, report_id: int, limit: int = ADMIN_PAGE_SIZE) -> list:
+    """Best-scoring matches involving one report, as MatchOut column rows (highest first)."""
+    query = (
+        select_matches()
+        .where(or_(Match.lost_report_id == report_id, Match.found_report_id == report_id))
+        .order_by(Match.combined_score.desc(), Match.id.desc())
+        .limit(limit)
     )
+    return db.execute(query).all()
 
 
 def update_report_status(db: Session, report_id: int, new_status: str) -> Report:
@@ -88,7 +230,11 @@ def update_report_status(db: Session, report_id: int, new_status: str) -> Report
     if new_status not in allowed:
         raise ValueError(f"Cannot transition from '{report.status}' to '{new_status}'")
 
+    old_status = report.status
     report.status = new_status
+    record_status_change(db, report, old_status)
     db.commit()
     db.refresh(report)
+    # Only pending reports are matching candidates
+    retire_report(report.id)
     return report
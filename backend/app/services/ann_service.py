@@ -0,0 +1,167 @@
+import logging
+import threading
+from typing import Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from app.models import Report, ImageFeature
+from app.database import SessionLocal
+from app.utils.ai_utils import histogram_from_bytes, HIST_SIZE
+from app.utils.ann_index import IVFIndex
+from app.config import ANN_DIR, ANN_NLIST, ANN_NPROBE, ANN_TEXT_DIM
+
+logger = logging.getLogger(__name__)
+
+REPORT_TYPES = ("lost", "found")
+
+
+def image_embedding(hist: np.ndarray) -> np.ndarray:
+    """Mean-centered histogram, so the inner product of unit vectors equals HISTCMP_CORREL."""
+    hist = np.asarray(hist, dtype=np.float32)
+    return hist - hist.mean()
+
+
+class ReportIndex:
+    """
+    Approximate nearest-neighbour shortlists over pending reports, one index per
+    report type and modality.
+
+    Image indexes hold centered histograms and are persisted under ANN_DIR.
+    Text indexes hold a fixed random projection of each report's TF-IDF vector;
+    the vocabulary changes whenever the text model is refitted, so they are
+    rebuilt from the model after every fit instead of being persisted.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.image = {t: IVFIndex(HIST_SIZE, ANN_NLIST, ANN_NPROBE) for t in REPORT_TYPES}
+        self.text = {t: IVFIndex(ANN_TEXT_DIM, ANN_NLIST, ANN_NPROBE) for t in REPORT_TYPES}
+        self._projection: Optional[np.ndarray] = None  # vocabulary x ANN_TEXT_DIM
+        self.loaded = False
+
+    def size(self, report_type: str) -> int:
+        return max(len(self.image[report_type]), len(self.text[report_type]))
+
+    # ── Maintenance ───────────────────────────────
+    def add(self, report: Report, hist: Optional[np.ndarray], text_vector) -> None:
+        if hist is not None:
+            self.image[report.type].add(report.id, image_embedding(hist))
+        projected = self._project(text_vector)
+        if projected is not None:
+            self.text[report.type].add(report.id, projected)
+
+    def remove(self, report_id: int) -> None:
+        for index in (*self.image.values(), *self.text.values()):
+            index.remove(report_id)
+
+    def rebuild_text(self, report_ids: list, matrix, report_types: dict) -> None:
+        """Re-project every cached TF-IDF row after a text model fit."""
+        if matrix is None:
+            return
+        rng = np.random.default_rng(0)
+        projection = rng.standard_normal((matrix.shape[1], ANN_TEXT_DIM)).astype(np.float32)
+        projected = np.asarray(matrix @ projection)
+
+        indexes = {t: IVFIndex(ANN_TEXT_DIM, ANN_NLIST, ANN_NPROBE) for t in REPORT_TYPES}
+        for row, report_id in enumerate(report_ids):
+            report_type = report_types.get(report_id)
+            if report_type in indexes:
+                indexes[report_type].add(report_id, projected[row])
+        for index in indexes.values():
+            index.train()
+
+        with self._lock:
+            self._projection = projection
+            self.text = indexes
+
+    def rebuild_image(self, db: Session) -> int:
+        """Rebuild the image indexes from stored features of every pending report."""
+        indexes = {t: IVFIndex(HIST_SIZE, ANN_NLIST, ANN_NPROBE) for t in REPORT_TYPES}
+        count = self._add_features(indexes, self._pending_image_query(db))
+        for index in indexes.values():
+            index.train()
+        self.image = indexes
+        self.loaded = True
+        return count
+
+    def load_or_build(self, db: Session) -> None:
+        """
+        Load persisted image indexes (or build them if missing), then reconcile
+        with the database so reports added or closed since the last save are correct.
+        """
+        try:
+            indexes = {t: IVFIndex.load(ANN_DIR / f"image_{t}.npz") for t in REPORT_TYPES}
+        except (OSError, KeyError, ValueError):
+            count = self.rebuild_image(db)
+            self.save()
+            logger.info("Built ANN image indexes from %d stored features", count)
+            return
+
+        pending = {row.id: row.type for row in self._pending_image_query(db).with_entities(Report.id, Report.type)}
+        stale = 0
+        for index in indexes.values():
+            for report_id in [i for i in index.ids() if i not in pending]:
+                index.remove(report_id)
+                stale += 1
+        missing = [i for i, t in pending.items() if t in indexes and i not in indexes[t]]
+        added = 0
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            added += self._add_features(indexes, self._pending_image_query(db).filter(Report.id.in_(chunk)))
+        self.image = indexes
+        self.loaded = True
+        logger.info(
+            "Loaded ANN image indexes (%s; +%d missing, -%d stale)",
+            ", ".join(f"{t}={len(i)}" for t, i in indexes.items()), added, stale,
+        )
+
+    @staticmethod
+    def _pending_image_query(db: Session):
+        return (
+            db.query(Report.id, Report.type, ImageFeature.histogram)
+            .join(ImageFeature, ImageFeature.report_id == Report.id)
+            .filter(Report.status == "pending", ImageFeature.histogram != ImageFeature.UNDECODABLE)
+        )
+
+    @staticmethod
+    def _add_features(indexes: dict, query) -> int:
+        count = 0
+        for report_id, report_type, data in query.yield_per(1000):
+            index = indexes.get(report_type)
+            if index is not None and index.add(report_id, image_embedding(histogram_from_bytes(data))):
+                count += 1
+        return count
+
+    def save(self) -> None:
+        ANN_DIR.mkdir(parents=True, exist_ok=True)
+        for report_type, index in self.image.items():
+            index.save(ANN_DIR / f"image_{report_type}.npz")
+
+    # ── Queries ───────────────────────────────────
+    def shortlist(self, report_type: str, hist: Optional[np.ndarray], text_vector, k: int, exact: bool = False) -> set:
+        """Ids of the top-k reports of report_type by image and by text similarity (union)."""
+        ids = set()
+        if hist is not None:
+            ids.update(i for i, _ in self.image[report_type].search(image_embedding(hist), k, exact))
+        projected = self._project(text_vector)
+        if projected is not None:
+            ids.update(i for i, _ in self.text[report_type].search(projected, k, exact))
+        return ids
+
+    def _project(self, text_vector) -> Optional[np.ndarray]:
+        projection = self._projection
+        if text_vector is None or projection is None or text_vector.shape[1] != projection.shape[0]:
+            # No text index yet, or the model was refitted and the index not rebuilt yet
+            return None
+        return np.asarray(text_vector @ projection).ravel()
+
+
+report_index = ReportIndex()
+
+
+def load_report_index() -> None:
+    """Startup hook: load or build the persisted image indexes in their own session."""
+    db = SessionLocal()
+    try:
+        report_index.load_or_build(db)
+    finally:
+        db.close()
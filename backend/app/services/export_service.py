@@ -0,0 +1,104 @@
+import csv
+import io
+import logging
+from datetime import datetime
+from typing import Iterator
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from app.database import SessionLocal
+from app.models import Report, Match, User
+from app.serialization import select_reports, dumps
+from app.services.admin_service import report_filters
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip; on PostgreSQL this also enables a server-side cursor
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _report_export_query(section: str = None, time_filter: str = None, status: str = None, report_type: str = None):
+    stmt = select_reports().where(*report_filters(section, time_filter, status, report_type))
+    return stmt.order_by(Report.id)
+
+
+def _match_export_query(min_score: float = None):
+    lost = aliased(Report)
+    found = aliased(Report)
+    lost_user = aliased(User)
+    found_user = aliased(User)
+    stmt = (
+        select(
+            Match.id,
+            Match.lost_report_id,
+            Match.found_report_id,
+            Match.image_similarity,
+            Match.text_similarity,
+            Match.combined_score,
+            Match.created_at,
+            lost.item_name.label("lost_item_name"),
+            lost.status.label("lost_status"),
+            lost_user.username.label("lost_username"),
+            found.item_name.label("found_item_name"),
+            found.status.label("found_status"),
+            found_user.username.label("found_username"),
+        )
+        .join(lost, Match.lost_report_id == lost.id)
+        .join(found, Match.found_report_id == found.id)
+        .outerjoin(lost_user, lost.user_id == lost_user.id)
+        .outerjoin(found_user, found.user_id == found_user.id)
+    )
+    if min_score is not None:
+        stmt = stmt.where(Match.combined_score >= min_score)
+    return stmt.order_by(Match.id)
+
+
+def _stream_rows(stmt, fmt: str) -> Iterator[bytes]:
+    """
+    Execute stmt in a dedicated session and yield the encoded rows one batch at a time.
+
+    The request's session is closed before a streamed body is sent, so the
+    generator owns its own session for as long as the client keeps reading.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+
+        if fmt == "ndjson":
+            for batch in result.partitions():
+                yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in batch)
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for batch in result.partitions():
+            for row in batch:
+                writer.writerow(v.isoformat() if isinstance(v, datetime) else v for v in row)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    except Exception:
+        # Headers are already sent, so the client only sees a truncated body
+        logger.exception("Export stream aborted")
+        raise
+    finally:
+        db.close()
+
+
+def stream_reports(fmt: str, section: str = None, time_filter: str = None,
+                   status: str = None, report_type: str = None) -> Iterator[bytes]:
+    """Every report matching the admin filters, oldest first, as NDJSON or CSV."""
+    return _stream_rows(_report_export_query(section, time_filter, status, report_type), fmt)
+
+
+def stream_matches(fmt: str, min_score: float = None) -> Iterator[bytes]:
+    """Every AI match (with both reports' headline fields), oldest first, as NDJSON or CSV."""
+    return _stream_rows(_match_export_query(min_score), fmt)
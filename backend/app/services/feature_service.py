@@ -0,0 +1,101 @@
+import logging
+from sqlalchemy.orm import Session
+from app.models import Report, ImageFeature, StoredImage
+from app.utils.ai_utils import compute_histogram, histogram_to_bytes, histogram_from_bytes
+from app.services.image_service import matching_image_path
+
+logger = logging.getLogger(__name__)
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+_ID_CHUNK = 500
+
+
+def build_image_feature(image_path: str, image_hash: str = None) -> ImageFeature:
+    """Compute the histogram for an uploaded image (ImageFeature.UNDECODABLE if it can't be decoded)."""
+    hist = compute_histogram(str(matching_image_path(image_path, image_hash)))
+    if hist is None:
+        logger.warning("Could not decode image for features: %s", image_path)
+        return ImageFeature(histogram=ImageFeature.UNDECODABLE)
+    return ImageFeature(histogram=histogram_to_bytes(hist))
+
+
+def get_histograms(db: Session, reports: list) -> dict:
+    """
+    Return {report_id: histogram} for every report with a decodable image.
+    Missing features (e.g. uploads that predate the store) are computed once and
+    persisted, including the marker for images that failed to decode.
+    """
+    with_images = [r for r in reports if r.image_path]
+    histograms = {}
+    stored = set()
+
+    ids = [r.id for r in with_images]
+    for i in range(0, len(ids), _ID_CHUNK):
+        rows = (
+            db.query(ImageFeature.report_id, ImageFeature.histogram)
+            .filter(ImageFeature.report_id.in_(ids[i:i + _ID_CHUNK]))
+            .all()
+        )
+        for report_id, data in rows:
+            stored.add(report_id)
+            if data != ImageFeature.UNDECODABLE:
+                histograms[report_id] = histogram_from_bytes(data)
+
+    missing = [r for r in with_images if r.id not in stored]
+    for report in missing:
+        feature = build_image_feature(report.image_path, report.image_hash)
+        report.image_feature = feature
+        if feature.histogram != ImageFeature.UNDECODABLE:
+            histograms[report.id] = histogram_from_bytes(feature.histogram)
+    if missing:
+        db.commit()
+
+    return histograms
+
+
+def get_dhashes(db: Session, reports: list) -> dict:
+    """Return {report_id: dhash} for reports whose image is in the content store."""
+    ids = [r.id for r in reports if r.image_hash]
+    dhashes = {}
+    for i in range(0, len(ids), _ID_CHUNK):
+        rows = (
+            db.query(Report.id, StoredImage.dhash)
+            .join(StoredImage, StoredImage.sha256 == Report.image_hash)
+            .filter(Report.id.in_(ids[i:i + _ID_CHUNK]), StoredImage.dhash.isnot(None))
+            .all()
+        )
+        for report_id, dhash in rows:
+            dhashes[report_id] = int(dhash, 16)
+    return dhashes
+
+
+def backfill_image_features(db: Session, batch_size: int = 200) -> int:
+    """
+    Compute features for every report whose image has no stored histogram yet.
+    Returns how many were computed; images that can't be decoded are marked instead.
+    """
+    created = 0
+    last_id = 0
+    while True:
+        batch = (
+            db.query(Report)
+            .outerjoin(ImageFeature, ImageFeature.report_id == Report.id)
+            .filter(
+                Report.image_path.isnot(None),
+                ImageFeature.report_id.is_(None),
+                Report.id > last_id,
+            )
+            .order_by(Report.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        for report in batch:
+            report.image_feature = build_image_feature(report.image_path, report.image_hash)
+            if report.image_feature.histogram != ImageFeature.UNDECODABLE:
+                created += 1
+        last_id = batch[-1].id
+        db.commit()
+        logger.info("Backfilled image features up to report %d (%d so far)", last_id, created)
+    return created
@@ -0,0 +1,274 @@
+"""
+Upload processing and the content-addressed image store.
+
+Every image is decoded once, when it is saved, into a 256x256 PNG that
+matching reads instead of the original and a couple of web thumbnails for the
+dashboards. The files live under uploads/derived/ and are named after the
+SHA-256 of the original upload, so a URL never changes content (they are
+served as immutable).
+
+Uploads are deduplicated by that hash: the first copy of some content is
+kept and recorded as a StoredImage, and every later report with the same
+bytes points at it (ref_count tracks how many do) while its own copy is
+deleted.
+"""
+import hashlib
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import upsert
+from app.models import Report, StoredImage
+from app.utils.ai_utils import histogram_from_image, resize_for_matching, dhash_from_image
+from app.config import UPLOAD_DIR, DERIVED_DIR, THUMBNAIL_FORMAT, THUMBNAIL_QUALITY
+
+logger = logging.getLogger(__name__)
+
+MATCH_VARIANT = "match"
+# Longest side in pixels of each thumbnail variant (images are never upscaled)
+THUMBNAIL_SIZES = {"thumb": 160, "preview": 640}
+THUMBNAIL_EXT = ".jpg" if THUMBNAIL_FORMAT in ("jpg", "jpeg") else ".webp"
+
+
+# ── Naming ────────────────────────────────────────
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def derived_path(image_hash: str, variant: str) -> Path:
+    ext = ".png" if variant == MATCH_VARIANT else THUMBNAIL_EXT
+    return DERIVED_DIR / image_hash[:2] / f"{image_hash}-{variant}{ext}"
+
+
+def thumbnail_urls(image_hash: Optional[str]) -> dict:
+    """thumbnail_url / preview_url for a report's derivatives (None without an image_hash)."""
+    if not image_hash:
+        return {"thumbnail_url": None, "preview_url": None}
+    base = f"/uploads/derived/{image_hash[:2]}/{image_hash}"
+    return {
+        "thumbnail_url": f"{base}-thumb{THUMBNAIL_EXT}",
+        "preview_url": f"{base}-preview{THUMBNAIL_EXT}",
+    }
+
+
+# ── Processing ────────────────────────────────────
+def _encode(img: np.ndarray, ext: str) -> bytes:
+    import cv2
+
+    if ext == ".png":
+        params = [cv2.IMWRITE_PNG_COMPRESSION, 3]
+    elif ext == ".webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, THUMBNAIL_QUALITY]
+    else:
+        params = [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY]
+    ok, buffer = cv2.imencode(ext, img, params)
+    if not ok:
+        raise ValueError(f"Could not encode {ext} derivative")
+    return buffer.tobytes()
+
+
+def _write_atomic(dest: Path, data: bytes) -> None:
+    """Write via a temporary file so a concurrent reader never sees a partial image."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, dest)
+
+
+def _fit(img: np.ndarray, longest: int) -> np.ndarray:
+    import cv2
+
+    height, width = img.shape[:2]
+    scale = longest / max(height, width)
+    if scale >= 1:
+        return img
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def create_derivatives(image_path: str, image_hash: str) -> Optional[tuple]:
+    """
+    Write the matching image and thumbnails for an upload.
+    Returns (histogram, dhash), or None if the upload can't be decoded.
+    """
+    import cv2
+
+    variants = [MATCH_VARIANT, *THUMBNAIL_SIZES]
+    if all(derived_path(image_hash, v).exists() for v in variants):
+        # The same content was uploaded before; only the small matching image is decoded
+        img = cv2.imread(str(derived_path(image_hash, MATCH_VARIANT)))
+        if img is not None:
+            return histogram_from_image(img), dhash_from_image(img)
+
+    img = cv2.imread(str(UPLOAD_DIR / image_path))
+    if img is None:
+        return None
+    matching = resize_for_matching(img)
+    _write_atomic(derived_path(image_hash, MATCH_VARIANT), _encode(matching, ".png"))
+    for variant, longest in THUMBNAIL_SIZES.items():
+        _write_atomic(derived_path(image_hash, variant), _encode(_fit(img, longest), THUMBNAIL_EXT))
+    return histogram_from_image(matching), dhash_from_image(matching)
+
+
+def remove_upload_file(filename: str) -> None:
+    try:
+        os.remove(UPLOAD_DIR / filename)
+    except FileNotFoundError:
+        pass
+
+
+# ── Content store ─────────────────────────────────
+def store_image(db: Session, image_path: str, image_hash: str) -> Optional[tuple]:
+    """
+    Add a saved upload to the content store and generate its derivatives.
+
+    Returns (filename, histogram), where filename is the copy the report should
+    reference: image_path itself, or an earlier upload of the same bytes (the
+    caller deletes its own copy once the report is committed). The reference is
+    counted in the caller's transaction. None if the image can't be decoded.
+    """
+    processed = create_derivatives(image_path, image_hash)
+    if processed is None:
+        return None
+    hist, dhash = processed
+
+    table = StoredImage.__table__
+    db.execute(upsert(table, ["sha256"], {"ref_count": table.c.ref_count + 1}), {
+        "sha256": image_hash,
+        "filename": image_path,
+        "dhash": f"{dhash:016x}",
+        "size": (UPLOAD_DIR / image_path).stat().st_size,
+        "ref_count": 1,
+    })
+    filename = db.query(StoredImage.filename).filter(StoredImage.sha256 == image_hash).scalar()
+    if filename != image_path and not (UPLOAD_DIR / filename).exists():
+        # The stored copy went missing; this upload takes its place
+        db.query(StoredImage).filter(StoredImage.sha256 == image_hash).update({"filename": image_path})
+        filename = image_path
+    return filename, hist
+
+
+def matching_image_path(image_path: str, image_hash: Optional[str] = None) -> Path:
+    """The file histograms should be computed from: the 256x256 derivative when it exists."""
+    if image_hash:
+        derived = derived_path(image_hash, MATCH_VARIANT)
+        if derived.exists():
+            return derived
+    return UPLOAD_DIR / image_path
+
+
+def backfill_derivatives(db: Session, batch_size: int = 200) -> int:
+    """Hash, deduplicate and process every uploaded image that isn't in the content store yet."""
+    processed = 0
+    last_id = 0
+    while True:
+        batch = (
+            db.query(Report)
+            .outerjoin(StoredImage, StoredImage.sha256 == Report.image_hash)
+            .filter(Report.image_path.isnot(None), StoredImage.sha256.is_(None), Report.id > last_id)
+            .order_by(Report.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        redundant = []
+        for report in batch:
+            source = UPLOAD_DIR / report.image_path
+            if not source.exists():
+                logger.warning("Upload missing for report %d: %s", report.id, report.image_path)
+                continue
+            image_hash = file_sha256(source)
+            stored = store_image(db, report.image_path, image_hash)
+            if stored is None:
+                logger.warning("Could not decode upload for report %d: %s", report.id, report.image_path)
+                continue
+            if stored[0] != report.image_path:
+                redundant.append(report.image_path)
+                report.image_path = stored[0]
+            report.image_hash = image_hash
+            processed += 1
+        last_id = batch[-1].id
+        db.commit()
+        for filename in redundant:
+            remove_upload_file(filename)
+        logger.info(
+            "Processed uploads up to report %d (%d so far, %d duplicate files removed)",
+            last_id, processed, len(redundant),
+        )
+    return processed
+
+
+def prune_uploads(db: Session, grace_seconds: float = 3600, dry_run: bool = False) -> dict:
+    """
+    Recount StoredImage references and delete what nothing refers to any more:
+    stored images without reports, and originals, derivatives or partial
+    uploads left behind by failed submissions. Files younger than
+    grace_seconds are kept, since their report may not be committed yet.
+    """
+    result = {"recounted": 0, "released": 0, "files": 0, "bytes": 0}
+    refs = dict(
+        db.query(Report.image_hash, func.count())
+        .filter(Report.image_hash.isnot(None))
+        .group_by(Report.image_hash)
+        .all()
+    )
+    for image in db.query(StoredImage).all():
+        count = refs.get(image.sha256, 0)
+        if image.ref_count != count:
+            image.ref_count = count
+            result["recounted"] += 1
+        if count == 0:
+            db.delete(image)
+            result["released"] += 1
+    db.flush()
+
+    live_files = {row[0] for row in db.query(Report.image_path).filter(Report.image_path.isnot(None)).distinct()}
+    live_files.update(row[0] for row in db.query(StoredImage.filename))
+    live_hashes = set(refs)
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+
+    cutoff = time.time() - grace_seconds
+
+    def remove(path: Path):
+        stat = path.stat()
+        if stat.st_mtime > cutoff:
+            return
+        result["files"] += 1
+        result["bytes"] += stat.st_size
+        if not dry_run:
+            path.unlink(missing_ok=True)
+
+    for path in UPLOAD_DIR.iterdir():
+        if not path.is_file() or path.name in live_files:
+            continue
+        if path.name.startswith(".") and not path.name.endswith(".part"):
+            continue  # .gitkeep and the like
+        remove(path)
+    for path in DERIVED_DIR.glob("*/*"):
+        if path.is_file() and path.name.split("-", 1)[0] not in live_hashes:
+            remove(path)
+    if not dry_run:
+        for shard in DERIVED_DIR.iterdir():
+            if shard.is_dir() and not any(shard.iterdir()):
+                shard.rmdir()
+
+    logger.info(
+        "%s %d file(s) (%d bytes); released %d stored image(s), recounted %d",
+        "Would delete" if dry_run else "Deleted",
+        result["files"], result["bytes"], result["released"], result["recounted"],
+    )
+    return result
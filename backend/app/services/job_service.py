@@ -0,0 +1,286 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import MatchJob, Report
+from app.services.matching_service import run_matching
+from app.services.admin_service import get_report_matches
+from app.serialization import match_row
+from app.websocket_manager import manager
+from app.metrics import registry, MATCHING_QUEUE_DEPTH
+from app.profiler import profiled
+from app.config import (
+    MATCH_WORKERS, MATCH_MAX_ATTEMPTS, MATCH_RETRY_DELAY, MATCH_JOB_LEASE_SECONDS, ADMIN_PAGE_SIZE, SQL_PROFILER,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def list_jobs(db: Session, status: str = None, limit: int = 100) -> list:
+    """Most recent jobs first, optionally filtered by status."""
+    query = db.query(MatchJob)
+    if status:
+        query = query.filter(MatchJob.status == status)
+    return query.order_by(MatchJob.id.desc()).limit(limit).all()
+
+
+def get_job(db: Session, job_id: int) -> Optional[MatchJob]:
+    return db.query(MatchJob).filter(MatchJob.id == job_id).first()
+
+
+def reset_job(db: Session, job_id: int) -> Optional[MatchJob]:
+    """Requeue a failed job with a fresh attempt budget."""
+    job = get_job(db, job_id)
+    if not job:
+        return None
+    if job.status != "failed":
+        raise ValueError(f"Only failed jobs can be retried (job is '{job.status}')")
+    job.status = "queued"
+    job.attempts = 0
+    job.error = None
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def claim_job(db: Session, job_id: int) -> bool:
+    """
+    Move a queued job to running and count the attempt, in one conditional
+    UPDATE. False if it's already running elsewhere or finished, so a job
+    queued by two processes (or twice by recovery) still runs once.
+    """
+    claimed = db.execute(
+        update(MatchJob)
+        .where(MatchJob.id == job_id, MatchJob.status == "queued")
+        .values(status="running", attempts=MatchJob.attempts + 1, updated_at=_utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return claimed == 1
+
+
+def renew_lease(job_id: int):
+    """Heartbeat from the worker running a job, so it isn't taken for abandoned."""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(MatchJob)
+            .where(MatchJob.id == job_id, MatchJob.status == "running")
+            .values(updated_at=_utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _recoverable_job_ids(all_queued: bool = True) -> list:
+    """
+    Jobs to (re)queue: running ones whose lease expired — the process running
+    them died — go back to queued, or to failed once out of attempts. Returns
+    every queued job with all_queued, else only those nobody touched within
+    the lease (queued by a process that has since stopped).
+    """
+    cutoff = _utcnow() - timedelta(seconds=MATCH_JOB_LEASE_SECONDS)
+    expired = (MatchJob.status == "running", MatchJob.updated_at < cutoff)
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(MatchJob)
+            .where(*expired, MatchJob.attempts >= MATCH_MAX_ATTEMPTS)
+            .values(status="failed", error="Worker stopped before the job finished", updated_at=_utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        # updated_at kept (it would otherwise get its onupdate), so the cutoff below still selects them
+        requeued = db.execute(
+            update(MatchJob)
+            .where(*expired)
+            .values(status="queued", updated_at=MatchJob.updated_at)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if requeued:
+            logger.warning("Requeued %d matching job(s) whose lease expired", requeued)
+
+        query = db.query(MatchJob.id).filter(MatchJob.status == "queued")
+        if not all_queued:
+            query = query.filter(MatchJob.updated_at < cutoff)
+        return [row.id for row in query.order_by(MatchJob.id).all()]
+    finally:
+        db.close()
+
+
+def execute_job(job_id: int) -> Optional[dict]:
+    """
+    Run one matching job in its own session. Returns a snapshot of the finished
+    job, including the report's best matches for the dashboard delta.
+    With SQL_PROFILER on, its statements are profiled as "job-<id>".
+    """
+    with profiled("job", f"matching job {job_id}", f"job-{job_id}") if SQL_PROFILER else nullcontext():
+        return _execute_job(job_id)
+
+
+def _execute_job(job_id: int) -> Optional[dict]:
+    db = SessionLocal()
+    try:
+        if not claim_job(db, job_id):
+            return None
+        job = get_job(db, job_id)
+
+        matches = []
+        try:
+            report = db.query(Report).filter(Report.id == job.report_id).first()
+            if report is None:
+                raise ValueError(f"Report {job.report_id} no longer exists")
+            high_matches = run_matching(db, report)
+            job.status = "done"
+            job.high_matches = len(high_matches)
+            job.error = None
+            matches = [match_row(row) for row in get_report_matches(db, report.id, ADMIN_PAGE_SIZE + 1)]
+        except Exception as e:
+            logger.exception("AI matching failed for report %d (job %d)", job.report_id, job.id)
+            db.rollback()
+            job = get_job(db, job_id)
+            job.status = "queued" if job.attempts < MATCH_MAX_ATTEMPTS else "failed"
+            job.error = str(e)[:1000]
+        db.commit()
+
+        return {
+            "id": job.id,
+            "report_id": job.report_id,
+            "status": job.status,
+            "attempts": job.attempts,
+            "high_matches": job.high_matches,
+            "matches": matches,
+        }
+    finally:
+        db.close()
+
+
+class MatchingQueue:
+    """
+    In-process queue of matching jobs drained by a pool of workers.
+
+    Jobs are persisted in match_jobs before they are queued, so anything
+    queued when the process stops is picked up again on start. Workers renew
+    the lease of the job they run; one left running past MATCH_JOB_LEASE_SECONDS
+    by a process that died is requeued by whichever process sweeps first.
+    """
+
+    def __init__(self, workers: int = MATCH_WORKERS):
+        self.workers = max(1, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks = []
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="matching")
+        for job_id in await loop.run_in_executor(self._executor, _recoverable_job_ids):
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+        logger.info("Matching queue started (%d workers, %d recovered jobs)", self.workers, self._queue.qsize())
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, job_id: int):
+        """
+        Queue a persisted job. Safe to call from any thread, and before start()
+        (the job is then recovered from the table on start).
+        """
+        if self._queue is None:
+            logger.warning("Matching queue not running; job %d will run on next start", job_id)
+            return
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, job_id)
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id = await self._queue.get()
+            heartbeat = asyncio.create_task(self._heartbeat(job_id))
+            try:
+                result = await loop.run_in_executor(self._executor, execute_job, job_id)
+                if result:
+                    await self._finish(loop, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Matching worker crashed on job %d", job_id)
+            finally:
+                heartbeat.cancel()
+                self._queue.task_done()
+
+    async def _heartbeat(self, job_id: int):
+        while True:
+            await asyncio.sleep(MATCH_JOB_LEASE_SECONDS / 3)
+            try:
+                # Not on the matching executor: its threads may all be busy running jobs
+                await asyncio.to_thread(renew_lease, job_id)
+            except Exception:
+                logger.exception("Could not renew the lease of matching job %d", job_id)
+
+    async def _sweep(self):
+        """Periodically pick up jobs abandoned by other processes."""
+        while True:
+            await asyncio.sleep(MATCH_JOB_LEASE_SECONDS)
+            try:
+                for job_id in await asyncio.to_thread(_recoverable_job_ids, False):
+                    self._queue.put_nowait(job_id)
+            except Exception:
+                logger.exception("Matching job sweep failed")
+
+    async def _finish(self, loop, result: dict):
+        if result["status"] == "queued":
+            # Back off linearly between automatic retries
+            delay = MATCH_RETRY_DELAY * result["attempts"]
+            loop.call_later(delay, self.submit, result["id"])
+            return
+        if result["status"] != "done":
+            return
+        await manager.broadcast({
+            "event": "matching_complete",
+            "job_id": result["id"],
+            "report_id": result["report_id"],
+            "high_matches": result["high_matches"],
+        })
+        matches = result["matches"]
+        if matches:
+            # Dashboards merge these into their match list instead of refetching it
+            await manager.broadcast({
+                "event": "new_matches",
+                "report_id": result["report_id"],
+                "matches": matches[:ADMIN_PAGE_SIZE],
+                "truncated": len(matches) > ADMIN_PAGE_SIZE,
+            })
+
+
+matching_queue = MatchingQueue()
+
+
+@registry.collector
+def _queue_gauges():
+    MATCHING_QUEUE_DEPTH.set(matching_queue.depth)
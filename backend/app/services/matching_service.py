@@ -1,79 +1,297 @@
 import logging
+import random
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+import numpy as np
 from sqlalchemy.orm import Session
+from app.database import engine, insert_ignore_duplicates
 from app.models import Report, Match
-from app.utils.ai_utils import image_similarity, text_similarity, combined_score
-from app.config import UPLOAD_DIR, MATCH_THRESHOLD
+from app.utils.ai_utils import batch_scores, hamming_distances
+from app.services.feature_service import get_histograms, get_dhashes
+from app.services.text_service import query_vector, candidate_vectors, forget_report, refit_text_model
+from app.services.ann_service import report_index
+from app.services.stats_service import record_matches
+from app.metrics import Stopwatch, MATCHING_DURATION, MATCHING_PHASE, MATCHING_CANDIDATES
+from app.config import (
+    MATCH_THRESHOLD,
+    MATCH_FILTER_CATEGORY,
+    MATCH_FILTER_BLOCK,
+    MATCH_DATE_WINDOW_DAYS,
+    MATCH_DHASH_MAX_DISTANCE,
+    ANN_ENABLED,
+    ANN_MIN_POOL,
+    ANN_TOP_K,
+)
 
 logger = logging.getLogger(__name__)
 
+# Matches below this combined score are not stored at all
+MIN_STORED_SCORE = 0.05
+
+# Cumulative pre-filter counters (process-wide)
+prefilter_stats = {
+    "runs": 0,
+    "pool_size": 0,  # pending opposite-type reports before pre-filtering
+    "scored": 0,  # candidates actually scored
+    "fallbacks": 0,  # runs where the blocked set was empty and the full pool was scored
+    "ann_runs": 0,  # runs where the pool was an ANN shortlist
+    "image_identical": 0,  # candidates with the same image bytes (image score 1.0, not compared)
+    "image_pruned": 0,  # candidates skipped by the dHash prefilter (image score 0)
+}
+
+
+def _date_window(date_reported: date) -> Optional[tuple]:
+    """Date bounds around a report's date, or None if disabled or unknown."""
+    if MATCH_DATE_WINDOW_DAYS <= 0 or not isinstance(date_reported, date):
+        return None
+    window = timedelta(days=MATCH_DATE_WINDOW_DAYS)
+    return date_reported - window, date_reported + window
+
+
+def opposite_type(report: Report) -> str:
+    return "found" if report.type == "lost" else "lost"
+
+
+def ann_shortlist(new_report: Report, new_hist, new_vector) -> Optional[set]:
+    """ANN top-k candidate ids, or None when the pool is small enough to score exactly."""
+    if not ANN_ENABLED or report_index.size(opposite_type(new_report)) < ANN_MIN_POOL:
+        return None
+    ids = report_index.shortlist(opposite_type(new_report), new_hist, new_vector, ANN_TOP_K)
+    return ids or None
+
+
+def fetch_candidates(db: Session, new_report: Report, shortlist: Optional[set] = None) -> list:
+    """
+    Pending opposite-type reports worth scoring against new_report.
+    The pool is the ANN shortlist when one is given, otherwise every pending
+    opposite-type report. It is narrowed by category, block and date window
+    where configured; if that leaves nothing, the whole pool is returned.
+    """
+    pool = db.query(Report).filter(Report.type == opposite_type(new_report), Report.status == "pending")
+    if shortlist is not None:
+        pool = pool.filter(Report.id.in_(list(shortlist)))
+        prefilter_stats["ann_runs"] += 1
+
+    blocked = pool
+    if MATCH_FILTER_CATEGORY:
+        blocked = blocked.filter(Report.category == new_report.category)
+    if MATCH_FILTER_BLOCK:
+        blocked = blocked.filter(Report.block == new_report.block)
+    window = _date_window(new_report.date_reported)
+    if window:
+        blocked = blocked.filter(Report.date_reported.between(*window))
+
+    if blocked is pool:
+        candidates = pool.all()
+        pool_size = len(candidates)
+    else:
+        candidates = blocked.all()
+        pool_size = pool.count()
+        if not candidates and pool_size:
+            candidates = pool.all()
+            prefilter_stats["fallbacks"] += 1
+
+    prefilter_stats["runs"] += 1
+    prefilter_stats["pool_size"] += pool_size
+    prefilter_stats["scored"] += len(candidates)
+    logger.debug(
+        "Report %d: scoring %d of %d candidates (%d pruned)",
+        new_report.id, len(candidates), pool_size, pool_size - len(candidates),
+    )
+    return candidates
+
+
+def image_comparisons(db: Session, new_report: Report, candidates: list) -> tuple:
+    """
+    Split candidates for image scoring: returns (identical mask, candidates whose
+    histograms must be compared). Identical uploads are never compared; with
+    MATCH_DHASH_MAX_DISTANCE set, neither are perceptually distant ones.
+    """
+    identical = np.fromiter(
+        (bool(new_report.image_hash) and c.image_hash == new_report.image_hash for c in candidates),
+        dtype=bool, count=len(candidates),
+    )
+    compare = [c for c, same in zip(candidates, identical) if not same]
+    prefilter_stats["image_identical"] += int(identical.sum())
+
+    if MATCH_DHASH_MAX_DISTANCE > 0 and compare:
+        dhashes = get_dhashes(db, [new_report, *compare])
+        query = dhashes.get(new_report.id)
+        known = [c for c in compare if c.id in dhashes]
+        if query is not None and known:
+            distances = hamming_distances(query, [dhashes[c.id] for c in known])
+            far = {c.id for c, d in zip(known, distances) if d > MATCH_DHASH_MAX_DISTANCE}
+            # Candidates without a dHash (not yet in the content store) are still compared
+            compare = [c for c in compare if c.id not in far]
+            prefilter_stats["image_pruned"] += len(far)
+    return identical, compare
+
 
 def run_matching(db: Session, new_report: Report) -> list:
     """
-    Compare a new report against all opposite-type pending reports.
-    Returns list of matches above threshold.
+    Compare a new report against pre-filtered opposite-type pending reports.
+    Returns the newly stored matches at or above MATCH_THRESHOLD, as column dicts.
     """
-    # Determine opposite type
-    opposite_type = "found" if new_report.type == "lost" else "lost"
+    watch = Stopwatch()
+    try:
+        return _run_matching(db, new_report, watch)
+    finally:
+        MATCHING_DURATION.observe(watch.total())
+        for phase, seconds in watch.phases.items():
+            MATCHING_PHASE.labels(phase).observe(seconds)
+
+
+def _run_matching(db: Session, new_report: Report, watch: Stopwatch) -> list:
+    # Cached TF-IDF vectors and stored histograms — images are never decoded here
+    new_vector = query_vector(db, new_report)
+    watch.lap("text")
+    new_hist = get_histograms(db, [new_report]).get(new_report.id) if new_report.image_path else None
+    watch.lap("image")
+
+    candidates = fetch_candidates(db, new_report, ann_shortlist(new_report, new_hist, new_vector))
+
+    # Searchable as a candidate for later reports from now on
+    report_index.add(new_report, new_hist, new_vector)
+    watch.lap("candidates")
+    MATCHING_CANDIDATES.observe(len(candidates))
 
-    candidates = (
-        db.query(Report)
-        .filter(Report.type == opposite_type, Report.status == "pending")
-        .all()
+    if not candidates:
+        return []
+
+    identical, histograms = None, {}
+    if new_hist is not None:
+        identical, compare = image_comparisons(db, new_report, candidates)
+        histograms = get_histograms(db, compare)
+    watch.lap("image")
+    vectors = None
+    if new_vector is not None:
+        # Both from one fit: the vocabulary may have changed since new_vector was taken
+        new_vector, vectors = candidate_vectors(new_report, candidates)
+    watch.lap("text")
+
+    # Score every candidate in one vectorized pass
+    txt_scores, img_scores, scores = batch_scores(
+        new_vector,
+        vectors,
+        new_hist,
+        [histograms.get(c.id) for c in candidates],
+        identical,
     )
+    watch.lap("score")
 
-    high_matches = []
+    # Store all matches (even low ones for admin visibility)
+    stored = np.flatnonzero(scores > MIN_STORED_SCORE)
+    if stored.size == 0:
+        return []
+    is_high = scores >= MATCH_THRESHOLD
 
-    for candidate in candidates:
-        try:
-            # Text similarity: combine item_name, category, description
-            new_text = f"{new_report.item_name} {new_report.category} {new_report.description}"
-            cand_text = f"{candidate.item_name} {candidate.category} {candidate.description}"
-            txt_sim = text_similarity(new_text, cand_text)
-
-            # Image similarity
-            img_sim = 0.0
-            if new_report.image_path and candidate.image_path:
-                new_img = str(UPLOAD_DIR / new_report.image_path)
-                cand_img = str(UPLOAD_DIR / candidate.image_path)
-                img_sim = image_similarity(new_img, cand_img)
-
-            score = combined_score(img_sim, txt_sim)
-
-            # Store all matches (even low ones for admin visibility)
-            if score > 0.05:
-                # Determine which is lost and which is found
-                lost_id = new_report.id if new_report.type == "lost" else candidate.id
-                found_id = candidate.id if new_report.type == "lost" else new_report.id
-
-                # Check if match already exists
-                existing = (
-                    db.query(Match)
-                    .filter(Match.lost_report_id == lost_id, Match.found_report_id == found_id)
-                    .first()
-                )
-                if not existing:
-                    match = Match(
-                        lost_report_id=lost_id,
-                        found_report_id=found_id,
-                        image_similarity=round(img_sim, 4),
-                        text_similarity=round(txt_sim, 4),
-                        combined_score=score,
-                    )
-                    db.add(match)
-
-                    if score >= MATCH_THRESHOLD:
-                        high_matches.append(match)
-                        logger.info(
-                            "High match found: report %d ↔ %d (score=%.2f)",
-                            lost_id, found_id, score,
-                        )
-
-        except Exception:
-            logger.exception(
-                "Error matching report %d against candidate %d",
-                new_report.id, candidate.id,
-            )
+    # Every pair involves the new report, so one query finds the ones already stored
+    new_is_lost = new_report.type == "lost"
+    if new_is_lost:
+        existing = db.query(Match.found_report_id).filter(Match.lost_report_id == new_report.id)
+    else:
+        existing = db.query(Match.lost_report_id).filter(Match.found_report_id == new_report.id)
+    existing = {row[0] for row in existing}
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    high_matches = []
+    for i in stored:
+        candidate = candidates[i]
+        if candidate.id in existing:
             continue
+        row = {
+            "lost_report_id": new_report.id if new_is_lost else candidate.id,
+            "found_report_id": candidate.id if new_is_lost else new_report.id,
+            "image_similarity": round(float(img_scores[i]), 4),
+            "text_similarity": round(float(txt_scores[i]), 4),
+            "combined_score": float(scores[i]),
+            "created_at": now,
+        }
+        rows.append(row)
+        if is_high[i]:
+            high_matches.append(row)
 
+    if rows:
+        # Pairs a concurrent run stored first are skipped; only the rows this run
+        # inserted are counted, reported and broadcast
+        insert_matches = insert_ignore_duplicates(Match.__table__)
+        if engine.dialect.insert_returning:
+            # Single multi-row INSERT, RETURNING the pairs that went in
+            inserted = set(db.execute(
+                insert_matches.returning(Match.__table__.c.lost_report_id, Match.__table__.c.found_report_id),
+                rows,
+            ).all())
+        else:
+            # MySQL has no INSERT ... RETURNING: one row at a time, told apart by rowcount
+            inserted = {
+                (row["lost_report_id"], row["found_report_id"])
+                for row in rows
+                if db.execute(insert_matches, row).rowcount == 1
+            }
+        if len(inserted) < len(rows):
+            logger.debug("Report %d: %d match(es) already stored by another run", new_report.id, len(rows) - len(inserted))
+            rows = [row for row in rows if (row["lost_report_id"], row["found_report_id"]) in inserted]
+            high_matches = [row for row in high_matches if (row["lost_report_id"], row["found_report_id"]) in inserted]
+        record_matches(db, now, len(rows), len(high_matches))
     db.commit()
+    for row in high_matches:
+        logger.info(
+            "High match found: report %d ↔ %d (score=%.2f)",
+            row["lost_report_id"], row["found_report_id"], row["combined_score"],
+        )
+    watch.lap("persist")
     return high_matches
+
+
+def retire_report(report_id: int) -> None:
+    """Remove a report from every matching cache once it leaves the pending pool."""
+    forget_report(report_id)
+    report_index.remove(report_id)
+
+
+def evaluate_ann_recall(db: Session, sample_size: int = 100, k: int = ANN_TOP_K, seed: int = 0) -> dict:
+    """
+    Check that ANN shortlists keep every match at or above MATCH_THRESHOLD.
+    For a sample of pending reports, scores the full opposite-type pool exactly
+    and counts how many above-threshold candidates the top-k shortlist contains.
+    """
+    refit_text_model(db)
+    report_index.rebuild_image(db)
+
+    pending = db.query(Report).filter(Report.status == "pending").all()
+    by_type = {"lost": [], "found": []}
+    for report in pending:
+        by_type.setdefault(report.type, []).append(report)
+    histograms = get_histograms(db, pending)
+
+    sample = random.Random(seed).sample(pending, min(sample_size, len(pending)))
+    relevant = 0
+    found = 0
+    shortlist_sizes = []
+    for report in sample:
+        pool = by_type[opposite_type(report)]
+        if not pool:
+            continue
+        vector, vectors = candidate_vectors(report, pool)
+        hist = histograms.get(report.id)
+        _, _, scores = batch_scores(
+            vector,
+            vectors,
+            hist,
+            [histograms.get(c.id) for c in pool],
+        )
+        expected = {pool[i].id for i in np.flatnonzero(scores >= MATCH_THRESHOLD)}
+        shortlist = report_index.shortlist(opposite_type(report), hist, vector, k)
+        relevant += len(expected)
+        found += len(expected & shortlist)
+        shortlist_sizes.append(len(shortlist))
+
+    return {
+        "sampled": len(sample),
+        "top_k": k,
+        "above_threshold": relevant,
+        "retrieved": found,
+        "recall": found / relevant if relevant else 1.0,
+        "mean_shortlist": float(np.mean(shortlist_sizes)) if shortlist_sizes else 0.0,
+    }
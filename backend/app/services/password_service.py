@@ -0,0 +1,136 @@
+"""
+bcrypt hashing and verification off the request path.
+
+bcrypt is deliberately CPU-expensive, so it runs in a dedicated process pool
+instead of the shared request threadpool. Verifications from login go through
+an admission gate: at most PASSWORD_MAX_CONCURRENT run at once, up to
+PASSWORD_QUEUE_SIZE more wait their turn, and anything beyond that is turned
+away with PasswordPoolBusy (HTTP 429) instead of stalling other endpoints.
+
+The workers are started with forkserver (spawn where that's unavailable),
+never plain fork: forking the running app would copy its event loop, locks
+and open database connections into every worker. This module is imported by
+the worker processes, so it must stay light.
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from passlib.context import CryptContext
+from app.config import PASSWORD_WORKERS, PASSWORD_MAX_CONCURRENT, PASSWORD_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain: str, hashed: str) -> bool:
+    return pwd_context.verify(plain, hashed)
+
+
+def _worker_context():
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")  # Windows
+    context = multiprocessing.get_context("forkserver")
+    # Import this module once in the fork server rather than in every worker
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the verification queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Password verification queue is full; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class PasswordPool:
+    def __init__(self, workers: int, max_concurrent: int, queue_size: int):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_concurrent = max(1, max_concurrent or self.workers)
+        self.queue_size = max(0, queue_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None  # made in the event loop by start()
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiting = 0
+        self._avg_seconds = 0.25  # running estimate of one verification, for Retry-After
+        self.rejected = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the app never forks
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_worker_context())
+                logger.info("Password pool started (%d processes)", self.workers)
+            return self._executor
+
+    def start(self) -> None:
+        """Create the admission gate in the running event loop (called from the app lifespan)."""
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._slots_loop = asyncio.get_running_loop()
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    # ── Blocking API (startup / seeding) ──────────
+    def hash(self, password: str) -> str:
+        return self.executor.submit(_hash, password).result()
+
+    def hash_many(self, passwords: list) -> list:
+        """Hash several passwords in parallel across the pool."""
+        return list(self.executor.map(_hash, passwords))
+
+    # ── Async API (request path) ──────────────────
+    async def verify(self, plain: str, hashed: str) -> bool:
+        """Verify a password in the pool, waiting for a slot if needed. Raises PasswordPoolBusy."""
+        if self._slots_loop is not asyncio.get_running_loop():
+            self.start()  # used outside the app's lifespan, or from a new loop
+        if self._slots.locked() and self._waiting >= self.queue_size:
+            self.rejected += 1
+            raise PasswordPoolBusy(self.retry_after())
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            start = time.perf_counter()
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, _verify, plain, hashed)
+            self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * (time.perf_counter() - start)
+            return result
+        finally:
+            self._slots.release()
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        backlog = self._waiting + self.max_concurrent
+        return max(1, math.ceil(backlog * self._avg_seconds / self.workers))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_concurrent": self.max_concurrent,
+            "queue_size": self.queue_size,
+            "waiting": self._waiting,
+            "rejected": self.rejected,
+            "avg_verify_ms": round(self._avg_seconds * 1000, 1),
+        }
+
+
+password_pool = PasswordPool(PASSWORD_WORKERS, PASSWORD_MAX_CONCURRENT, PASSWORD_QUEUE_SIZE)
@@ -1,17 +1,78 @@
 import uuid
+import hashlib
 import logging
+from datetime import date, datetime
 from pathlib import Path
+from typing import Optional
+import aiofiles
+import aiofiles.os
+from sqlalchemy import select, text, update
 from sqlalchemy.orm import Session
 from fastapi import UploadFile, HTTPException
-from app.models import Report, User
+from app.models import Report, User, ImageFeature, MatchJob
+from app.serialization import select_reports
 from app.config import UPLOAD_DIR, MAX_UPLOAD_SIZE, ALLOWED_EXTENSIONS
+from app.services.image_service import store_image, remove_upload_file
+from app.services.stats_service import record_new_report
+from app.utils.ai_utils import histogram_to_bytes
 
 logger = logging.getLogger(__name__)
 
+# Uploads are copied to disk this many bytes at a time
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of each accepted image format -> the extension it is stored with
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+    (b"BM", ".bmp"),
+)
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Extension for the image format the file's first bytes identify, or None."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    return None
+
+
+# Accepted spellings of a report date, tried in order (day-first, as used on campus)
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y/%m/%d")
+
+
+def parse_report_date(value) -> Optional[date]:
+    """A date from a date_reported value (date, ISO date or datetime, or DD/MM/YYYY), or None."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = str(value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        return None
+
+
+def validate_report_date(value: str) -> date:
+    """Parse the submitted date_reported, rejecting anything that isn't a date."""
+    parsed = parse_report_date(value)
+    if parsed is None:
+        raise HTTPException(status_code=400, detail="date_reported must be a date (YYYY-MM-DD)")
+    return parsed
+
 
 def validate_upload(file: UploadFile) -> None:
-    """Validate uploaded file size, extension and MIME type."""
-    # Validate extension
+    """Validate the uploaded file's extension (its content is checked while it is saved)."""
     ext = Path(file.filename).suffix.lower() if file.filename else ""
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
@@ -19,39 +80,61 @@ def validate_upload(file: UploadFile) -> None:
             detail=f"File type '{ext}' not allowed. Accepted: {', '.join(sorted(ALLOWED_EXTENSIONS))}",
         )
 
-    # Validate MIME type
-    if file.content_type and not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="Only image files are accepted")
 
+async def save_upload(file: UploadFile) -> tuple:
+    """
+    Stream an upload to disk and return (relative path, SHA-256 hex digest).
 
-def save_upload(file: UploadFile) -> str:
-    """Save uploaded file and return the relative path."""
-    ext = Path(file.filename).suffix.lower() if file.filename else ".jpg"
-    filename = f"{uuid.uuid4().hex}{ext}"
-    dest = UPLOAD_DIR / filename
+    The file is copied in UPLOAD_CHUNK_SIZE chunks into a temporary name and
+    renamed into place only once it is complete, so at most one chunk is held
+    in memory, an oversized upload is abandoned as soon as it crosses
+    MAX_UPLOAD_SIZE, and no reader ever sees a partial file. The format is
+    taken from the file's leading bytes, not from its name or Content-Type.
+    """
+    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+    ext = sniff_image_type(chunk)
+    if ext is None or ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Only image files are accepted")
 
-    # Read and validate size
-    content = file.file.read()
-    if len(content) > MAX_UPLOAD_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size: {MAX_UPLOAD_SIZE // (1024 * 1024)}MB",
-        )
+    filename = f"{uuid.uuid4().hex}{ext}"
+    partial = UPLOAD_DIR / f".{filename}.part"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(partial, "wb") as out:
+            while chunk:
+                size += len(chunk)
+                if size > MAX_UPLOAD_SIZE:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File too large. Maximum size: {MAX_UPLOAD_SIZE // (1024 * 1024)}MB",
+                    )
+                digest.update(chunk)
+                await out.write(chunk)
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        await aiofiles.os.replace(partial, UPLOAD_DIR / filename)
+    except BaseException:
+        await discard_upload(partial.name)
+        raise
 
-    with open(dest, "wb") as buffer:
-        buffer.write(content)
+    logger.info("Saved upload: %s (%d bytes)", filename, size)
+    return filename, digest.hexdigest()
 
-    logger.info("Saved upload: %s (%d bytes)", filename, len(content))
-    return filename
 
+async def discard_upload(image_path: str) -> None:
+    """Delete a saved (or partially saved) upload that no report will reference."""
+    try:
+        await aiofiles.os.remove(UPLOAD_DIR / image_path)
+    except FileNotFoundError:
+        pass
 
-def create_report(db: Session, user: User, data: dict, image_file: UploadFile = None) -> Report:
-    """Create a new report with optional image upload."""
-    image_path = None
-    if image_file and image_file.filename:
-        validate_upload(image_file)
-        image_path = save_upload(image_file)
 
+def create_report(db: Session, user: User, data: dict, image_path: str = None, image_hash: str = None) -> tuple:
+    """
+    Create a new report, with an image already saved by save_upload, and its
+    queued matching job in the same transaction, so no report is left without
+    one. Returns (report, job id).
+    """
     report = Report(
         user_id=user.id,
         type=data["type"],
@@ -64,13 +147,87 @@ def create_report(db: Session, user: User, data: dict, image_file: UploadFile =
         date_reported=data["date_reported"],
         image_path=image_path,
         status="pending",
+        section=user.section,
     )
+    if image_path:
+        # The upload is decoded once here (or not at all if the same bytes were stored
+        # before): thumbnails for the dashboards, and the histogram reused by every
+        # later matching run
+        stored = store_image(db, image_path, image_hash)
+        if stored is None:
+            logger.warning("Could not decode upload: %s", image_path)
+            report.image_feature = ImageFeature(histogram=ImageFeature.UNDECODABLE)
+        else:
+            report.image_path, hist = stored
+            report.image_hash = image_hash
+            report.image_feature = ImageFeature(histogram=histogram_to_bytes(hist))
     db.add(report)
+    db.flush()
+    record_new_report(db, report)
+    job = MatchJob(report_id=report.id, status="queued")
+    db.add(job)
     db.commit()
     db.refresh(report)
-    return report
+    if image_path and report.image_path != image_path:
+        logger.info("Upload %s duplicates %s; keeping one copy", image_path, report.image_path)
+        remove_upload_file(image_path)
+    return report, job.id
 
 
 def get_user_reports(db: Session, user_id: int) -> list:
-    """Get all reports for a specific user."""
-    return db.query(Report).filter(Report.user_id == user_id).order_by(Report.created_at.desc()).all()
+    """Get all reports for a specific user, newest first, as ReportOut column rows."""
+    query = select_reports().where(Report.user_id == user_id).order_by(Report.created_at.desc())
+    return db.execute(query).all()
+
+
+def backfill_report_columns(db: Session, batch_size: int = 500) -> dict:
+    """
+    Bring reports written before section and the Date-typed date_reported
+    existed up to date: copy each submitter's section, and rewrite free-form
+    date_reported strings as ISO dates (falling back to the creation day when
+    a value can't be parsed). Reads the raw column, so it works before and
+    after the column type changes. Returns how many rows were updated.
+    """
+    sections = db.execute(
+        update(Report)
+        .where(Report.section.is_(None))
+        .values(section=select(User.section).where(User.id == Report.user_id).scalar_subquery())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+
+    rewritten = unparseable = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            text("SELECT id, date_reported, created_at FROM reports WHERE id > :last ORDER BY id LIMIT :n"),
+            {"last": last_id, "n": batch_size},
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        fixes = []
+        for row in rows:
+            raw = row.date_reported
+            if isinstance(raw, date) or (isinstance(raw, str) and len(raw) == 10 and _iso_or_none(raw)):
+                continue  # already a date, or an ISO string SQLAlchemy reads as one
+            parsed = parse_report_date(raw)
+            if parsed is None:
+                unparseable += 1
+                parsed = date.fromisoformat(str(row.created_at)[:10])
+            fixes.append({"id": row.id, "value": parsed.isoformat()})
+        if fixes:
+            db.execute(text("UPDATE reports SET date_reported = :value WHERE id = :id"), fixes)
+            db.commit()
+            rewritten += len(fixes)
+
+    if unparseable:
+        logger.warning("%d report date(s) could not be parsed; used the creation day instead", unparseable)
+    return {"sections": max(sections, 0), "dates": rewritten, "unparseable": unparseable}
+
+
+def _iso_or_none(value: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
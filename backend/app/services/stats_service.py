@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from sqlalchemy import Date, case, func
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, upsert, lock_tables
+from app.models import Report, Match, ReportCount, MatchCount
+from app.config import MATCH_THRESHOLD, STATS_RECONCILE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def _day(value: datetime) -> date:
+    """UTC day of a timestamp (naive values are already UTC, as SQLite returns them)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+# ── Incremental Maintenance ───────────────────────
+# Each call adds to the caller's transaction, so the counters commit (or roll back)
+# together with the change they describe.
+def count_report(db: Session, report: Report, status: str, delta: int = 1) -> None:
+    """Add delta to the counter a report falls under with the given status."""
+    key = {"day": _day(report.created_at), "section": report.section or "", "type": report.type, "status": status}
+    db.execute(
+        upsert(ReportCount.__table__, list(key), {"count": ReportCount.count + delta}),
+        {**key, "count": delta},
+    )
+
+
+def record_new_report(db: Session, report: Report) -> None:
+    """Count a report that is being created (call after a flush so created_at is set)."""
+    count_report(db, report, report.status)
+
+
+def record_status_change(db: Session, report: Report, old_status: str) -> None:
+    """Move a report from old_status's counter to its current status's."""
+    count_report(db, report, old_status, -1)
+    count_report(db, report, report.status)
+
+
+def record_matches(db: Session, created_at: datetime, stored: int, high: int) -> None:
+    """Count matches stored by one matching run."""
+    if not stored:
+        return
+    db.execute(
+        upsert(
+            MatchCount.__table__, ["day"],
+            {"stored": MatchCount.stored + stored, "high": MatchCount.high + high},
+        ),
+        {"day": _day(created_at), "stored": stored, "high": high},
+    )
+
+
+# ── Reconciliation ────────────────────────────────
+def reconcile_stats(db: Session) -> dict:
+    """
+    Recompute every counter from the reports and matches tables and correct the
+    ones that drifted (e.g. rows written before the counters existed, or a
+    changed MATCH_THRESHOLD). Returns how many counter rows were fixed per
+    table.
+
+    Counters are written as absolute values, so the whole pass holds off other
+    writers of the counters: a report counted between the recount and the write
+    would otherwise be lost until the next run.
+    """
+    lock_tables(db, ReportCount.__table__, MatchCount.__table__)
+    report_day = func.date(Report.created_at, type_=Date)
+    section = func.coalesce(Report.section, "")
+    actual_reports = {
+        (row[0], row[1], row[2], row[3]): row[4]
+        for row in db.query(report_day, section, Report.type, Report.status, func.count(Report.id))
+        .group_by(report_day, section, Report.type, Report.status)
+    }
+    match_day = func.date(Match.created_at, type_=Date)
+    actual_matches = {
+        row[0]: (row[1], int(row[2] or 0))
+        for row in db.query(
+            match_day, func.count(Match.id), func.sum(case((Match.combined_score >= MATCH_THRESHOLD, 1), else_=0)),
+        ).group_by(match_day)
+    }
+
+    stored_reports = {(r.day, r.section, r.type, r.status): r.count for r in db.query(ReportCount)}
+    stored_matches = {r.day: (r.stored, r.high) for r in db.query(MatchCount)}
+
+    fixed_reports = 0
+    for key in stored_reports.keys() - actual_reports.keys():
+        if stored_reports[key]:
+            fixed_reports += 1
+        day, section_value, report_type, status = key
+        db.query(ReportCount).filter(
+            ReportCount.day == day, ReportCount.section == section_value,
+            ReportCount.type == report_type, ReportCount.status == status,
+        ).delete(synchronize_session=False)
+    for key, count in actual_reports.items():
+        if stored_reports.get(key) != count:
+            fixed_reports += 1
+            day, section_value, report_type, status = key
+            values = {"day": day, "section": section_value, "type": report_type, "status": status, "count": count}
+            db.execute(upsert(ReportCount.__table__, ["day", "section", "type", "status"], {"count": count}), values)
+
+    fixed_matches = 0
+    for day in stored_matches.keys() - actual_matches.keys():
+        fixed_matches += 1
+        db.query(MatchCount).filter(MatchCount.day == day).delete(synchronize_session=False)
+    for day, (stored, high) in actual_matches.items():
+        if stored_matches.get(day) != (stored, high):
+            fixed_matches += 1
+            db.execute(
+                upsert(MatchCount.__table__, ["day"], {"stored": stored, "high": high}),
+                {"day": day, "stored": stored, "high": high},
+            )
+
+    db.commit()
+    return {"report_counts": fixed_reports, "match_counts": fixed_matches}
+
+
+def _reconcile_in_session() -> dict:
+    db = SessionLocal()
+    try:
+        return reconcile_stats(db)
+    finally:
+        db.close()
+
+
+async def stats_reconciler() -> None:
+    """Background task: reconcile the dashboard counters at startup, then every STATS_RECONCILE_SECONDS."""
+    while True:
+        try:
+            fixed = await asyncio.to_thread(_reconcile_in_session)
+            if any(fixed.values()):
+                logger.info("Dashboard counters reconciled: %s", fixed)
+        except Exception:
+            logger.exception("Dashboard counter reconciliation failed")
+        await asyncio.sleep(STATS_RECONCILE_SECONDS)
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import threading
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import Report
+from app.utils.text_model import TextModel
+from app.services.ann_service import report_index
+from app.config import TEXT_MODEL_REFIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+text_model = TextModel()
+_refit_lock = threading.Lock()
+
+
+def report_text(report) -> str:
+    """Text used for similarity: item name, category and description."""
+    return f"{report.item_name} {report.category} {report.description}"
+
+
+def refit_text_model(db: Session) -> bool:
+    """Fit the TF-IDF model over every report and cache vectors for pending ones."""
+    rows = (
+        db.query(Report.id, Report.type, Report.item_name, Report.category, Report.description, Report.status)
+        .yield_per(1000)
+    )
+    corpus = []
+    documents = {}
+    report_types = {}
+    for row in rows:
+        text = report_text(row)
+        corpus.append(text)
+        if row.status == "pending":
+            documents[row.id] = text
+            report_types[row.id] = row.type
+
+    fitted = text_model.fit(corpus, documents)
+    if fitted:
+        # The vocabulary changed, so the text ANN index is rebuilt from the new vectors
+        report_index.rebuild_text(*text_model.snapshot(), report_types=report_types)
+        logger.info(
+            "Text model fitted on %d reports (%d cached vectors)", len(corpus), len(documents),
+        )
+    return fitted
+
+
+def query_vector(db: Session, new_report: Report):
+    """
+    TF-IDF vector for a report being matched, or None when there is no vocabulary
+    yet. Terms the model hasn't seen are ignored until the background refresher
+    refits it (TEXT_MODEL_REFIT_SECONDS); only a model that has never been fitted
+    — an empty corpus, so cheap — is fitted here.
+    """
+    if not text_model.is_fitted:
+        with _refit_lock:
+            if not text_model.is_fitted:
+                refit_text_model(db)
+
+    # The new report is pending itself, so cache it for later runs
+    return text_model.add(new_report.id, report_text(new_report))
+
+
+def candidate_vectors(new_report: Report, candidates: list) -> tuple:
+    """
+    (query vector, candidate rows aligned with the list) from the same fit. A
+    refit may have replaced the vocabulary since query_vector, so the query
+    vector is taken again here rather than reused.
+    """
+    return text_model.aligned(
+        new_report.id, report_text(new_report), [(c.id, report_text(c)) for c in candidates],
+    )
+
+
+def forget_report(report_id: int) -> None:
+    """Stop matching against a report once it leaves the pending pool."""
+    text_model.remove(report_id)
+
+
+def _refit_in_session() -> None:
+    db = SessionLocal()
+    try:
+        with _refit_lock:
+            refit_text_model(db)
+    finally:
+        db.close()
+
+
+async def text_model_refresher() -> None:
+    """Background task: fit once at startup, then refit periodically when reports were added."""
+    try:
+        await asyncio.to_thread(_refit_in_session)
+    except Exception:
+        logger.exception("Initial text model fit failed")
+
+    while True:
+        await asyncio.sleep(TEXT_MODEL_REFIT_SECONDS)
+        if text_model.is_fitted and not text_model.documents_since_fit:
+            continue
+        try:
+            await asyncio.to_thread(_refit_in_session)
+        except Exception:
+            logger.exception("Text model refit failed")
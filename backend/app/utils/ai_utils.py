@@ -1,43 +1,114 @@
-import cv2
+import math
+from typing import Optional
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from app.config import IMAGE_WEIGHT, TEXT_WEIGHT
 
+# OpenCV and scikit-learn take most of the app's import time, so they are
+# imported inside the functions that need them (see warm_up()).
+
+HIST_BINS = [8, 8, 8]
+HIST_RANGES = [0, 180, 0, 256, 0, 256]
+HIST_SIZE = 8 * 8 * 8
+
+
+MATCH_IMAGE_SIZE = (256, 256)
+
+
+def compute_histogram(path: str) -> Optional[np.ndarray]:
+    """Decode an image and return its normalized HSV histogram as a flat float32 vector."""
+    import cv2
 
-def image_similarity(path1: str, path2: str) -> float:
-    """Calculate image similarity using OpenCV histogram comparison."""
     try:
-        img1 = cv2.imread(path1)
-        img2 = cv2.imread(path2)
-        if img1 is None or img2 is None:
-            return 0.0
+        img = cv2.imread(path)
+        if img is None:
+            return None
+        return histogram_from_image(img)
+    except Exception:
+        return None
+
+
+def resize_for_matching(img: np.ndarray) -> np.ndarray:
+    """Resize a decoded BGR image to the fixed dimensions histograms are computed on."""
+    import cv2
+
+    if img.shape[1::-1] == MATCH_IMAGE_SIZE:
+        return img
+    return cv2.resize(img, MATCH_IMAGE_SIZE)
+
+
+def histogram_from_image(img: np.ndarray) -> np.ndarray:
+    """Normalized 8x8x8 HSV histogram of a decoded BGR image."""
+    import cv2
+
+    # Resize to fixed dimensions for fair comparison
+    img = resize_for_matching(img)
+
+    # Convert to HSV for better color comparison
+    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+
+    hist = cv2.calcHist([hsv], [0, 1, 2], None, HIST_BINS, HIST_RANGES)
+    cv2.normalize(hist, hist)
+    return hist.astype(np.float32).ravel()
+
+
+def dhash_from_image(img: np.ndarray) -> int:
+    """
+    64-bit difference hash: whether each pixel of a 9x8 grayscale thumbnail is
+    brighter than its left neighbour. Near-identical photos differ in few bits.
+    """
+    import cv2
+
+    gray = cv2.cvtColor(resize_for_matching(img), cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
 
-        # Resize to same dimensions for fair comparison
-        img1 = cv2.resize(img1, (256, 256))
-        img2 = cv2.resize(img2, (256, 256))
+def hamming_distances(query: int, hashes: list) -> np.ndarray:
+    """Bitwise Hamming distance between one 64-bit hash and each of a list of them."""
+    if not hashes:
+        return np.zeros(0, dtype=np.int64)
+    xor = np.array(hashes, dtype=np.uint64) ^ np.uint64(query)
+    return np.unpackbits(xor.view(np.uint8)).reshape(len(hashes), 64).sum(axis=1)
 
-        # Convert to HSV for better color comparison
-        hsv1 = cv2.cvtColor(img1, cv2.COLOR_BGR2HSV)
-        hsv2 = cv2.cvtColor(img2, cv2.COLOR_BGR2HSV)
 
-        # Calculate histograms
-        hist1 = cv2.calcHist([hsv1], [0, 1, 2], None, [8, 8, 8], [0, 180, 0, 256, 0, 256])
-        hist2 = cv2.calcHist([hsv2], [0, 1, 2], None, [8, 8, 8], [0, 180, 0, 256, 0, 256])
+def histogram_to_bytes(hist: np.ndarray) -> bytes:
+    """Serialize a histogram vector for storage in ImageFeature.histogram."""
+    return np.asarray(hist, dtype=np.float32).tobytes()
 
-        # Normalize
-        cv2.normalize(hist1, hist1)
-        cv2.normalize(hist2, hist2)
 
-        # Compare using correlation method
+def histogram_from_bytes(data: bytes) -> np.ndarray:
+    """Deserialize a histogram vector stored by histogram_to_bytes."""
+    return np.frombuffer(data, dtype=np.float32)
+
+
+def histogram_similarity(hist1: np.ndarray, hist2: np.ndarray) -> float:
+    """Compare two flat histograms using correlation, clamped to [0, 1]."""
+    import cv2
+
+    try:
         score = cv2.compareHist(hist1, hist2, cv2.HISTCMP_CORREL)
+        if math.isnan(score):
+            return 0.0
         return max(0.0, min(1.0, score))
     except Exception:
         return 0.0
 
 
+def image_similarity(path1: str, path2: str) -> float:
+    """Calculate image similarity using OpenCV histogram comparison."""
+    hist1 = compute_histogram(path1)
+    hist2 = compute_histogram(path2)
+    if hist1 is None or hist2 is None:
+        return 0.0
+    return histogram_similarity(hist1, hist2)
+
+
 def text_similarity(text1: str, text2: str) -> float:
     """Calculate text similarity using TF-IDF and cosine similarity."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
     try:
         if not text1.strip() or not text2.strip():
             return 0.0
@@ -50,6 +121,71 @@ def text_similarity(text1: str, text2: str) -> float:
         return 0.0
 
 
+def warm_up() -> None:
+    """Import the heavy ML libraries ahead of the first matching run."""
+    import cv2  # noqa: F401
+    import scipy.sparse  # noqa: F401
+    from sklearn.feature_extraction.text import TfidfVectorizer  # noqa: F401
+    from sklearn.metrics.pairwise import cosine_similarity  # noqa: F401
+
+
 def combined_score(img_sim: float, txt_sim: float) -> float:
     """Calculate weighted combined similarity score."""
     return round(IMAGE_WEIGHT * img_sim + TEXT_WEIGHT * txt_sim, 4)
+
+
+# ── Batch scoring ─────────────────────────────────
+def batch_text_scores(query_vector, candidate_matrix) -> np.ndarray:
+    """
+    Cosine similarity of one TF-IDF vector against a candidate matrix in one sparse product.
+    Rows are L2-normalized by the vectorizer, so the dot product is the cosine.
+    """
+    scores = (candidate_matrix @ query_vector.T).toarray().ravel()
+    return np.clip(scores, 0.0, 1.0)
+
+
+def batch_histogram_similarity(query_hist: np.ndarray, candidate_hists: np.ndarray) -> np.ndarray:
+    """
+    Correlation (cv2.HISTCMP_CORREL) of one histogram against a stacked (N, 512) matrix,
+    computed as a single matrix-vector product over mean-centered rows.
+    """
+    if candidate_hists.shape[0] == 0:
+        return np.zeros(0, dtype=np.float64)
+    query = query_hist.astype(np.float64) - query_hist.mean()
+    stacked = candidate_hists.astype(np.float64)
+    stacked -= stacked.mean(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = (stacked @ query) / (np.linalg.norm(stacked, axis=1) * np.linalg.norm(query))
+    return np.clip(np.nan_to_num(scores, nan=0.0, posinf=0.0, neginf=0.0), 0.0, 1.0)
+
+
+def batch_scores(
+    query_vector,
+    candidate_matrix,
+    query_hist: Optional[np.ndarray],
+    candidate_hists: list,
+    identical: Optional[np.ndarray] = None,
+) -> tuple:
+    """
+    Score a report against all candidates in one pass.
+    candidate_matrix holds one TF-IDF row per candidate (or None if there is no text model);
+    candidate_hists holds a histogram or None per candidate. Candidates flagged in the
+    optional identical mask uploaded the very same image and score 1.0 without comparison.
+    Returns (text_scores, image_scores, combined_scores) as aligned arrays.
+    """
+    count = len(candidate_hists)
+    txt = np.zeros(count, dtype=np.float64)
+    if query_vector is not None and candidate_matrix is not None:
+        txt = batch_text_scores(query_vector, candidate_matrix)
+    img = np.zeros(count, dtype=np.float64)
+
+    if query_hist is not None:
+        has_image = np.fromiter((h is not None for h in candidate_hists), dtype=bool, count=count)
+        if has_image.any():
+            stacked = np.vstack([h for h in candidate_hists if h is not None])
+            img[has_image] = batch_histogram_similarity(query_hist, stacked)
+    if identical is not None:
+        img[identical] = 1.0
+
+    combined = np.round(IMAGE_WEIGHT * img + TEXT_WEIGHT * txt, 4)
+    return txt, img, combined
@@ -0,0 +1,151 @@
+import threading
+from pathlib import Path
+from typing import Optional
+import numpy as np
+
+# Below this many vectors per bucket, clustering costs more recall than it saves
+MIN_POINTS_PER_LIST = 8
+
+
+def normalize(vector: np.ndarray) -> Optional[np.ndarray]:
+    """L2-normalize a vector to float32, or None if it has no magnitude."""
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0 or not np.isfinite(norm):
+        return None
+    return vector / norm
+
+
+def _spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity; returns (k, dim) unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        norms = np.linalg.norm(sums, axis=1)
+        filled = norms > 0
+        # Empty clusters keep their previous centroid
+        centroids[filled] = sums[filled] / norms[filled, None]
+    return centroids
+
+
+class IVFIndex:
+    """
+    Approximate inner-product index over unit vectors (inverted file).
+
+    Vectors are bucketed by their nearest k-means centroid; a query scores only
+    the nprobe closest buckets. Until there is enough data to train the
+    centroids, every search is exact.
+    """
+
+    def __init__(self, dim: int, nlist: int = 64, nprobe: int = 8):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._lock = threading.RLock()
+        self._vectors = {}  # id -> unit vector
+        self._assign = {}  # id -> bucket
+        self._buckets = [set()]
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._vectors
+
+    def ids(self) -> list:
+        with self._lock:
+            return list(self._vectors)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def add(self, item_id: int, vector: np.ndarray) -> bool:
+        """Insert or replace a vector. Returns False if it can't be indexed (zero vector)."""
+        unit = normalize(vector)
+        if unit is None or unit.shape[0] != self.dim:
+            return False
+        with self._lock:
+            self.remove(item_id)
+            self._vectors[item_id] = unit
+            self._place(item_id, unit)
+            # Train once there is enough data, and retrain as the index outgrows its centroids
+            if len(self._vectors) >= 4 * max(self.trained_size, 1):
+                self.train()
+        return True
+
+    def remove(self, item_id: int) -> None:
+        with self._lock:
+            if self._vectors.pop(item_id, None) is not None:
+                self._buckets[self._assign.pop(item_id)].discard(item_id)
+
+    def train(self) -> None:
+        """(Re)build centroids from the indexed vectors and reassign every vector."""
+        with self._lock:
+            if len(self._vectors) < self.nlist * MIN_POINTS_PER_LIST:
+                return
+            ids = list(self._vectors)
+            matrix = np.vstack([self._vectors[i] for i in ids])
+            self.centroids = _spherical_kmeans(matrix, self.nlist)
+            self.trained_size = len(ids)
+            self._buckets = [set() for _ in range(self.nlist)]
+            assign = np.argmax(matrix @ self.centroids.T, axis=1)
+            for item_id, bucket in zip(ids, assign):
+                self._assign[item_id] = int(bucket)
+                self._buckets[bucket].add(item_id)
+
+    def search(self, vector: np.ndarray, k: int, exact: bool = False) -> list:
+        """Top-k [(id, score), ...] by inner product, best first."""
+        unit = normalize(vector)
+        if unit is None or unit.shape[0] != self.dim:
+            return []
+        with self._lock:
+            if exact or not self.is_trained:
+                ids = list(self._vectors)
+            else:
+                probe = np.argsort(self.centroids @ unit)[::-1][:self.nprobe]
+                ids = [i for bucket in probe for i in self._buckets[bucket]]
+            if not ids:
+                return []
+            matrix = np.vstack([self._vectors[i] for i in ids])
+        scores = matrix @ unit
+        top = np.argsort(scores)[::-1][:k]
+        return [(ids[i], float(scores[i])) for i in top]
+
+    def _place(self, item_id: int, unit: np.ndarray) -> None:
+        bucket = int(np.argmax(self.centroids @ unit)) if self.is_trained else 0
+        self._assign[item_id] = bucket
+        self._buckets[bucket].add(item_id)
+
+    # ── Persistence ───────────────────────────────
+    def save(self, path: Path) -> None:
+        with self._lock:
+            ids = np.fromiter(self._vectors, dtype=np.int64, count=len(self._vectors))
+            vectors = (
+                np.vstack([self._vectors[i] for i in ids.tolist()])
+                if len(ids) else np.zeros((0, self.dim), dtype=np.float32)
+            )
+            centroids = self.centroids if self.is_trained else np.zeros((0, self.dim), dtype=np.float32)
+            params = np.array([self.dim, self.nlist, self.nprobe, self.trained_size], dtype=np.int64)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(tmp, ids=ids, vectors=vectors, centroids=centroids, params=params)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        data = np.load(path)
+        dim, nlist, nprobe, trained_size = (int(v) for v in data["params"])
+        index = cls(dim, nlist, nprobe)
+        if data["centroids"].shape[0]:
+            index.centroids = data["centroids"]
+            index.trained_size = trained_size
+            index._buckets = [set() for _ in range(nlist)]
+        for item_id, unit in zip(data["ids"].tolist(), data["vectors"]):
+            index._vectors[item_id] = unit
+            index._place(item_id, unit)
+        return index
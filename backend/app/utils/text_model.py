@@ -0,0 +1,119 @@
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+
+class TextModel:
+    """
+    Corpus-level TF-IDF model with a cache of per-report vectors.
+
+    The vectorizer is fitted over the whole reports corpus; vectors for matchable
+    reports are kept in one CSR matrix so a matching run transforms only the new
+    report and takes a single sparse product against the cached rows.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._vectorizer = None  # TfidfVectorizer, imported on first fit
+        self._analyzer = None
+        self._matrix = None  # CSR, one row per cached report
+        self._rows = {}  # report_id -> row index in _matrix
+        self._appended = []  # vectors added since _matrix was last stacked
+        self.documents_since_fit = 0
+        self.fitted_at: Optional[datetime] = None
+
+    @property
+    def is_fitted(self) -> bool:
+        return self._vectorizer is not None
+
+    @property
+    def cached_count(self) -> int:
+        return len(self._rows)
+
+    def fit(self, corpus: list, documents: dict) -> bool:
+        """
+        Fit IDF over corpus texts and cache vectors for documents ({report_id: text}).
+        The new state is built off-lock and swapped in atomically. Returns False
+        if the corpus has no usable vocabulary.
+        """
+        import scipy.sparse as sp
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        vectorizer = TfidfVectorizer(stop_words="english")
+        try:
+            vectorizer.fit(corpus)
+        except ValueError:
+            return False
+
+        ids = list(documents)
+        if ids:
+            matrix = vectorizer.transform([documents[i] for i in ids]).tocsr()
+        else:
+            matrix = sp.csr_matrix((0, len(vectorizer.vocabulary_)))
+
+        with self._lock:
+            self._vectorizer = vectorizer
+            self._analyzer = vectorizer.build_analyzer()
+            self._matrix = matrix
+            self._rows = {report_id: row for row, report_id in enumerate(ids)}
+            self._appended = []
+            self.documents_since_fit = 0
+            self.fitted_at = datetime.now(timezone.utc)
+        return True
+
+    def add(self, report_id: int, text: str):
+        """Transform and cache a report's vector (once). Returns the 1 x V vector."""
+        with self._lock:
+            if self._vectorizer is None:
+                return None
+            row = self._rows.get(report_id)
+            if row is not None:
+                stacked = self._matrix.shape[0]
+                return self._matrix[row] if row < stacked else self._appended[row - stacked]
+            vector = self._vectorizer.transform([text]).tocsr()
+            self._rows[report_id] = self._matrix.shape[0] + len(self._appended)
+            self._appended.append(vector)
+            self.documents_since_fit += 1
+            return vector
+
+    def aligned(self, report_id: int, text: str, items: list) -> tuple:
+        """
+        (1 x V query vector, len(items) x V matrix) for a report and [(report_id, text), ...],
+        taken under one lock so a concurrent fit can't leave them in different vocabularies.
+        """
+        with self._lock:
+            matrix = self.vectors(items)
+            if matrix is None:
+                return None, None
+            return self.add(report_id, text), matrix
+
+    def remove(self, report_id: int) -> None:
+        """Drop a report from the cache; its row is reclaimed on the next fit."""
+        with self._lock:
+            self._rows.pop(report_id, None)
+
+    def snapshot(self) -> tuple:
+        """(report_ids, matrix) for every cached report, rows aligned with ids."""
+        with self._lock:
+            if self._vectorizer is None:
+                return [], None
+            ids = list(self._rows)
+            return ids, self.vectors([(report_id, "") for report_id in ids])
+
+    def vectors(self, items: list):
+        """
+        Return a len(items) x V CSR matrix for [(report_id, text), ...],
+        transforming and caching any report not seen yet.
+        """
+        with self._lock:
+            if self._vectorizer is None:
+                return None
+            for report_id, text in items:
+                if report_id not in self._rows:
+                    self.add(report_id, text)
+            if self._appended:
+                import scipy.sparse as sp
+
+                self._matrix = sp.vstack([self._matrix] + self._appended, format="csr")
+                self._appended = []
+            return self._matrix[[self._rows[report_id] for report_id, _ in items]]
@@ -1,45 +1,386 @@
+import asyncio
+import bisect
 import json
 import logging
-from typing import List
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from fastapi import WebSocket
+from sqlalchemy import func
+from app.database import SessionLocal
+from app.models import WsEvent
+from app.serialization import dumps
+from app.metrics import registry, WS_CONNECTIONS, WS_QUEUED, WS_DROPPED, WS_BROADCAST, WS_SEND
+from app.config import (
+    WS_MAX_CONNECTIONS, WS_SEND_QUEUE_SIZE, WS_SEND_TIMEOUT, WS_SLOW_CONSUMER_POLICY,
+    WS_BACKEND, WS_POLL_INTERVAL, WS_EVENT_RETENTION, WS_REPLAY_BUFFER,
+)
 
 logger = logging.getLogger(__name__)
 
-MAX_CONNECTIONS = 100
+# How long a new connection may take to send its resume message before it is treated as fresh
+RESUME_WAIT_SECONDS = 2.0
+
+
+class Client:
+    """
+    One admin socket with its own bounded outbound queue and sender task, so a
+    slow client only ever delays itself.
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.dropped = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def offer(self, data: str, resync=None) -> bool:
+        """
+        Queue a message without waiting. Returns False if the client should be closed.
+        When the queue is full under the drop policy, its backlog is replaced by the
+        single event resync() encodes, so the dashboard reloads instead of missing some.
+        """
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            if WS_SLOW_CONSUMER_POLICY == "close" or resync is None:
+                return False
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(resync())
+            return True
+
+    async def run_sender(self, on_exit):
+        try:
+            while True:
+                data = await self.queue.get()
+                start = time.perf_counter()
+                await asyncio.wait_for(self.websocket.send_text(data), WS_SEND_TIMEOUT)
+                WS_SEND.observe(time.perf_counter() - start)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info("Dropping WebSocket client: %s", e.__class__.__name__)
+        finally:
+            await on_exit(self)
+
+
+# ── Broadcast Backends ────────────────────────────
+# A backend assigns each event its sequence number and calls deliver(seq, message)
+# on every worker. Sequence numbers only mean something within one epoch.
+class MemoryBroadcast:
+    """Deliver events to the sockets of this process only, numbered by a local counter."""
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self.epoch = uuid.uuid4().hex[:12]  # a restart starts a new sequence
+        self.seq = 0
+
+    async def start(self) -> int:
+        return self.seq
+
+    async def stop(self):
+        pass
+
+    async def publish(self, message: dict):
+        self.seq += 1
+        self.deliver(self.seq, message)
+
+
+class DatabaseBroadcast:
+    """
+    Relay events between workers through the ws_events table.
+
+    Each event is inserted with this worker's origin id, and every worker —
+    the publishing one included, woken at once — polls the table and delivers
+    rows in id order. Row ids are the shared sequence numbers, so dashboards
+    on any worker see the same gap-free sequence. Old rows are pruned after
+    WS_EVENT_RETENTION seconds.
+    """
+
+    epoch = "db"
+
+    # Ids can commit out of order under concurrent writers (PostgreSQL sequences),
+    # so each poll looks back this many ids and skips the ones already seen
+    LOOKBACK_IDS = 100
+    # How long rows after a missing id are held back for it to commit. Past that it
+    # is taken for rolled back; if it shows up after all it is delivered late
+    GAP_WAIT_SECONDS = 2.0
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self.origin = uuid.uuid4().hex
+        self.last_id = 0  # every id up to here has been delivered or given up on
+        self._gap_since: Optional[float] = None
+        self._seen = set()
+        self._seen_order = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> int:
+        self._wake = asyncio.Event()
+        await asyncio.to_thread(self._prime)
+        self._task = asyncio.create_task(self._poll())
+        logger.info("WebSocket database broadcast started (origin %s)", self.origin[:8])
+        return self.last_id
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def publish(self, message: dict):
+        try:
+            await asyncio.to_thread(self._insert, dumps(message).decode())
+        except Exception:
+            # Don't fail the request that triggered the event; dashboards catch up on reload
+            logger.exception("Failed to record WebSocket event")
+            return
+        # Delivered by the poller, after any lower ids other workers committed first
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _poll(self):
+        polls = 0
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), WS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                for seq, payload in await asyncio.to_thread(self._fetch):
+                    self.deliver(seq, json.loads(payload))
+                polls += 1
+                if polls % max(1, int(60 / WS_POLL_INTERVAL)) == 0:
+                    await asyncio.to_thread(self._prune)
+            except Exception:
+                logger.exception("WebSocket event poll failed")
+
+    def _prime(self):
+        """Start after the newest existing event, treating the lookback window as seen."""
+        db = SessionLocal()
+        try:
+            self.last_id = db.query(func.max(WsEvent.id)).scalar() or 0
+            rows = db.query(WsEvent.id).filter(WsEvent.id > self.last_id - self.LOOKBACK_IDS).all()
+        finally:
+            db.close()
+        for row in rows:
+            self._remember(row.id)
+
+    def _remember(self, event_id: int):
+        self._seen.add(event_id)
+        self._seen_order.append(event_id)
+        while len(self._seen_order) > 4 * self.LOOKBACK_IDS:
+            self._seen.discard(self._seen_order.popleft())
+
+    def _insert(self, data: str) -> None:
+        db = SessionLocal()
+        try:
+            db.add(WsEvent(origin=self.origin, payload=data))
+            db.commit()
+        finally:
+            db.close()
+
+    def _fetch(self) -> list:
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(WsEvent.id, WsEvent.payload)
+                .filter(WsEvent.id > self.last_id - self.LOOKBACK_IDS)
+                .order_by(WsEvent.id)
+                .all()
+            )
+        finally:
+            db.close()
+        fresh = []
+        for row in rows:
+            if row.id in self._seen:
+                continue
+            if row.id > self.last_id + 1:
+                # Lower ids are missing: still being committed, or rolled back
+                now = time.monotonic()
+                if self._gap_since is None:
+                    self._gap_since = now
+                if now - self._gap_since < self.GAP_WAIT_SECONDS:
+                    break
+                logger.debug("Gave up waiting for WebSocket events %d-%d", self.last_id + 1, row.id - 1)
+            if row.id > self.last_id:
+                self.last_id = row.id
+                self._gap_since = None
+            self._remember(row.id)
+            fresh.append((row.id, row.payload))
+        return fresh
+
+    def _prune(self):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=WS_EVENT_RETENTION)
+        db = SessionLocal()
+        try:
+            db.query(WsEvent).filter(WsEvent.created_at < cutoff).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+BROADCAST_BACKENDS = {
+    "memory": MemoryBroadcast,
+    "database": DatabaseBroadcast,
+}
 
 
 class ConnectionManager:
-    """Manages WebSocket connections for real-time admin notifications."""
+    """
+    Manages WebSocket connections for real-time admin notifications.
+
+    Every event carries the backend's epoch and a sequence number, and the most
+    recent WS_REPLAY_BUFFER events are kept. A reconnecting dashboard sends
+    {"type": "resume", "epoch": ..., "last_seq": ...} as its first message and
+    receives only what it missed, or a "resync" event when it is too far behind.
+    """
+
+    def __init__(self, backend: str = WS_BACKEND):
+        self.clients: set = set()
+        self.handshaking = 0  # accepted sockets still waiting for their resume message
+        self.dropped = 0  # messages dropped for clients that have since disconnected
+        backend_cls = BROADCAST_BACKENDS.get(backend)
+        if backend_cls is None:
+            logger.warning("Unknown WS_BACKEND %r; using in-process broadcast", backend)
+            backend_cls = MemoryBroadcast
+        self.backend = backend_cls(self.deliver)
+        self.last_seq = 0
+        self._replay = deque(maxlen=max(1, WS_REPLAY_BUFFER))  # (seq, data)
+        self._replayable_after = 0  # events up to this seq can no longer be replayed
+
+    @property
+    def epoch(self) -> str:
+        return self.backend.epoch
 
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    async def start(self):
+        self.last_seq = self._replayable_after = await self.backend.start()
 
-    async def connect(self, websocket: WebSocket):
-        if len(self.active_connections) >= MAX_CONNECTIONS:
+    async def stop(self):
+        await self.backend.stop()
+        for client in list(self.clients):
+            if client.task:
+                client.task.cancel()
+
+    async def connect(self, websocket: WebSocket) -> Optional[Client]:
+        # The slot is taken before the handshake awaits, so a burst of connects can't all pass
+        if len(self.clients) + self.handshaking >= WS_MAX_CONNECTIONS:
             await websocket.close(code=1013, reason="Too many connections")
+            return None
+        self.handshaking += 1
+        try:
+            await websocket.accept()
+            resume = await self._read_resume(websocket)
+        finally:
+            self.handshaking -= 1
+
+        # No awaits from here until the client is registered, so no event can
+        # fall between the replayed backlog and live delivery
+        missed = self._missed_since(resume)
+        client = Client(websocket, max(WS_SEND_QUEUE_SIZE, len(missed or ()) + 2))
+        client.offer(json.dumps({"event": "hello", "epoch": self.epoch, "seq": self.last_seq}))
+        if missed is None:
+            client.offer(self._resync_event())
+        else:
+            for data in missed:
+                client.offer(data)
+        self.clients.add(client)
+        client.task = asyncio.create_task(client.run_sender(self.disconnect))
+        logger.info(
+            "WebSocket connected (%s). Total: %d",
+            "fresh" if resume is None else ("resync" if missed is None else f"replayed {len(missed)}"),
+            len(self.clients),
+        )
+        return client
+
+    @staticmethod
+    async def _read_resume(websocket: WebSocket) -> Optional[dict]:
+        try:
+            message = json.loads(await asyncio.wait_for(websocket.receive_text(), RESUME_WAIT_SECONDS))
+        except Exception:
+            # Timed out (an older dashboard), not JSON, or the peer already went away
+            return None
+        if not isinstance(message, dict) or message.get("type") != "resume" or message.get("last_seq") is None:
+            return None
+        return message
+
+    def _missed_since(self, resume: Optional[dict]) -> Optional[list]:
+        """Encoded events after the client's last_seq; None if they can't all be replayed."""
+        if resume is None:
+            return []
+        try:
+            last_seq = int(resume["last_seq"])
+        except (TypeError, ValueError):
+            return None
+        if resume.get("epoch") != self.epoch or last_seq > self.last_seq or last_seq < self._replayable_after:
+            return None
+        return [data for seq, data in self._replay if seq > last_seq]
+
+    async def disconnect(self, client: Client):
+        if client not in self.clients:
             return
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info("WebSocket connected. Total: %d", len(self.active_connections))
+        self.clients.discard(client)
+        self.dropped += client.dropped
+        if client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+        try:
+            await client.websocket.close()
+        except Exception:
+            pass  # already closed by the peer
+        logger.info("WebSocket disconnected. Total: %d", len(self.clients))
+
+    def deliver(self, seq: int, message: dict):
+        """Number, record and hand an event to every local client's queue (never blocks)."""
+        data = dumps({**message, "seq": seq, "epoch": self.epoch}).decode()
+        if len(self._replay) == self._replay.maxlen:
+            self._replayable_after = max(self._replayable_after, self._replay.popleft()[0])
+        if self._replay and seq < self._replay[-1][0]:
+            # A late event the backend had given up on; the buffer stays in seq order
+            bisect.insort(self._replay, (seq, data))
+        else:
+            self._replay.append((seq, data))
+        self.last_seq = max(self.last_seq, seq)
+        for client in list(self.clients):
+            if not client.offer(data, self._resync_event):
+                logger.warning("Closing slow WebSocket client (%d messages queued)", client.queue.qsize())
+                asyncio.create_task(self.disconnect(client))
 
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        logger.info("WebSocket disconnected. Total: %d", len(self.active_connections))
+    def _resync_event(self) -> str:
+        """Tells a dashboard it missed events: reload, then continue from last_seq."""
+        return json.dumps({"event": "resync", "epoch": self.epoch, "seq": self.last_seq})
 
     async def broadcast(self, message: dict):
-        """Send a JSON message to all connected admin clients."""
-        disconnected = []
-        # Copy list to avoid mutation during iteration
-        connections = self.active_connections.copy()
-        data = json.dumps(message)
-        for connection in connections:
-            try:
-                await connection.send_text(data)
-            except Exception:
-                disconnected.append(connection)
-        for conn in disconnected:
-            self.disconnect(conn)
+        """Send an event to all connected admin clients (on every worker)."""
+        start = time.perf_counter()
+        await self.backend.publish(message)
+        WS_BROADCAST.observe(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "epoch": self.epoch,
+            "last_seq": self.last_seq,
+            "replay_buffer": len(self._replay),
+            "connections": len(self.clients),
+            "handshaking": self.handshaking,
+            "queued": sum(c.queue.qsize() for c in self.clients),
+            "dropped": self.dropped + sum(c.dropped for c in self.clients),
+        }
 
 
 manager = ConnectionManager()
+
+
+@registry.collector
+def _websocket_gauges():
+    stats = manager.stats()
+    WS_CONNECTIONS.set(stats["connections"])
+    WS_QUEUED.set(stats["queued"])
+    WS_DROPPED.set(stats["dropped"])
@@ -0,0 +1,61 @@
+"""Helpers shared by the benchmarks."""
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+def use_scratch_environment() -> str:
+    """
+    Point DATABASE_URL and UPLOAD_DIR at a throwaway directory unless they are
+    already set. Must run before anything under app/ is imported.
+    """
+    scratch = tempfile.mkdtemp(prefix="lf-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{scratch}/bench.db")
+    os.environ.setdefault("UPLOAD_DIR", os.path.join(scratch, "uploads"))
+    os.environ.setdefault("ANN_DIR", os.path.join(scratch, "ann_index"))
+    return scratch
+
+
+def percentiles(samples: list) -> dict:
+    """p50/p95/p99/max/mean of millisecond samples."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 2)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1], 2),
+        "mean_ms": round(statistics.fmean(ordered), 2),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def parse_size(value: str) -> int:
+    """'10k' -> 10000, '1m' -> 1000000, '2500' -> 2500."""
+    value = value.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * multiplier)
@@ -0,0 +1,303 @@
+"""
+Synthetic corpus for benchmarks: students, lost / found reports with realistic
+item names and descriptions, images, and a spread of stored matches.
+
+    python -m benchmarks.corpus --size 10k
+
+About a third of the found reports describe an item that was also reported
+lost, reworded and often with the same photo, so matching has true pairs to
+find. Images come from a fixed palette of synthetic photos (--unique-images)
+and go through the real upload pipeline (content store, thumbnails,
+histograms), so repeated photos exercise deduplication as well.
+"""
+import argparse
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import use_scratch_environment, parse_size
+
+if __name__ == "__main__":
+    use_scratch_environment()
+
+import numpy as np
+from sqlalchemy import insert
+
+from app.config import UPLOAD_DIR
+from app.database import SessionLocal
+from app.migrations import migrate
+from app.models import User, Report, Match, ImageFeature, StoredImage
+from app.services.image_service import file_sha256, create_derivatives
+from app.utils.ai_utils import histogram_to_bytes
+
+PASSWORD = "MCET12345"
+USERNAME_PREFIX = "SYN"
+INSERT_CHUNK = 5000
+
+ITEMS = {
+    "Electronics": ["laptop", "phone", "earphones", "charger", "power bank", "smartwatch", "mouse"],
+    "Books & Notes": ["textbook", "notebook", "record note", "lab manual", "diary"],
+    "ID Card": ["ID card", "library card", "bus pass"],
+    "Keys": ["bike key", "room key", "locker key", "key bunch"],
+    "Wallet / Purse": ["wallet", "purse", "card holder"],
+    "Clothing": ["jacket", "hoodie", "cap", "sweater", "scarf"],
+    "Accessories": ["watch", "spectacles", "bracelet", "umbrella", "ring"],
+    "Water Bottle": ["water bottle", "flask", "sipper"],
+    "Bag / Backpack": ["backpack", "laptop bag", "tote bag", "sling bag"],
+    "Stationery": ["pen", "geometry box", "pencil pouch", "scientific calculator"],
+    "Other": ["lunch box", "helmet", "badminton racket", "headphone case"],
+}
+BRANDS = ["Dell", "HP", "Lenovo", "Samsung", "boAt", "Milton", "Wildcraft", "Casio", "Titan", "Nike", "Classmate"]
+COLORS = {  # name -> BGR
+    "black": (20, 20, 20), "blue": (200, 90, 30), "red": (40, 40, 210), "grey": (128, 128, 128),
+    "white": (235, 235, 235), "green": (60, 160, 60), "silver": (192, 192, 192),
+    "brown": (40, 70, 120), "pink": (180, 120, 240), "yellow": (40, 210, 230),
+}
+DETAILS = [
+    "with a sticker on the back", "with a cracked corner", "with my name written inside",
+    "with a keychain attached", "in a transparent cover", "with a small scratch",
+    "with a blue strap", "with a college logo", "with a torn pocket", "with a photo inside",
+]
+PLACES = [
+    "the library", "Lab 3", "the seminar hall", "the canteen", "the parking lot",
+    "classroom 204", "the corridor", "the sports ground", "the bus stop", "the reading room",
+]
+LOCATIONS = {
+    "A Block": ["Floor 1", "Floor 2", "Floor 3", "Floor 4"],
+    "B Block": ["Floor 1", "Floor 2"],
+    "C Block": ["Floor 1", "Floor 2", "Floor 3"],
+    "Canteen": ["Aryas", "VVDN"],
+    "CC Hall": [None],
+}
+LOST_TEMPLATES = [
+    "Lost my {color} {brand} {item} {detail} near {place}.",
+    "I misplaced a {color} {item} ({brand}) {detail}. Last seen in {place}.",
+    "Missing {brand} {item}, {color}, {detail}. Probably left it at {place}.",
+]
+FOUND_TEMPLATES = [
+    "Found a {color} {item} {detail} in {place}.",
+    "Someone left a {brand} {item}, {color}, {detail}, at {place}.",
+    "Picked up a {color} {brand} {item} {detail} near {place}. Handed to the office.",
+]
+STATUSES = ["pending"] * 16 + ["match_found"] * 3 + ["closed"]
+
+
+def random_item(rng: random.Random) -> dict:
+    category = rng.choice(list(ITEMS))
+    return {
+        "category": category,
+        "item": rng.choice(ITEMS[category]),
+        "brand": rng.choice(BRANDS),
+        "color": rng.choice(list(COLORS)),
+        "detail": rng.choice(DETAILS),
+    }
+
+
+def describe(rng: random.Random, item: dict, templates: list) -> dict:
+    """Report fields for an item, worded with one of the templates."""
+    block = rng.choice(list(LOCATIONS))
+    return {
+        "item_name": f"{item['color'].title()} {item['item']}",
+        "category": item["category"],
+        "description": rng.choice(templates).format(place=rng.choice(PLACES), **item),
+        "block": block,
+        "floor": rng.choice(LOCATIONS[block]),
+        "specific_location": rng.choice(PLACES).capitalize(),
+    }
+
+
+def synthetic_photo(rng: random.Random, color: tuple, shape: int) -> np.ndarray:
+    """A noisy 480x360 'photo' of a coloured object on a random background."""
+    import cv2
+
+    img = np.empty((360, 480, 3), np.uint8)
+    img[:] = [rng.randrange(60, 230) for _ in range(3)]
+    noise = np.random.default_rng(rng.randrange(1 << 30)).integers(0, 25, img.shape, dtype=np.uint8)
+    img = cv2.add(img, noise)
+    cx, cy = rng.randrange(140, 340), rng.randrange(110, 250)
+    if shape % 3 == 0:
+        cv2.rectangle(img, (cx - 90, cy - 60), (cx + 90, cy + 60), color, -1)
+    elif shape % 3 == 1:
+        cv2.circle(img, (cx, cy), 80, color, -1)
+    else:
+        cv2.ellipse(img, (cx, cy), (110, 50), rng.randrange(180), 0, 360, color, -1)
+    return img
+
+
+def build_photos(rng: random.Random, count: int) -> list:
+    """Save `count` synthetic photos through the upload pipeline; returns their stored metadata."""
+    import cv2
+
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    photos = []
+    colors = list(COLORS)
+    for i in range(count):
+        color = colors[i % len(colors)]
+        img = synthetic_photo(rng, COLORS[color], i // len(colors))
+        filename = f"{uuid.uuid4().hex}.jpg"
+        cv2.imwrite(str(UPLOAD_DIR / filename), img, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        image_hash = file_sha256(UPLOAD_DIR / filename)
+        hist, dhash = create_derivatives(filename, image_hash)
+        photos.append({
+            "color": color,
+            "filename": filename,
+            "sha256": image_hash,
+            "dhash": f"{dhash:016x}",
+            "size": (UPLOAD_DIR / filename).stat().st_size,
+            "histogram": histogram_to_bytes(hist),
+        })
+    return photos
+
+
+def _chunked_insert(db, model, rows: list) -> None:
+    for i in range(0, len(rows), INSERT_CHUNK):
+        db.execute(insert(model), rows[i:i + INSERT_CHUNK])
+
+
+def generate(size: int, image_ratio: float = 0.3, unique_images: int = 300,
+             pair_ratio: float = 0.35, seed: int = 42) -> dict:
+    """Populate the configured database with a corpus of `size` reports. Returns counts and timings."""
+    from app.services.password_service import pwd_context
+
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    migrate()
+    db = SessionLocal()
+    try:
+        if db.query(User.id).filter(User.username.like(f"{USERNAME_PREFIX}%")).first():
+            raise SystemExit("The database already holds a synthetic corpus; point DATABASE_URL at a fresh one")
+
+        # ── Users ──
+        password_hash = pwd_context.hash(PASSWORD)  # one hash shared by every synthetic student
+        user_count = max(10, size // 20)
+        _chunked_insert(db, User, [
+            {
+                "username": f"{USERNAME_PREFIX}{i:06d}",
+                "password_hash": password_hash,
+                "role": "student",
+                "department": "IT",
+                "section": f"IT-{'ABC'[i % 3]}",
+            }
+            for i in range(user_count)
+        ])
+        user_sections = {
+            row.id: row.section
+            for row in db.query(User.id, User.section).filter(User.username.like(f"{USERNAME_PREFIX}%"))
+        }
+        user_ids = list(user_sections)
+
+        # ── Photos ──
+        photos = build_photos(rng, unique_images) if image_ratio > 0 else []
+        photos_by_color = {}
+        for photo in photos:
+            photos_by_color.setdefault(photo["color"], []).append(photo)
+
+        # ── Reports ──
+        now = datetime.now(timezone.utc)
+        reports, report_photos, pairs = [], [], []
+        lost_items = []  # (index, item, photo, day offset) of lost reports found reports can refer to
+        for i in range(size):
+            report_type = "lost" if i % 2 == 0 else "found"
+            days_ago = rng.randrange(180)
+            photo = None
+            if report_type == "found" and lost_items and rng.random() < pair_ratio:
+                lost_index, item, photo, days_ago = rng.choice(lost_items)
+                days_ago = max(0, days_ago - rng.randrange(4))
+                pairs.append((lost_index, i))
+                if photo is not None and rng.random() < 0.3:
+                    photo = None  # the finder didn't take a photo
+            else:
+                item = random_item(rng)
+                if photos and rng.random() < image_ratio:
+                    photo = rng.choice(photos_by_color.get(item["color"]) or photos)
+                if report_type == "lost":
+                    lost_items.append((i, item, photo, days_ago))
+
+            created_at = now - timedelta(days=days_ago, seconds=rng.randrange(86400))
+            user_id = user_ids[rng.randrange(len(user_ids))]
+            reports.append({
+                "user_id": user_id,
+                "section": user_sections[user_id],
+                "type": report_type,
+                **describe(rng, item, LOST_TEMPLATES if report_type == "lost" else FOUND_TEMPLATES),
+                "date_reported": created_at.date(),
+                "image_path": photo["filename"] if photo else None,
+                "image_hash": photo["sha256"] if photo else None,
+                "status": rng.choice(STATUSES),
+                "created_at": created_at,
+            })
+            report_photos.append(photo)
+        _chunked_insert(db, Report, reports)
+        # Rows were inserted in generation order, so ids line up with list positions
+        report_ids = [row.id for row in db.query(Report.id).filter(Report.user_id.in_(user_ids)).order_by(Report.id)]
+
+        # ── Image store ──
+        _chunked_insert(db, ImageFeature, [
+            {"report_id": report_ids[i], "histogram": photo["histogram"], "created_at": now}
+            for i, photo in enumerate(report_photos) if photo
+        ])
+        ref_counts = {}
+        for photo in report_photos:
+            if photo:
+                ref_counts[photo["sha256"]] = ref_counts.get(photo["sha256"], 0) + 1
+        _chunked_insert(db, StoredImage, [
+            {
+                "sha256": p["sha256"], "filename": p["filename"], "dhash": p["dhash"],
+                "size": p["size"], "ref_count": ref_counts.get(p["sha256"], 0),
+            }
+            for p in photos
+        ])
+
+        # ── Matches: the true pairs scored high, plus random low-scoring pairs ──
+        matches = {}
+        for lost_index, found_index in pairs:
+            key = (report_ids[lost_index], report_ids[found_index])
+            matches[key] = round(rng.uniform(0.7, 0.98), 4)
+        lost_ids = report_ids[0::2]
+        found_ids = report_ids[1::2]
+        for _ in range(size // 2):
+            key = (rng.choice(lost_ids), rng.choice(found_ids))
+            matches.setdefault(key, round(rng.uniform(0.05, 0.7), 4))
+        _chunked_insert(db, Match, [
+            {
+                "lost_report_id": lost_id,
+                "found_report_id": found_id,
+                "image_similarity": score,
+                "text_similarity": score,
+                "combined_score": score,
+                "created_at": now,
+            }
+            for (lost_id, found_id), score in matches.items()
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "users": user_count,
+        "reports": size,
+        "photos": len(photos),
+        "reports_with_images": sum(1 for p in report_photos if p),
+        "true_pairs": len(pairs),
+        "matches": len(matches),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=parse_size, default="1k", help="number of reports (1k, 10k, 100k, ...)")
+    parser.add_argument("--image-ratio", type=float, default=0.3, help="share of reports with a photo")
+    parser.add_argument("--unique-images", type=int, default=300, help="distinct synthetic photos")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    result = generate(args.size, args.image_ratio, args.unique_images, seed=args.seed)
+    print(", ".join(f"{k}={v}" for k, v in result.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Login storm benchmark: latency of ordinary endpoints while many students log in at once.
+
+    python -m benchmarks.login_storm --logins 200 --concurrency 100
+    python -m benchmarks.login_storm --inline     # the old path: bcrypt inside a sync route
+
+Runs the app in-process (lifespan included) against a throwaway SQLite
+database unless DATABASE_URL is set. Probe requests (GET /api/reports/my and
+/api/health) run continuously before and during the storm; their p50/p95/p99
+are reported for both phases along with the login status codes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+if "DATABASE_URL" not in os.environ:
+    _tmpdir = tempfile.mkdtemp(prefix="lf-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+
+import httpx
+from fastapi import Depends, HTTPException
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.main import app
+from app.database import SessionLocal, get_db
+from app.migrations import migrate
+from app.models import User
+from app.schemas import LoginRequest
+from app.services.password_service import pwd_context
+from benchmarks.common import percentiles
+
+PASSWORD = "MCET12345"
+
+
+@app.post("/bench/inline-login", include_in_schema=False)
+def inline_login(request: LoginRequest, db: Session = Depends(get_db)):
+    """The pre-pool login: query and bcrypt verification inside a threadpool route."""
+    user = db.query(User).filter(User.username == request.username).first()
+    if not user or not pwd_context.verify(request.password, user.password_hash):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    return {"ok": True}
+
+
+def create_students(count: int) -> list:
+    migrate()
+    names = [f"STORM{i:05d}" for i in range(count)]
+    db = SessionLocal()
+    try:
+        existing = {u.username for u in db.query(User.username).filter(User.username.like("STORM%"))}
+        password_hash = pwd_context.hash(PASSWORD)  # one hash shared by every synthetic student
+        missing = [n for n in names if n not in existing]
+        if missing:
+            db.execute(insert(User), [
+                {"username": n, "password_hash": password_hash, "role": "student", "section": "IT-A"}
+                for n in missing
+            ])
+            db.commit()
+    finally:
+        db.close()
+    return names
+
+
+async def probe(client: httpx.AsyncClient, headers: dict, stop: asyncio.Event, samples: list) -> None:
+    paths = ("/api/reports/my", "/api/health")
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(paths[i % len(paths)], headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        i += 1
+        await asyncio.sleep(0.005)
+
+
+async def run(args) -> dict:
+    students = create_students(args.logins)
+    login_path = "/bench/inline-login" if args.inline else "/api/auth/login"
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            response = await client.post("/api/auth/login", json={"username": students[0], "password": PASSWORD})
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            async def probe_phase(seconds: float, during=None) -> list:
+                samples, stop = [], asyncio.Event()
+                tasks = [asyncio.create_task(probe(client, headers, stop, samples)) for _ in range(args.probes)]
+                if during is None:
+                    await asyncio.sleep(seconds)
+                else:
+                    await during
+                stop.set()
+                await asyncio.gather(*tasks)
+                return samples
+
+            baseline = await probe_phase(args.baseline_seconds)
+
+            statuses = Counter()
+            gate = asyncio.Semaphore(args.concurrency)
+
+            async def login(username: str):
+                async with gate:
+                    r = await client.post(login_path, json={"username": username, "password": PASSWORD})
+                    statuses[r.status_code] += 1
+
+            storm_start = time.perf_counter()
+            storm = asyncio.gather(*(login(name) for name in students))
+            during = await probe_phase(0, storm)
+            storm_seconds = time.perf_counter() - storm_start
+
+    return {
+        "mode": "inline" if args.inline else "pool",
+        "logins": args.logins,
+        "concurrency": args.concurrency,
+        "storm_seconds": round(storm_seconds, 2),
+        "login_status": dict(statuses),
+        "probe_baseline": percentiles(baseline),
+        "probe_during_storm": percentiles(during),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100, help="logins in flight at once")
+    parser.add_argument("--probes", type=int, default=4, help="concurrent probe loops")
+    parser.add_argument("--baseline-seconds", type=float, default=2.0)
+    parser.add_argument("--inline", action="store_true", help="benchmark the old inline-bcrypt login instead")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        base, storm = result["probe_baseline"], result["probe_during_storm"]
+        print(f"mode={result['mode']}  {result['logins']} logins in {result['storm_seconds']}s  "
+              f"status={result['login_status']}")
+        for label, p in (("baseline", base), ("storm", storm)):
+            print(f"  probes {label:8s} n={p['count']:5d}  p50 {p.get('p50_ms', 0):7.1f} ms  "
+                  f"p95 {p.get('p95_ms', 0):7.1f} ms  p99 {p.get('p99_ms', 0):7.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
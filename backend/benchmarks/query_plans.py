@@ -0,0 +1,171 @@
+"""
+Check that the listing queries use the indexes they were designed for.
+
+    python -m benchmarks.query_plans                      # throwaway SQLite database
+    DATABASE_URL=postgresql://... python -m benchmarks.query_plans
+
+Each query is captured from the real service function (get_all_reports,
+get_user_reports, fetch_candidates) on a small synthetic corpus, then run
+through EXPLAIN with its own parameters. Exits non-zero if any of them scans
+the reports table or misses its expected index. On PostgreSQL, sequential
+scans are disabled for the check so the planner's choice on a small table
+doesn't hide a missing index.
+"""
+import argparse
+import json
+import re
+import sys
+from contextlib import contextmanager
+
+from benchmarks.common import use_scratch_environment
+
+if __name__ == "__main__":
+    use_scratch_environment()
+
+from sqlalchemy import event
+
+from app.database import engine, SessionLocal
+from app.migrations import migrate
+from app.models import Report, User
+from app.services.admin_service import get_all_reports
+from app.services.report_service import get_user_reports
+from app.services.matching_service import fetch_candidates
+from app.config import MATCH_FILTER_CATEGORY, MATCH_FILTER_BLOCK
+from benchmarks.corpus import generate, USERNAME_PREFIX
+
+
+@contextmanager
+def captured_statements():
+    """Collect (statement, parameters) for every statement executed in the block."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def _sqlite_plan(conn, statement, parameters) -> tuple:
+    """(indexes used on reports, whether reports is scanned without one)."""
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    indexes, full_scan = set(), False
+    for row in rows:
+        detail = row[-1]
+        if not re.match(r"(SCAN|SEARCH) reports\b", detail):
+            continue
+        match = re.search(r"USING (?:COVERING )?INDEX (\w+)", detail)
+        if match:
+            indexes.add(match.group(1))
+        elif "INTEGER PRIMARY KEY" not in detail:
+            full_scan = True
+    return indexes, full_scan
+
+
+def _postgres_plan(conn, statement, parameters) -> tuple:
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    indexes, full_scan = set(), False
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.get("Plans", []))
+        if node.get("Relation Name") == "reports":
+            if "Index Name" in node:
+                indexes.add(node["Index Name"])
+            elif node["Node Type"] == "Seq Scan":
+                full_scan = True
+        elif node["Node Type"] == "Bitmap Index Scan" and node["Index Name"].startswith(("ix_reports_", "reports_")):
+            # A bitmap heap scan on reports names its index on this child node
+            indexes.add(node["Index Name"])
+    return indexes, full_scan
+
+
+def explain(statement: str, parameters) -> tuple:
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            return _postgres_plan(conn, statement, parameters)
+        return _sqlite_plan(conn, statement, parameters)
+
+
+def check(name: str, run, expected: str = None) -> bool:
+    """Run a service call, EXPLAIN each statement it issued on reports, and print the verdict."""
+    with captured_statements() as statements:
+        run()
+    statements = [(s, p) for s, p in statements if re.search(r"\bFROM reports\b", s)]
+    ok = bool(statements)
+    used = set()
+    for statement, parameters in statements:
+        indexes, full_scan = explain(statement, parameters)
+        used |= indexes
+        ok = ok and not full_scan
+    if expected and expected not in used:
+        ok = False
+    print(f"  {'OK  ' if ok else 'FAIL'} {name:32s} {', '.join(sorted(used)) or 'no index'}"
+          + (f"  (expected {expected})" if expected else ""))
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5000, help="synthetic reports to generate")
+    args = parser.parse_args(argv)
+
+    migrate()
+    db = SessionLocal()
+    try:
+        if not db.query(Report.id).first():
+            generate(args.size, image_ratio=0)
+        # Planner statistics, as a long-running database would have them
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+
+        user = db.query(User).filter(User.username.like(f"{USERNAME_PREFIX}%")).first()
+        section = user.section
+        _, cursor = get_all_reports(db, limit=200)
+        report = db.query(Report).filter(Report.status == "pending").first()
+
+        print(f"Query plans ({engine.dialect.name}):")
+        results = [
+            check("admin reports", lambda: get_all_reports(db), "ix_reports_created_id"),
+            check("admin reports, next page", lambda: get_all_reports(db, cursor=cursor), "ix_reports_created_id"),
+            check(
+                "admin reports by status + type",
+                lambda: get_all_reports(db, status="pending", report_type="lost"),
+                "ix_reports_status_type_created",
+            ),
+            check(
+                "  + this month",
+                lambda: get_all_reports(db, status="pending", report_type="lost", time_filter="this_month"),
+                "ix_reports_status_type_created",
+            ),
+            check("admin reports by section", lambda: get_all_reports(db, section=section), "ix_reports_section_created"),
+            check(
+                "  + last week",
+                lambda: get_all_reports(db, section=section, time_filter="last_week"),
+                "ix_reports_section_created",
+            ),
+            check("admin reports by status", lambda: get_all_reports(db, status="closed")),
+            check("student's own reports", lambda: get_user_reports(db, user.id), "ix_reports_user_created"),
+        ]
+        if report is not None:
+            expected = (
+                "ix_reports_match_category" if MATCH_FILTER_CATEGORY
+                else "ix_reports_match_block" if MATCH_FILTER_BLOCK else None
+            )
+            results.append(check("matching candidates", lambda: fetch_candidates(db, report), expected))
+    finally:
+        db.close()
+
+    failed = results.count(False)
+    print(f"{len(results) - failed}/{len(results)} queries use their indexes")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
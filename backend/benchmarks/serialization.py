@@ -0,0 +1,185 @@
+"""
+Listing serialization benchmark: ORM objects + hand-built Pydantic models +
+response_model validation (the old route path) versus column rows encoded
+directly by app.serialization.
+
+    python -m benchmarks.serialization --rows 10000 --repeat 5
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+if "DATABASE_URL" not in os.environ:
+    _tmpdir = tempfile.mkdtemp(prefix="lf-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+
+from app.database import SessionLocal
+from app.migrations import migrate
+from app.models import User, Report, Match
+from app.schemas import ReportOut, MatchOut
+from app.serialization import select_reports, select_matches, report_row, match_row, dumps
+
+
+def populate(db, rows: int) -> None:
+    """Insert `rows` reports (half lost, half found) and `rows` matches between them."""
+    if db.query(Report).count() >= rows:
+        return
+    users = [
+        {"username": f"BENCH{i:04d}", "password_hash": "x", "role": "student", "section": f"IT-{'ABC'[i % 3]}"}
+        for i in range(50)
+    ]
+    db.execute(insert(User), users)
+    user_ids = [u.id for u in db.query(User.id).filter(User.username.like("BENCH%"))]
+    now = datetime.now(timezone.utc)
+    db.execute(insert(Report), [
+        {
+            "user_id": user_ids[i % len(user_ids)],
+            "type": "lost" if i % 2 == 0 else "found",
+            "item_name": f"Item {i}",
+            "category": "Electronics",
+            "description": f"Synthetic report {i} with a reasonably long description of the item",
+            "block": "A Block",
+            "floor": "2",
+            "specific_location": "Lab 3",
+            "date_reported": (now - timedelta(days=i % 30)).date(),
+            "image_path": f"{i:032x}.jpg",
+            "status": "pending",
+            "created_at": now - timedelta(minutes=i),
+        }
+        for i in range(rows)
+    ])
+    lost_ids = [r.id for r in db.query(Report.id).filter(Report.type == "lost").order_by(Report.id)]
+    found_ids = [r.id for r in db.query(Report.id).filter(Report.type == "found").order_by(Report.id)]
+    db.execute(insert(Match), [
+        {
+            # Distinct (lost, found) pairs: each lost report pairs with a different found report per round
+            "lost_report_id": lost_ids[i % len(lost_ids)],
+            "found_report_id": found_ids[(i % len(lost_ids) + i // len(lost_ids)) % len(found_ids)],
+            "image_similarity": 0.5,
+            "text_similarity": 0.5,
+            "combined_score": (i % 1000) / 1000,
+            "created_at": now,
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+
+
+def _report_out(r: Report) -> ReportOut:
+    return ReportOut(
+        id=r.id, user_id=r.user_id, type=r.type, item_name=r.item_name, category=r.category,
+        description=r.description, block=r.block, floor=r.floor, specific_location=r.specific_location,
+        date_reported=r.date_reported, image_path=r.image_path, status=r.status, created_at=r.created_at,
+        username=r.user.username if r.user else None, section=r.section,
+    )
+
+
+def _render(adapter: TypeAdapter, models) -> bytes:
+    # What FastAPI does with a response_model: validate, serialize to JSON mode, json.dumps
+    value = adapter.validate_python(models)
+    return json.dumps(adapter.dump_python(value, mode="json"), ensure_ascii=False).encode("utf-8")
+
+
+def old_reports(db, rows: int) -> bytes:
+    reports = (
+        db.query(Report).options(joinedload(Report.user))
+        .order_by(Report.created_at.desc(), Report.id.desc()).limit(rows).all()
+    )
+    return _render(REPORTS, [_report_out(r) for r in reports])
+
+
+def new_reports(db, rows: int) -> bytes:
+    query = select_reports().order_by(Report.created_at.desc(), Report.id.desc()).limit(rows)
+    return dumps([report_row(r) for r in db.execute(query)])
+
+
+def old_matches(db, rows: int) -> bytes:
+    matches = (
+        db.query(Match).options(
+            joinedload(Match.lost_report).joinedload(Report.user),
+            joinedload(Match.found_report).joinedload(Report.user),
+        )
+        .order_by(Match.combined_score.desc(), Match.id.desc()).limit(rows).all()
+    )
+    return _render(MATCHES, [
+        MatchOut(
+            id=m.id, lost_report_id=m.lost_report_id, found_report_id=m.found_report_id,
+            image_similarity=m.image_similarity, text_similarity=m.text_similarity,
+            combined_score=m.combined_score, created_at=m.created_at,
+            lost_report=_report_out(m.lost_report), found_report=_report_out(m.found_report),
+        )
+        for m in matches
+    ])
+
+
+def new_matches(db, rows: int) -> bytes:
+    query = select_matches().order_by(Match.combined_score.desc(), Match.id.desc()).limit(rows)
+    return dumps([match_row(m) for m in db.execute(query)])
+
+
+REPORTS = TypeAdapter(list[ReportOut])
+MATCHES = TypeAdapter(list[MatchOut])
+
+
+def measure(fn, rows: int, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        db = SessionLocal()  # fresh session per run, as each HTTP request gets
+        try:
+            start = time.perf_counter()
+            body = fn(db, rows)
+            timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            db.close()
+    return {"median_ms": round(statistics.median(timings), 1), "min_ms": round(min(timings), 1), "bytes": len(body)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    migrate()
+    db = SessionLocal()
+    try:
+        populate(db, args.rows)
+        # Both paths must produce the same document
+        for old, new in ((old_reports, new_reports), (old_matches, new_matches)):
+            if json.loads(old(db, 100)) != json.loads(new(db, 100)):
+                print(f"❌ {old.__name__} and {new.__name__} disagree", file=sys.stderr)
+                return 1
+    finally:
+        db.close()
+
+    results = {}
+    for name, old, new in (("reports", old_reports, new_reports), ("matches", old_matches, new_matches)):
+        before = measure(old, args.rows, args.repeat)
+        after = measure(new, args.rows, args.repeat)
+        results[name] = {"old": before, "new": after, "speedup": round(before["median_ms"] / after["median_ms"], 2)}
+
+    if args.json:
+        print(json.dumps({"rows": args.rows, "results": results}, indent=2))
+    else:
+        for name, r in results.items():
+            print(
+                f"{name:8s} {args.rows} rows: old {r['old']['median_ms']:8.1f} ms  "
+                f"new {r['new']['median_ms']:8.1f} ms  ({r['speedup']}x, {r['new']['bytes']} bytes)"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
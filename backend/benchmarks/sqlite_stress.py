@@ -0,0 +1,221 @@
+"""
+SQLite concurrency stress test: parallel report submissions and admin reads.
+
+    python -m benchmarks.sqlite_stress --processes 2 --seconds 20
+    python -m benchmarks.sqlite_stress --untuned      # SQLITE_TUNING=false, for comparison
+
+Each process runs the app in-process (lifespan included, so its matching
+workers write matches as well) against one shared throwaway SQLite database,
+the way uvicorn workers share lost_found.db. Submitters post reports, half of
+them with a photo, while readers page through the admin reports, matches and
+dashboard stats. Prints latency and status codes per operation, plus the
+writer-queue, busy-wait and "database is locked" metrics summed over the
+processes. Exits non-zero if any request failed, a submitted report is
+missing, or the database fails its integrity check.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks.common import use_scratch_environment, percentiles
+
+ADMIN = {"username": "ADMINMCET", "password": "ADMIN12345"}
+STUDENT = {"username": "727625BIT116", "password": "MCET12345"}
+READS = (
+    ("admin_reports", "/api/admin/reports", {"limit": 50}),
+    ("admin_matches", "/api/admin/matches", None),
+    ("admin_stats", "/api/admin/stats", None),
+)
+
+
+def _histogram(histogram) -> dict:
+    child = histogram.labels()
+    return {"count": sum(child.counts), "sum_s": child.sum}
+
+
+async def _load(index: int, options: dict) -> dict:
+    import cv2
+    import httpx
+    from app import metrics
+    from app.main import app
+    from benchmarks import corpus
+
+    rng = random.Random(index)
+    photo = cv2.imencode(".jpg", corpus.synthetic_photo(rng, corpus.COLORS["blue"], 1))[1].tobytes()
+    samples = defaultdict(list)
+    statuses = defaultdict(Counter)
+    submitted = 0
+
+    # raise_app_exceptions=False: an unhandled error (e.g. "database is locked") counts as a 500
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://stress", timeout=120) as client:
+            admin, student = [
+                {"Authorization": f"Bearer {(await client.post('/api/auth/login', json=c)).json()['access_token']}"}
+                for c in (ADMIN, STUDENT)
+            ]
+            deadline = time.perf_counter() + options["seconds"]
+
+            async def timed(name: str, request):
+                start = time.perf_counter()
+                response = await request
+                samples[name].append((time.perf_counter() - start) * 1000)
+                statuses[name][response.status_code] += 1
+                return response
+
+            async def submitter(i: int):
+                nonlocal submitted
+                while time.perf_counter() < deadline:
+                    item = corpus.random_item(rng)
+                    lost = i % 2 == 0
+                    data = {
+                        "type": "lost" if lost else "found",
+                        **corpus.describe(rng, item, corpus.LOST_TEMPLATES if lost else corpus.FOUND_TEMPLATES),
+                        "date_reported": datetime.now(timezone.utc).date().isoformat(),
+                    }
+                    data = {k: v for k, v in data.items() if v is not None}
+                    files = {"image": ("photo.jpg", photo, "image/jpeg")} if lost else None
+                    response = await timed("submit", client.post("/api/reports", data=data, files=files, headers=student))
+                    if response.status_code == 200:
+                        submitted += 1
+                    i += 1
+
+            async def reader(i: int):
+                while time.perf_counter() < deadline:
+                    name, path, params = READS[i % len(READS)]
+                    await timed(name, client.get(path, params=params, headers=admin))
+                    i += 1
+
+            await asyncio.gather(
+                *(submitter(i) for i in range(options["submitters"])),
+                *(reader(i) for i in range(options["readers"])),
+            )
+
+    return {
+        "samples": dict(samples),
+        "statuses": {name: dict(counts) for name, counts in statuses.items()},
+        "submitted": submitted,
+        "metrics": {
+            "lock_errors": metrics.DB_LOCK_ERRORS.labels().value,
+            "writer_wait": _histogram(metrics.DB_WRITER_WAIT),
+            "writer_held": _histogram(metrics.DB_WRITER_HELD),
+            "busy_wait": _histogram(metrics.DB_BUSY_WAIT),
+        },
+    }
+
+
+def worker(index: int, options: dict) -> dict:
+    return asyncio.run(_load(index, options))
+
+
+def _counts() -> tuple:
+    """(reports, matching jobs by status)."""
+    from sqlalchemy import func
+    from app.database import SessionLocal
+    from app.models import Report, MatchJob
+
+    db = SessionLocal()
+    try:
+        jobs = dict(db.query(MatchJob.status, func.count()).group_by(MatchJob.status).all())
+        return db.query(func.count(Report.id)).scalar(), jobs
+    finally:
+        db.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=2, help="app processes sharing the database")
+    parser.add_argument("--submitters", type=int, default=8, help="concurrent submitters per process")
+    parser.add_argument("--readers", type=int, default=4, help="concurrent admin readers per process")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--untuned", action="store_true", help="run with SQLITE_TUNING=false")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.untuned:
+        os.environ["SQLITE_TUNING"] = "false"
+    use_scratch_environment()
+    # Background model warm-up would only compete for CPU with the load
+    os.environ.setdefault("ML_WARMUP", "false")
+
+    from app.database import SessionLocal, engine
+    from app.migrations import migrate
+    from app.seed import seed_users
+
+    # Schema and users first, so the processes don't race to create them
+    migrate()
+    db = SessionLocal()
+    try:
+        seed_users(db)
+    finally:
+        db.close()
+    before, _ = _counts()
+    engine.dispose()
+
+    options = {"seconds": args.seconds, "submitters": args.submitters, "readers": args.readers}
+    print(
+        f"{args.processes} process(es) × {args.submitters} submitters + {args.readers} readers "
+        f"for {args.seconds:.0f}s, SQLITE_TUNING={os.environ.get('SQLITE_TUNING', 'true')}",
+        flush=True,
+    )
+    # Executor workers (unlike multiprocessing.Pool's daemons) may start the app's bcrypt pool
+    with ProcessPoolExecutor(args.processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = list(pool.map(worker, range(args.processes), [options] * args.processes))
+
+    samples, statuses = defaultdict(list), defaultdict(Counter)
+    totals = {"lock_errors": 0}
+    for result in results:
+        for name, values in result["samples"].items():
+            samples[name].extend(values)
+        for name, counts in result["statuses"].items():
+            statuses[name].update({int(code): n for code, n in counts.items()})
+        totals["lock_errors"] += result["metrics"]["lock_errors"]
+        for name in ("writer_wait", "writer_held", "busy_wait"):
+            total = totals.setdefault(name, {"count": 0, "sum_s": 0.0})
+            total["count"] += result["metrics"][name]["count"]
+            total["sum_s"] += result["metrics"][name]["sum_s"]
+
+    submitted = sum(result["submitted"] for result in results)
+    stored, jobs = _counts()
+    stored -= before
+    with engine.connect() as conn:
+        integrity = conn.exec_driver_sql("PRAGMA quick_check").scalar()
+
+    report = {
+        "operations": {}, "metrics": totals, "submitted": submitted, "stored": stored, "matching_jobs": jobs,
+        "integrity": integrity,
+    }
+    for name in ("submit",) + tuple(name for name, _, _ in READS):
+        stats = percentiles(samples.get(name, []))
+        report["operations"][name] = {**stats, "status": dict(statuses[name])}
+        if stats["count"]:
+            print(
+                f"  {name:16s} n={stats['count']:5d}  p50 {stats['p50_ms']:8.2f}  p95 {stats['p95_ms']:8.2f}  "
+                f"p99 {stats['p99_ms']:8.2f} ms  status {dict(sorted(statuses[name].items()))}"
+            )
+    for name in ("writer_wait", "writer_held", "busy_wait"):
+        total = totals[name]
+        mean = total["sum_s"] / total["count"] * 1000 if total["count"] else 0.0
+        print(f"  {name:16s} n={total['count']:5d}  mean {mean:8.2f} ms  total {total['sum_s']:.2f} s")
+    print(f"  database is locked: {totals['lock_errors']}   reports submitted {submitted}, stored {stored}   "
+          f"quick_check: {integrity}")
+    print(f"  matching jobs: {dict(sorted(jobs.items()))}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = sum(n for counts in statuses.values() for code, n in counts.items() if code >= 500)
+    return 1 if failed or stored != submitted or integrity != "ok" else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""
+End-to-end benchmark suite: generates a synthetic corpus, then measures
+matching, the pairwise similarity functions and the report / admin API.
+
+    python -m benchmarks.suite --size 10k --output bench-10k.json
+    python -m benchmarks.suite --compare bench-before.json bench-after.json
+
+Everything runs in-process (lifespan included) against a throwaway SQLite
+database and upload directory unless DATABASE_URL / UPLOAD_DIR are set. The
+JSON output records throughput, p50/p95/p99 latency and peak RSS for every
+phase along with the commit it ran on; --compare prints the change between
+two such files.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from benchmarks.common import use_scratch_environment, percentiles, peak_rss_mb, git_commit, parse_size
+
+if __name__ == "__main__":
+    use_scratch_environment()
+
+import httpx
+from sqlalchemy import func
+
+from app.main import app
+from app.config import DATABASE_URL, UPLOAD_DIR
+from app.database import SessionLocal
+from app.models import Report, MatchJob
+from app.services.matching_service import run_matching, prefilter_stats
+from app.services.text_service import text_model
+from app.utils.ai_utils import text_similarity, image_similarity
+from benchmarks import corpus
+
+ADMIN = {"username": "ADMINMCET", "password": "ADMIN12345"}
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s", "peak_rss_mb")
+
+
+def phase_result(samples: list, elapsed: float, **extra) -> dict:
+    return {
+        "throughput_per_s": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        **percentiles(samples),
+        "peak_rss_mb": peak_rss_mb(),
+        **extra,
+    }
+
+
+# ── Matching and pairwise similarity ──────────────
+def _match_one(report_id: int) -> float:
+    db = SessionLocal()
+    try:
+        report = db.get(Report, report_id)
+        start = time.perf_counter()
+        run_matching(db, report)
+        return (time.perf_counter() - start) * 1000
+    finally:
+        db.close()
+
+
+async def bench_matching(rng: random.Random, samples: int) -> dict:
+    db = SessionLocal()
+    try:
+        pending = [row.id for row in db.query(Report.id).filter(Report.status == "pending")]
+    finally:
+        db.close()
+    before = dict(prefilter_stats)
+    timings = []
+    start = time.perf_counter()
+    for report_id in rng.sample(pending, min(samples, len(pending))):
+        timings.append(await asyncio.to_thread(_match_one, report_id))
+    elapsed = time.perf_counter() - start
+    scored = prefilter_stats["scored"] - before["scored"]
+    return phase_result(timings, elapsed, mean_candidates=round(scored / max(1, len(timings)), 1))
+
+
+def bench_pairwise(rng: random.Random, samples: int) -> tuple:
+    """Per-call cost of the standalone text_similarity / image_similarity helpers."""
+    db = SessionLocal()
+    try:
+        descriptions = [row.description for row in db.query(Report.description).limit(5000)]
+        images = [row.image_path for row in db.query(Report.image_path).filter(Report.image_path.isnot(None)).distinct().limit(500)]
+    finally:
+        db.close()
+
+    def timed(fn, pairs):
+        timings = []
+        start = time.perf_counter()
+        for a, b in pairs:
+            t = time.perf_counter()
+            fn(a, b)
+            timings.append((time.perf_counter() - t) * 1000)
+        return phase_result(timings, time.perf_counter() - start)
+
+    text = timed(text_similarity, [(rng.choice(descriptions), rng.choice(descriptions)) for _ in range(samples)])
+    image = None
+    if len(images) > 1:
+        pairs = [tuple(str(UPLOAD_DIR / p) for p in rng.sample(images, 2)) for _ in range(max(1, samples // 4))]
+        image = timed(image_similarity, pairs)
+    return text, image
+
+
+# ── HTTP endpoints ────────────────────────────────
+async def hammer(requests: int, concurrency: int, send) -> dict:
+    """Issue `requests` calls of send(i) from `concurrency` concurrent loops."""
+    timings, statuses = [], Counter()
+    counter = iter(range(requests))
+
+    async def loop():
+        for i in counter:
+            start = time.perf_counter()
+            response = await send(i)
+            timings.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return phase_result(timings, time.perf_counter() - start, status=dict(statuses))
+
+
+async def login(client: httpx.AsyncClient, credentials: dict) -> dict:
+    response = await client.post("/api/auth/login", json=credentials)
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def collect_cursors(client: httpx.AsyncClient, headers: dict, path: str, pages: int) -> list:
+    cursors, cursor = [], None
+    for _ in range(pages):
+        response = await client.get(path, params={"cursor": cursor} if cursor else None, headers=headers)
+        cursor = response.json().get("next_cursor")
+        if not cursor:
+            break
+        cursors.append(cursor)
+    return cursors
+
+
+async def bench_endpoints(client: httpx.AsyncClient, args, rng: random.Random) -> dict:
+    import cv2
+
+    admin = await login(client, ADMIN)
+    student = await login(client, {"username": f"{corpus.USERNAME_PREFIX}000000", "password": corpus.PASSWORD})
+    report_cursors = await collect_cursors(client, admin, "/api/admin/reports", args.deep_pages) or [None]
+    match_cursors = await collect_cursors(client, admin, "/api/admin/matches", args.deep_pages) or [None]
+
+    def get(path, headers, params=None):
+        return lambda i: client.get(path, headers=headers, params=params(i) if callable(params) else params)
+
+    endpoints = {
+        "api_reports_my": get("/api/reports/my", student),
+        "api_admin_reports": get("/api/admin/reports", admin),
+        "api_admin_reports_filtered": get(
+            "/api/admin/reports", admin, {"status": "pending", "report_type": "lost", "time_filter": "this_month"},
+        ),
+        "api_admin_reports_deep": get(
+            "/api/admin/reports", admin, lambda i: {"cursor": report_cursors[i % len(report_cursors)]},
+        ),
+        "api_admin_stats": get("/api/admin/stats", admin),
+        "api_admin_stats_filtered": get("/api/admin/stats", admin, {"section": "IT-B", "time_filter": "this_year"}),
+        "api_admin_matches": get("/api/admin/matches", admin),
+        "api_admin_matches_min_score": get("/api/admin/matches", admin, {"min_score": 0.7}),
+        "api_admin_matches_deep": get(
+            "/api/admin/matches", admin, lambda i: {"cursor": match_cursors[i % len(match_cursors)]},
+        ),
+    }
+    results = {}
+    for name, send in endpoints.items():
+        results[name] = await hammer(args.requests, args.concurrency, send)
+
+    # Full exports are large, so only a few
+    results["api_admin_export_reports"] = await hammer(
+        args.export_requests, 1,
+        get("/api/admin/export/reports", admin, {"format": "ndjson"}),
+    )
+
+    # Submissions go last: each one queues a background matching job
+    photo = cv2.imencode(".jpg", corpus.synthetic_photo(rng, corpus.COLORS["blue"], 1))[1].tobytes()
+
+    def submit(i):
+        item = corpus.random_item(rng)
+        lost = i % 2 == 0
+        data = {
+            "type": "lost" if lost else "found",
+            **corpus.describe(rng, item, corpus.LOST_TEMPLATES if lost else corpus.FOUND_TEMPLATES),
+            "date_reported": datetime.now(timezone.utc).date().isoformat(),
+        }
+        data = {k: v for k, v in data.items() if v is not None}
+        files = {"image": ("photo.jpg", photo, "image/jpeg")} if lost else None
+        return client.post("/api/reports", data=data, files=files, headers=student)
+
+    results["api_submit_report"] = await hammer(args.submissions, args.concurrency, submit)
+    results["match_jobs_drain"] = await wait_for_jobs(args.drain_timeout)
+    return results
+
+
+async def wait_for_jobs(timeout: float) -> dict:
+    """Time until the background matching queue has finished every job the submissions created."""
+    def counts():
+        db = SessionLocal()
+        try:
+            return dict(db.query(MatchJob.status, func.count()).group_by(MatchJob.status).all())
+        finally:
+            db.close()
+
+    start = time.perf_counter()
+    while True:
+        status = await asyncio.to_thread(counts)
+        if not status.get("queued") and not status.get("running"):
+            break
+        if time.perf_counter() - start > timeout:
+            break
+        await asyncio.sleep(0.1)
+    return {"seconds": round(time.perf_counter() - start, 2), "jobs": status, "peak_rss_mb": peak_rss_mb()}
+
+
+# ── Runner ────────────────────────────────────────
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    result = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": DATABASE_URL.split(":", 1)[0],
+            "size": args.size,
+        },
+    }
+    result["corpus"] = await asyncio.to_thread(
+        corpus.generate, args.size, args.image_ratio, args.unique_images, seed=args.seed,
+    )
+    result["corpus"]["peak_rss_mb"] = peak_rss_mb()
+
+    phases = result["phases"] = {}
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        lifespan_ms = (time.perf_counter() - start) * 1000
+        while not text_model.is_fitted and time.perf_counter() - start < 600:
+            await asyncio.sleep(0.05)
+        phases["startup"] = {
+            "lifespan_ms": round(lifespan_ms, 1),
+            "text_model_ready_ms": round((time.perf_counter() - start) * 1000, 1),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+        phases["run_matching"] = await bench_matching(rng, args.match_samples)
+        phases["text_similarity"], image = bench_pairwise(rng, args.pair_samples)
+        if image:
+            phases["image_similarity"] = image
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            phases.update(await bench_endpoints(client, args, rng))
+    return result
+
+
+def print_summary(result: dict) -> None:
+    c = result["corpus"]
+    print(f"corpus: {c['reports']} reports, {c['reports_with_images']} with images, "
+          f"{c['matches']} matches, built in {c['seconds']}s")
+    for name, p in result["phases"].items():
+        if "p50_ms" in p:
+            print(f"  {name:28s} n={p['count']:5d}  p50 {p['p50_ms']:8.2f}  p95 {p['p95_ms']:8.2f}  "
+                  f"p99 {p['p99_ms']:8.2f} ms  {p['throughput_per_s']:8.1f}/s  rss {p['peak_rss_mb']} MB")
+        else:
+            details = "  ".join(f"{k}={v}" for k, v in p.items())
+            print(f"  {name:28s} {details}")
+
+
+def compare(before_path: str, after_path: str) -> int:
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before['meta']['commit']} → {after['meta']['commit']} "
+          f"({before['meta']['size']} → {after['meta']['size']} reports)")
+    for name, new in after["phases"].items():
+        old = before["phases"].get(name, {})
+        changes = []
+        for metric in COMPARED_METRICS:
+            if metric in new and metric in old and old[metric]:
+                delta = (new[metric] - old[metric]) / old[metric] * 100
+                changes.append(f"{metric} {old[metric]}→{new[metric]} ({delta:+.0f}%)")
+        if changes:
+            print(f"  {name:28s} " + "  ".join(changes))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=parse_size, default="1k", help="corpus size in reports (1k, 10k, 100k, ...)")
+    parser.add_argument("--image-ratio", type=float, default=0.3, help="share of corpus reports with a photo")
+    parser.add_argument("--unique-images", type=int, default=300, help="distinct synthetic photos in the corpus")
+    parser.add_argument("--match-samples", type=int, default=50, help="reports run through run_matching")
+    parser.add_argument("--pair-samples", type=int, default=200, help="text_similarity calls (a quarter for images)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per listing endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--deep-pages", type=int, default=20, help="pages walked to collect deep cursors")
+    parser.add_argument("--export-requests", type=int, default=3)
+    parser.add_argument("--submissions", type=int, default=50, help="reports submitted through the API")
+    parser.add_argument("--drain-timeout", type=float, default=300, help="seconds to wait for matching jobs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare)
+
+    result = asyncio.run(run(args))
+    print_summary(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,11 +11,21 @@ function createAdminApp() {
         activeTab: 'reports',
         reports: [],
         matches: [],
+        // Header totals for the current filters, from /api/admin/stats (not the loaded page)
+        stats: { total: 0, pending: 0, matched: 0, closed: 0, lost: 0, found: 0 },
+        statsRefreshTimer: null,
+        reportsCursor: null,
+        matchesCursor: null,
         loading: false,
+        loadingMoreReports: false,
+        loadingMoreMatches: false,
         ws: null,
         newReportIds: new Set(),
         wsReconnectAttempts: 0,
         wsReconnectTimer: null,
+        // Resume position in the server's event stream (see ConnectionManager)
+        wsEpoch: null,
+        wsLastSeq: null,
 
         // Filters
         sectionFilter: '',
@@ -30,6 +40,31 @@ function createAdminApp() {
             this.loadReports();
             this.loadMatches();
             this.connectWebSocket();
+            this.observeScrollEnd();
+        },
+
+        // Infinite scroll: fetch the next page when a list's sentinel comes into view
+        observeScrollEnd() {
+            if (!('IntersectionObserver' in window)) return;
+            const observer = new IntersectionObserver((entries) => {
+                entries.forEach((entry) => {
+                    if (!entry.isIntersecting) return;
+                    if (entry.target === this.$refs.reportsEnd) this.loadMoreReports();
+                    if (entry.target === this.$refs.matchesEnd) this.loadMoreMatches();
+                });
+            }, { rootMargin: '200px' });
+            observer.observe(this.$refs.reportsEnd);
+            observer.observe(this.$refs.matchesEnd);
+        },
+
+        // The observer only fires on changes, so keep paging while a sentinel stays on screen
+        continueIfVisible(ref, loadMore) {
+            this.$nextTick(() => {
+                const el = this.$refs[ref];
+                if (el && el.offsetParent !== null && el.getBoundingClientRect().top < window.innerHeight + 200) {
+                    loadMore.call(this);
+                }
+            });
         },
 
         connectWebSocket() {
@@ -47,26 +82,13 @@ function createAdminApp() {
             this.ws.onopen = () => {
                 console.log('🟢 WebSocket connected');
                 this.wsReconnectAttempts = 0; // Reset on successful connection
+                // Ask only for the events missed while disconnected
+                this.ws.send(JSON.stringify({ type: 'resume', epoch: this.wsEpoch, last_seq: this.wsLastSeq }));
             };
 
             this.ws.onmessage = (event) => {
                 try {
-                    const data = JSON.parse(event.data);
-                    if (data.event === 'new_report') {
-                        // Add to reports list with animation flag
-                        this.newReportIds.add(data.report.id);
-                        this.reports.unshift(data.report);
-
-                        // Remove animation flag after 3s
-                        setTimeout(() => {
-                            this.newReportIds.delete(data.report.id);
-                        }, 3000);
-
-                        // Reload matches if high matches found
-                        if (data.high_matches > 0) {
-                            this.loadMatches();
-                        }
-                    }
+                    this.handleEvent(JSON.parse(event.data));
                 } catch (e) {
                     console.error('WS parse error:', e);
                 }
@@ -82,6 +104,84 @@ function createAdminApp() {
             };
         },
 
+        handleEvent(data) {
+            if (data.event === 'hello') {
+                this.wsEpoch = data.epoch;
+                if (this.wsLastSeq === null) this.wsLastSeq = data.seq;
+                return;
+            }
+            if (data.event === 'resync') {
+                // Too far behind (or the server restarted): fall back to a full reload
+                this.resync(data.epoch, data.seq);
+                return;
+            }
+            if (data.seq !== undefined) {
+                if (data.epoch !== this.wsEpoch || (this.wsLastSeq !== null && data.seq > this.wsLastSeq + 1)) {
+                    // Events were skipped, so patching this one in would leave the lists stale
+                    this.resync(data.epoch, data.seq);
+                    return;
+                }
+                this.wsLastSeq = Math.max(this.wsLastSeq || 0, data.seq);
+            }
+
+            if (data.event === 'new_report' || data.event === 'status_changed') {
+                this.refreshStatsSoon();
+            }
+
+            if (data.event === 'new_report') {
+                if (this.reports.some(r => r.id === data.report.id)) return;
+                // Add to reports list with animation flag
+                this.newReportIds.add(data.report.id);
+                this.reports.unshift(data.report);
+
+                // Remove animation flag after 3s
+                setTimeout(() => {
+                    this.newReportIds.delete(data.report.id);
+                }, 3000);
+
+            } else if (data.event === 'status_changed') {
+                this.applyStatus(data.report_id, data.status);
+
+            } else if (data.event === 'new_matches') {
+                if (data.truncated) {
+                    this.loadMatches();
+                } else {
+                    data.matches.forEach(m => this.insertMatch(m));
+                }
+            }
+        },
+
+        resync(epoch, seq) {
+            this.wsEpoch = epoch;
+            this.wsLastSeq = seq;
+            this.loadReports();
+            this.loadMatches();
+            this.refreshStatsSoon();
+        },
+
+        applyStatus(reportId, status) {
+            const report = this.reports.find(r => r.id === reportId);
+            if (report) report.status = status;
+            this.matches.forEach(m => {
+                if (m.lost_report && m.lost_report.id === reportId) m.lost_report.status = status;
+                if (m.found_report && m.found_report.id === reportId) m.found_report.status = status;
+            });
+        },
+
+        // Keep the list in (score desc, id desc) order, the same as the API's keyset order
+        insertMatch(match) {
+            if (this.matches.some(m => m.id === match.id)) return;
+            const before = (a, b) => a.combined_score > b.combined_score
+                || (a.combined_score === b.combined_score && a.id > b.id);
+            const index = this.matches.findIndex(m => before(match, m));
+            if (index === -1) {
+                // Below everything loaded: a later page will bring it in
+                if (!this.matchesCursor) this.matches.push(match);
+            } else {
+                this.matches.splice(index, 0, match);
+            }
+        },
+
         scheduleReconnect() {
             const maxAttempts = 10;
             if (this.wsReconnectAttempts >= maxAttempts) {
@@ -96,38 +196,107 @@ function createAdminApp() {
             this.wsReconnectTimer = setTimeout(() => this.connectWebSocket(), delay);
         },
 
+        filterParams() {
+            const params = new URLSearchParams();
+            if (this.sectionFilter) params.append('section', this.sectionFilter);
+            if (this.timeFilter) params.append('time_filter', this.timeFilter);
+            if (this.statusFilter) params.append('status', this.statusFilter);
+            if (this.typeFilter) params.append('report_type', this.typeFilter);
+            return params;
+        },
+
+        reportsUrl(cursor = null) {
+            const params = this.filterParams();
+            if (cursor) params.append('cursor', cursor);
+
+            const qs = params.toString();
+            return `/api/admin/reports${qs ? '?' + qs : ''}`;
+        },
+
+        async loadStats() {
+            try {
+                const qs = this.filterParams().toString();
+                this.stats = await apiRequest(`/api/admin/stats${qs ? '?' + qs : ''}`);
+            } catch (err) {
+                console.error('Failed to load stats:', err);
+            }
+        },
+
+        // Coalesce bursts of events into one stats request
+        refreshStatsSoon() {
+            if (this.statsRefreshTimer) return;
+            this.statsRefreshTimer = setTimeout(() => {
+                this.statsRefreshTimer = null;
+                this.loadStats();
+            }, 500);
+        },
+
         async loadReports() {
+            this.loadStats();
             this.loading = true;
             try {
-                const params = new URLSearchParams();
-                if (this.sectionFilter) params.append('section', this.sectionFilter);
-                if (this.timeFilter) params.append('time_filter', this.timeFilter);
-                if (this.statusFilter) params.append('status', this.statusFilter);
-                if (this.typeFilter) params.append('report_type', this.typeFilter);
-
-                const qs = params.toString();
-                this.reports = await apiRequest(`/api/admin/reports${qs ? '?' + qs : ''}`);
+                const page = await apiRequest(this.reportsUrl());
+                this.reports = page.items;
+                this.reportsCursor = page.next_cursor;
             } catch (err) {
                 console.error('Failed to load reports:', err);
             } finally {
                 this.loading = false;
+                this.continueIfVisible('reportsEnd', this.loadMoreReports);
+            }
+        },
+
+        async loadMoreReports() {
+            if (!this.reportsCursor || this.loading || this.loadingMoreReports) return;
+            this.loadingMoreReports = true;
+            try {
+                const page = await apiRequest(this.reportsUrl(this.reportsCursor));
+                const seen = new Set(this.reports.map(r => r.id));
+                this.reports.push(...page.items.filter(r => !seen.has(r.id)));
+                this.reportsCursor = page.next_cursor;
+            } catch (err) {
+                console.error('Failed to load more reports:', err);
+                this.reportsCursor = null;
+            } finally {
+                this.loadingMoreReports = false;
+                this.continueIfVisible('reportsEnd', this.loadMoreReports);
             }
         },
 
         async loadMatches() {
             try {
-                this.matches = await apiRequest('/api/admin/matches');
+                const page = await apiRequest('/api/admin/matches');
+                this.matches = page.items;
+                this.matchesCursor = page.next_cursor;
             } catch (err) {
                 console.error('Failed to load matches:', err);
             }
+            this.continueIfVisible('matchesEnd', this.loadMoreMatches);
+        },
+
+        async loadMoreMatches() {
+            if (!this.matchesCursor || this.loadingMoreMatches) return;
+            this.loadingMoreMatches = true;
+            try {
+                const cursor = encodeURIComponent(this.matchesCursor);
+                const page = await apiRequest(`/api/admin/matches?cursor=${cursor}`);
+                const seen = new Set(this.matches.map(m => m.id));
+                this.matches.push(...page.items.filter(m => !seen.has(m.id)));
+                this.matchesCursor = page.next_cursor;
+            } catch (err) {
+                console.error('Failed to load more matches:', err);
+                this.matchesCursor = null;
+            } finally {
+                this.loadingMoreMatches = false;
+                this.continueIfVisible('matchesEnd', this.loadMoreMatches);
+            }
         },
 
         async updateStatus(reportId, newStatus) {
             try {
                 await apiRequest(`/api/admin/reports/${reportId}/status`, 'PATCH', { status: newStatus });
-                // Update local state
-                const report = this.reports.find(r => r.id === reportId);
-                if (report) report.status = newStatus;
+                // Update local state (other dashboards get a status_changed event)
+                this.applyStatus(reportId, newStatus);
             } catch (err) {
                 alert(err.message || 'Failed to update status');
             }
@@ -162,17 +331,6 @@ function createAdminApp() {
             return this.newReportIds.has(id);
         },
 
-        get stats() {
-            return {
-                total: this.reports.length,
-                pending: this.reports.filter(r => r.status === 'pending').length,
-                matched: this.reports.filter(r => r.status === 'match_found').length,
-                closed: this.reports.filter(r => r.status === 'closed').length,
-                lost: this.reports.filter(r => r.type === 'lost').length,
-                found: this.reports.filter(r => r.type === 'found').length,
-            };
-        },
-
         scoreColor(score) {
             if (score >= 0.7) return 'var(--success)';
             if (score >= 0.4) return 'var(--warning)';